@@ -0,0 +1,167 @@
+# aio.py
+
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Any, Optional
+
+import instrument
+from log_utils import log_step
+
+
+# Async counterparts of parse_openmarkdown_v1, render_html and export_pdf.
+# Parsing and rendering run in an executor: the loop's default thread pool
+# unless one is passed per call or set with set_executor(). A process pool
+# from process_pool() avoids the GIL for big documents. Cancelling or timing
+# out a call stops waiting for it at once; a job already running in a worker
+# finishes in the background and its result is dropped. PDF export uses
+# playwright.async_api directly, so cancelling it closes the page and browser.
+_executor: Optional[Executor] = None
+
+
+def set_executor(executor: Optional[Executor]) -> None:
+    global _executor
+    _executor = executor
+
+
+def quiet_worker() -> None:
+    import log_utils
+
+    log_utils.set_reporter(log_utils.QuietReporter())
+
+
+def process_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=workers, initializer=quiet_worker)
+
+
+def parse_job(text: str, source_path: Optional[str]) -> Dict[str, Any]:
+    from parser import parse_openmarkdown_v1
+
+    return parse_openmarkdown_v1(text, source_path=source_path)
+
+
+def render_job(ast: Dict[str, Any], css: Optional[str], inline_local_images: bool) -> str:
+    from render import render_html
+
+    return render_html(ast, css=css, inline_local_images=inline_local_images)
+
+
+async def run_in_executor(
+    executor: Optional[Executor],
+    timeout: Optional[float],
+    fn: Any,
+    *args: Any,
+) -> Any:
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(executor or _executor, fn, *args)
+    return await asyncio.wait_for(future, timeout)
+
+
+async def parse(
+    text: str,
+    source_path: Optional[str] = None,
+    executor: Optional[Executor] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    # Raises OpenMarkdownError like the sync parser.
+    return await run_in_executor(executor, timeout, parse_job, text, source_path)
+
+
+async def render(
+    ast: Dict[str, Any],
+    css: Optional[str] = None,
+    inline_local_images: bool = False,
+    executor: Optional[Executor] = None,
+    timeout: Optional[float] = None,
+) -> str:
+    # In a process pool the worker renders a copy, so local: image urls in the
+    # caller's AST are left as they are.
+    return await run_in_executor(executor, timeout, render_job, ast, css, inline_local_images)
+
+
+# ---------------------------
+# Chromium PDF export
+# ---------------------------
+async def print_page(browser: Any, html_content: str, out_path: str) -> None:
+    page = await browser.new_page()
+    try:
+        with instrument.phase("export.page_load"):
+            await page.set_content(html_content)
+            await page.wait_for_load_state("networkidle")
+        with instrument.phase("export.typeset"):
+            try:
+                await page.evaluate("() => (window.MathJax ? MathJax.typesetPromise() : null)")
+            except Exception:
+                pass
+        log_step("Rendering PDF...")
+        with instrument.phase("export.page_pdf"):
+            await page.pdf(
+                path=out_path,
+                format="A4",
+                print_background=True,
+                margin={"top": "0.75in", "right": "0.75in", "bottom": "0.75in", "left": "0.75in"},
+            )
+    finally:
+        await page.close()
+
+
+async def write_pdf(
+    html_content: str,
+    out_path: str,
+    meta: Optional[Dict[str, Any]],
+    title: Optional[str],
+    browser: Any,
+) -> None:
+    from render import set_pdf_metadata
+
+    started = instrument.start()
+    if browser is not None:
+        await print_page(browser, html_content, out_path)
+    else:
+        from playwright.async_api import async_playwright
+
+        async with async_playwright() as p:
+            log_step("Playwright initialized.")
+            with instrument.phase("export.browser_launch"):
+                browser = await p.chromium.launch()
+            try:
+                await print_page(browser, html_content, out_path)
+            finally:
+                await browser.close()
+    # PyPDF2 is synchronous; keep it off the loop.
+    with instrument.phase("export.metadata"):
+        await asyncio.get_running_loop().run_in_executor(
+            None, set_pdf_metadata, out_path, meta, title
+        )
+    instrument.stop("export.pdf", started)
+    log_step("PDF export complete.")
+
+
+async def export_pdf(
+    html_content: str,
+    out_path: str,
+    meta: Optional[Dict[str, Any]] = None,
+    title: Optional[str] = None,
+    timeout: Optional[float] = None,
+    browser: Any = None,
+) -> None:
+    # Pass a running playwright.async_api Browser to reuse it across exports;
+    # otherwise one is launched and closed for this export.
+    await asyncio.wait_for(write_pdf(html_content, out_path, meta, title, browser), timeout)
+
+
+async def convert(
+    text: str,
+    out_path: str,
+    source_path: Optional[str] = None,
+    css: Optional[str] = None,
+    executor: Optional[Executor] = None,
+    timeout: Optional[float] = None,
+    browser: Any = None,
+) -> None:
+    # Parse, render and export in one call; the timeout covers all three.
+    async def run() -> None:
+        ast = await parse(text, source_path, executor=executor)
+        html_content = await render(ast, css=css, inline_local_images=True, executor=executor)
+        await export_pdf(html_content, out_path, meta=ast.get("meta"), title=ast.get("title"), browser=browser)
+
+    await asyncio.wait_for(run(), timeout)
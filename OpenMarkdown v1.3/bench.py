@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+# bench.py
+
+import datetime
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+import engine
+import generate
+import log_utils
+from cliargs import pop_flag, pop_option
+from parser import (
+    find_code_span,
+    parse_header,
+    parse_inline,
+    parse_openmarkdown_v1,
+    source_lines,
+    validate,
+    validate_inline_syntax,
+)
+from render import render_blocks, render_html, render_inline
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "bench-baseline.json")
+INPUT_SEED = 1
+INPUT_SIZE = 256 * 1024
+DEFAULT_SAMPLES = 15
+DEFAULT_MIN_TIME = 0.05
+DEFAULT_THRESHOLD = 0.05
+SIGNIFICANCE = 0.05
+
+
+# ---------------------------
+# Inputs
+# ---------------------------
+def load_inputs() -> Dict[str, Any]:
+    # Fixed seed and size, so results from different runs and machines are
+    # measured on the same text.
+    text = generate.generate(INPUT_SEED, INPUT_SIZE)
+    all_lines = source_lines(text)
+    body_start = parse_header(all_lines)["body_start"]
+    lines = [
+        (i + 1, line) for i, line in enumerate(all_lines)
+        if i >= body_start and line.strip() and line[0].isalpha()
+    ][:400]
+    with quiet():
+        ast = parse_openmarkdown_v1(text)
+        html_out = render_html(ast)
+    return {
+        "text": text,
+        "lines": lines,
+        "code_lines": [line for _, line in lines if "`" in line],
+        "inline_nodes": [parse_inline(line, line_no) for line_no, line in lines],
+        "ast": ast,
+        "html": html_out,
+    }
+
+
+def quiet():
+    # parser.py and render.py report progress steps; keep them out of timings.
+    return log_utils.reporting(log_utils.QuietReporter())
+
+
+# ---------------------------
+# Benchmarks
+# ---------------------------
+def micro_benchmarks(inputs: Dict[str, Any]) -> Dict[str, Callable[[], Any]]:
+    lines = inputs["lines"]
+    code_lines = inputs["code_lines"]
+    inline_nodes = inputs["inline_nodes"]
+    children = inputs["ast"]["children"]
+
+    def bench_parse_inline() -> None:
+        for line_no, line in lines:
+            parse_inline(line, line_no)
+
+    def bench_find_code_span() -> None:
+        for line in code_lines:
+            find_code_span(line)
+
+    def bench_validate_inline_syntax() -> None:
+        for line_no, line in lines:
+            validate_inline_syntax(line, line_no)
+
+    def bench_render_inline() -> None:
+        for nodes in inline_nodes:
+            render_inline(nodes)
+
+    def bench_render_blocks() -> None:
+        render_blocks(children)
+
+    return {
+        "micro.parse_inline": bench_parse_inline,
+        "micro.find_code_span": bench_find_code_span,
+        "micro.validate_inline_syntax": bench_validate_inline_syntax,
+        "micro.render_inline": bench_render_inline,
+        "micro.render_blocks": bench_render_blocks,
+    }
+
+
+def macro_benchmarks(inputs: Dict[str, Any]) -> Dict[str, Callable[[], Any]]:
+    text = inputs["text"]
+    ast = inputs["ast"]
+
+    def bench_parse() -> None:
+        parse_openmarkdown_v1(text)
+
+    def bench_engine_parse() -> None:
+        engine.parse_document(text)
+
+    def bench_validate() -> None:
+        validate(text)
+
+    def bench_render_html() -> None:
+        # Parsed without a source path, so rendering leaves the AST alone.
+        render_html(ast)
+
+    return {
+        "macro.parse": bench_parse,
+        "macro.engine_parse": bench_engine_parse,
+        "macro.validate": bench_validate,
+        "macro.render_html": bench_render_html,
+    }
+
+
+def startup_benchmarks() -> Dict[str, Callable[[], Any]]:
+    # Whole headless CLI runs, interpreter start included. startup.python is
+    # the floor the CLI cannot go below.
+    out_dir = tempfile.mkdtemp(prefix="omd-bench-")
+    source = os.path.join(HERE, "example.omd")
+    out_path = os.path.join(out_dir, "out.html")
+
+    def bench_python() -> None:
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+
+    def bench_omd_render() -> None:
+        subprocess.run(
+            [sys.executable, os.path.join(HERE, "omd.py"), "render", source, "-o", out_path],
+            check=True,
+        )
+
+    return {
+        "startup.python": bench_python,
+        "startup.omd_render": bench_omd_render,
+    }
+
+
+def pdf_benchmark(inputs: Dict[str, Any]) -> Tuple[Optional[Callable[[], Any]], Optional[str]]:
+    # Needs Playwright with a local Chromium; skipped (with the reason) if
+    # that is not available.
+    try:
+        import playwright.sync_api  # noqa: F401
+    except ImportError:
+        return None, "playwright is not installed"
+    from render import export_pdf
+
+    html_out = inputs["html"]
+    out_dir = tempfile.mkdtemp(prefix="omd-bench-")
+    out_path = os.path.join(out_dir, "bench.pdf")
+
+    def bench_export_pdf() -> None:
+        export_pdf(html_out, out_path, meta=inputs["ast"].get("meta"), title=inputs["ast"]["title"])
+
+    try:
+        with quiet():
+            bench_export_pdf()
+    except Exception as exc:
+        return None, f"PDF export failed: {exc}"
+    return bench_export_pdf, None
+
+
+# ---------------------------
+# Measuring
+# ---------------------------
+def calibrate(fn: Callable[[], Any], min_time: float) -> int:
+    # Smallest power of ten of loops that makes one sample last min_time.
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        if time.perf_counter() - start >= min_time or loops >= 10 ** 6:
+            return loops
+        loops *= 10
+
+
+def measure(fn: Callable[[], Any], samples: int, min_time: float) -> Dict[str, Any]:
+    with quiet():
+        loops = calibrate(fn, min_time)
+        times = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            times.append((time.perf_counter() - start) / loops)
+    return {
+        "loops": loops,
+        "samples": times,
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "min": min(times),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=HERE,
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def environment(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "git_commit": git_commit(),
+        "input": {
+            "seed": INPUT_SEED,
+            "bytes": len(inputs["text"]),
+            "inline_lines": len(inputs["lines"]),
+        },
+    }
+
+
+# ---------------------------
+# Baseline comparison
+# ---------------------------
+def mann_whitney_p(a: List[float], b: List[float]) -> float:
+    # Two-sided Mann-Whitney U test with the normal approximation and tie
+    # correction; fine for the 10+ samples per benchmark we take.
+    n1, n2 = len(a), len(b)
+    if n1 < 2 or n2 < 2:
+        return 1.0
+    ranked = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    ranks = [0.0] * len(ranked)
+    ties = 0.0
+    i = 0
+    while i < len(ranked):
+        j = i
+        while j + 1 < len(ranked) and ranked[j + 1][0] == ranked[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2 + 1
+        t = j - i + 1
+        ties += t ** 3 - t
+        i = j + 1
+    r1 = sum(r for r, (_, group) in zip(ranks, ranked) if group == 0)
+    u = r1 - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1))))
+    if sigma == 0:
+        return 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / sigma
+    return math.erfc(max(z, 0.0) / math.sqrt(2))
+
+
+def compare(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float,
+) -> List[Dict[str, Any]]:
+    # A benchmark regresses when its median is more than `threshold` slower
+    # and the difference is statistically significant.
+    rows = []
+    for name, current in results["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base or "median" not in current or "median" not in base:
+            rows.append({"name": name, "status": "new" if not base else "skipped"})
+            continue
+        change = current["median"] / base["median"] - 1
+        p = mann_whitney_p(current["samples"], base["samples"])
+        status = "ok"
+        if p < SIGNIFICANCE and change > threshold:
+            status = "slower"
+        elif p < SIGNIFICANCE and change < -threshold:
+            status = "faster"
+        rows.append({
+            "name": name,
+            "status": status,
+            "median": current["median"],
+            "baseline": base["median"],
+            "change": change,
+            "p_value": p,
+        })
+    return rows
+
+
+def format_time(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.3f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f} ms"
+    return f"{seconds * 1e6:.1f} us"
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def usage() -> None:
+    print(
+        "Usage:\n"
+        "  python3 bench.py [--filter TEXT] [--samples 15] [--min-time 0.05] [--pdf]\n"
+        "                   [--json results.json] [--save-baseline [bench-baseline.json]]\n"
+        "                   [--compare [bench-baseline.json]] [--threshold 0.05]"
+    )
+
+
+def pop_optional_path(args: List[str], name: str, default: str) -> Optional[str]:
+    if name not in args:
+        return None
+    i = args.index(name)
+    if i + 1 < len(args) and not args[i + 1].startswith("--"):
+        value = args[i + 1]
+        del args[i:i + 2]
+        return value
+    del args[i]
+    return default
+
+
+def main(argv: List[str]) -> int:
+    args = list(argv)
+    if pop_flag(args, "-h") or pop_flag(args, "--help"):
+        usage()
+        return 0
+    name_filter = pop_option(args, "--filter")
+    json_path = pop_option(args, "--json")
+    save_path = pop_optional_path(args, "--save-baseline", DEFAULT_BASELINE)
+    compare_path = pop_optional_path(args, "--compare", DEFAULT_BASELINE)
+    with_pdf = pop_flag(args, "--pdf")
+    try:
+        samples = max(2, int(pop_option(args, "--samples") or DEFAULT_SAMPLES))
+        min_time = float(pop_option(args, "--min-time") or DEFAULT_MIN_TIME)
+        threshold = float(pop_option(args, "--threshold") or DEFAULT_THRESHOLD)
+    except ValueError:
+        print("Error: --samples, --min-time and --threshold must be numbers")
+        return 1
+    if args:
+        usage()
+        return 1
+
+    inputs = load_inputs()
+    benchmarks = dict(micro_benchmarks(inputs))
+    benchmarks.update(macro_benchmarks(inputs))
+    benchmarks.update(startup_benchmarks())
+    skipped: Dict[str, str] = {}
+    if with_pdf:
+        pdf_fn, reason = pdf_benchmark(inputs)
+        if pdf_fn:
+            benchmarks["macro.export_pdf"] = pdf_fn
+        else:
+            skipped["macro.export_pdf"] = reason or "unavailable"
+
+    results: Dict[str, Any] = {"environment": environment(inputs), "benchmarks": {}}
+    for name, fn in benchmarks.items():
+        if name_filter and name_filter not in name:
+            continue
+        stats = measure(fn, samples, min_time)
+        results["benchmarks"][name] = stats
+        print(
+            f"{name:32} {format_time(stats['median']):>12}  "
+            f"± {format_time(stats['stdev']):>10}  ({stats['loops']} loops x {samples})"
+        )
+    for name, reason in skipped.items():
+        results["benchmarks"][name] = {"skipped": reason}
+        print(f"{name:32} skipped: {reason}")
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote results: {json_path}")
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline: {save_path}")
+
+    if compare_path:
+        try:
+            with open(compare_path, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as exc:
+            print(f"Error: cannot read baseline {compare_path}: {exc}")
+            return 1
+        rows = compare(results, baseline, threshold)
+        print(f"\nCompared with {compare_path} (threshold {threshold:.0%}, p < {SIGNIFICANCE}):")
+        for row in rows:
+            if "change" not in row:
+                print(f"{row['name']:32} {row['status']}")
+                continue
+            print(
+                f"{row['name']:32} {format_time(row['median']):>12} vs "
+                f"{format_time(row['baseline']):>12}  {row['change']:+7.1%}  "
+                f"p={row['p_value']:.3f}  {row['status']}"
+            )
+        if any(row["status"] == "slower" for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
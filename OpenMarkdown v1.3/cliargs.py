@@ -0,0 +1,25 @@
+# cliargs.py
+
+import sys
+from typing import List, Optional
+
+
+# Shared by the command line tools. Kept free of other imports so the
+# headless CLI can use it without paying for anything else.
+def pop_option(args: List[str], name: str) -> Optional[str]:
+    if name not in args:
+        return None
+    i = args.index(name)
+    if i + 1 >= len(args):
+        print(f"Error: {name} requires a value")
+        sys.exit(1)
+    value = args[i + 1]
+    del args[i:i + 2]
+    return value
+
+
+def pop_flag(args: List[str], name: str) -> bool:
+    if name not in args:
+        return False
+    args.remove(name)
+    return True
@@ -0,0 +1,48 @@
+# client.py
+
+import json
+import os
+import socket
+from typing import Dict, Any, Optional, Tuple
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+# Talks to daemon.py with a bare HTTP/1.0 exchange over a socket. urllib would
+# cost more to import than the daemon takes to render a small document.
+def daemon_port(port: Optional[str] = None) -> int:
+    return int(port or os.environ.get("OMD_DAEMON_PORT") or DEFAULT_PORT)
+
+
+def call(port: int, path: str, payload: Optional[Dict[str, Any]] = None) -> Tuple[int, bytes]:
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    method = "POST" if payload is not None or path == "/shutdown" else "GET"
+    head = (
+        f"{method} {path} HTTP/1.0\r\n"
+        f"Host: {DEFAULT_HOST}:{port}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    )
+    chunks = []
+    with socket.create_connection((DEFAULT_HOST, port)) as sock:
+        sock.sendall(head.encode("ascii") + body)
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+    header, _, content = b"".join(chunks).partition(b"\r\n\r\n")
+    try:
+        status = int(header.split(b" ", 2)[1])
+    except (IndexError, ValueError):
+        raise OSError("malformed response from render daemon")
+    return status, content
+
+
+def error_message(content: bytes) -> str:
+    try:
+        return json.loads(content).get("error", "request failed")
+    except (ValueError, AttributeError):
+        return "request failed"
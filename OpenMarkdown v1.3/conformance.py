@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# conformance.py
+
+import copy
+import difflib
+import importlib
+import importlib.util
+import json
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import engine
+import log_utils
+from cliargs import pop_flag, pop_option
+from index import iter_omd_files
+from parser import OpenMarkdownError
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(HERE, "conformance")
+# The 1.3 parser and render modules as first released. The live modules are
+# what engine.py runs, so they cannot serve as their own reference.
+REFERENCE_DIR = os.path.join(CORPUS_DIR, "reference")
+VERSIONS = ["1.0", "1.1", "1.2", "1.3"]
+VERSION_LINE_RE = re.compile(r"^(OpenMarkdown-Version:[ \t]*)\S*", re.M)
+MAX_DIFF_LINES = 40
+
+_references: Dict[str, Dict[str, Any]] = {}
+
+
+# ---------------------------
+# Implementations
+# ---------------------------
+# An implementation is a dict with "name", "parse" (text, source_path) -> AST,
+# "render" (AST) -> HTML and "error", the exception class parse raises.
+def version_dir(version: str) -> str:
+    if version == engine.LATEST_VERSION:
+        return HERE
+    return os.path.join(os.path.dirname(HERE), f"OpenMarkdown v{version}")
+
+
+def load_module(name: str, path: str) -> Any:
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def reference(version: str) -> Dict[str, Any]:
+    # Every version folder ships modules called parser and render, so the
+    # references are loaded under private names next to the live modules.
+    if version not in _references:
+        latest = version == engine.LATEST_VERSION
+        prefix = "omd_v" + version.replace(".", "_")
+        folder = REFERENCE_DIR if latest else version_dir(version)
+        parser_module = load_module(f"{prefix}_parser", os.path.join(folder, "parser.py"))
+        render_module = load_module(f"{prefix}_render", os.path.join(folder, "render.py"))
+
+        def parse(text: str, source_path: Optional[str]) -> Dict[str, Any]:
+            if latest:
+                return parser_module.parse_openmarkdown_v1(text, source_path=source_path)
+            return parser_module.parse_openmarkdown_v1(text)
+
+        _references[version] = {
+            "name": f"reference {version}",
+            "parse": parse,
+            "render": render_module.render_html,
+            "error": parser_module.OpenMarkdownError,
+        }
+    return _references[version]
+
+
+def reference_for(text: str) -> Dict[str, Any]:
+    version = engine.sniff_version(text.replace("\r\n", "\n").replace("\r", "\n").splitlines())
+    return reference(version if version in VERSIONS else engine.LATEST_VERSION)
+
+
+def candidate(module_name: str) -> Dict[str, Any]:
+    # Any module exposing parse_document(text, source_path) and
+    # render_html(ast) can be checked; engine.py is the default.
+    module = importlib.import_module(module_name)
+    return {
+        "name": module_name,
+        "parse": lambda text, source_path: module.parse_document(text, source_path=source_path),
+        "render": module.render_html,
+        "error": getattr(module, "OpenMarkdownError", OpenMarkdownError),
+    }
+
+
+# ---------------------------
+# Cases
+# ---------------------------
+def retarget(text: str, version: str) -> str:
+    return VERSION_LINE_RE.sub(lambda m: m.group(1) + version, text, count=1)
+
+
+def declared_version(text: str) -> Optional[str]:
+    m = VERSION_LINE_RE.search(text)
+    return m.group(0).split(":", 1)[1].strip() if m else None
+
+
+def default_sources() -> List[str]:
+    sources = [CORPUS_DIR]
+    for version in VERSIONS:
+        example = os.path.join(version_dir(version), "example.omd")
+        if os.path.isfile(example):
+            sources.append(example)
+    return sources
+
+
+def iter_cases(sources: List[str]) -> Iterator[Tuple[str, str, str]]:
+    # Each document is checked as written and retargeted to every other
+    # version, so one corpus exercises all feature tables.
+    for path in iter_omd_files(sources):
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        own = declared_version(text)
+        yield f"{path}@{own}", path, text
+        for version in VERSIONS:
+            if version != own:
+                yield f"{path}@{version}", path, retarget(text, version)
+
+
+INLINE_ATOMS = [
+    "*", "**", "`", "``", "=", "==", "~", "$", "$$", "\\", " ", " ", "word",
+    "x y", "[", "]", "(", ")", "![", "](", "{50%}", "<#", "#>",
+]
+BLOCK_STARTS = [
+    "", "", "", "text", "# ", "## ", "---", "> ", "> [Note]{color: tip}",
+    "| a | b |", "|---|---|", "```", "```python", "$$", "- ", "  - ", "    - ",
+    "- [x] ", "- [ ] ", "1. ", "2. ", "  1. ", "-bad", "   - ", "#* ", "<# note #>",
+]
+
+
+def random_document(rng: random.Random) -> str:
+    def inline() -> str:
+        return "".join(rng.choice(INLINE_ATOMS) for _ in range(rng.randint(0, 24)))
+
+    body = []
+    for _ in range(rng.randint(1, 16)):
+        start = rng.choice(BLOCK_STARTS)
+        body.append(start + (inline() if rng.random() < 0.7 else ""))
+    title = rng.choice(["#* Title\n", "#* " + inline() + "\n", "", "\n#* Late title\n"])
+    version = rng.choice(VERSIONS)
+    return f"---\nOpenMarkdown-Version: {version}\n---\n" + title + "\n".join(body) + "\n"
+
+
+def generated_cases(count: int, seed: int) -> Iterator[Tuple[str, str, str]]:
+    # Random mixes of block starts and inline markers; most of them hit error
+    # paths and edge cases that hand-written documents never reach.
+    rng = random.Random(seed)
+    source_path = os.path.join(CORPUS_DIR, "generated.omd")
+    for i in range(count):
+        text = random_document(rng)
+        yield f"generated:{seed}:{i}@{declared_version(text)}", source_path, text
+
+
+# ---------------------------
+# Running and comparing
+# ---------------------------
+def run(
+    impl: Dict[str, Any],
+    text: str,
+    source_path: str,
+    repeat: int = 1,
+) -> Dict[str, Any]:
+    # Returns the serialized outputs and the best parse and render times.
+    result: Dict[str, Any] = {"ast": None, "error": None, "html": None}
+    ast = None
+    parse_times = []
+    render_times = []
+    # The 1.3 modules report progress steps; keep them out of the report.
+    with log_utils.reporting(log_utils.QuietReporter()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            try:
+                ast = impl["parse"](text, source_path)
+            except impl["error"] as exc:
+                result["error"] = str(exc)
+            parse_times.append(time.perf_counter() - start)
+        if ast is not None:
+            result["ast"] = json.dumps(ast, indent=2)
+            for _ in range(repeat):
+                # Rendering rewrites local image urls in place.
+                tree = copy.deepcopy(ast)
+                start = time.perf_counter()
+                result["html"] = impl["render"](tree)
+                render_times.append(time.perf_counter() - start)
+    result["parse_seconds"] = min(parse_times)
+    result["render_seconds"] = min(render_times) if render_times else 0.0
+    return result
+
+
+def peak_memory(impl: Dict[str, Any], text: str, source_path: str) -> int:
+    # A separate pass, since tracing allocations distorts the timings.
+    tracemalloc.start()
+    try:
+        with log_utils.reporting(log_utils.QuietReporter()):
+            try:
+                ast = impl["parse"](text, source_path)
+                impl["render"](ast)
+            except impl["error"]:
+                pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def unified_diff(expected: Optional[str], actual: Optional[str], label: str) -> List[str]:
+    lines = list(difflib.unified_diff(
+        (expected or "").splitlines(),
+        (actual or "").splitlines(),
+        f"reference/{label}",
+        f"candidate/{label}",
+        lineterm="",
+    ))
+    if len(lines) > MAX_DIFF_LINES:
+        lines = lines[:MAX_DIFF_LINES] + [f"... {len(lines) - MAX_DIFF_LINES} more lines"]
+    return lines
+
+
+def check_case(
+    name: str,
+    text: str,
+    source_path: str,
+    impl: Dict[str, Any],
+    repeat: int = 1,
+    timing: bool = True,
+) -> Dict[str, Any]:
+    ref = reference_for(text)
+    expected = run(ref, text, source_path, repeat)
+    actual = run(impl, text, source_path, repeat)
+    diff: Dict[str, List[str]] = {}
+    for key in ("error", "ast", "html"):
+        if expected[key] != actual[key]:
+            diff[key] = unified_diff(expected[key], actual[key], key)
+    record: Dict[str, Any] = {
+        "name": name,
+        "path": source_path,
+        "version": ref["name"].split()[-1],
+        "bytes": len(text.encode("utf-8")),
+        "identical": not diff,
+        "diff": diff,
+    }
+    if timing:
+        for label, impl_used, result in (("reference", ref, expected), ("candidate", impl, actual)):
+            record[label] = {
+                "parse_seconds": result["parse_seconds"],
+                "render_seconds": result["render_seconds"],
+                "peak_bytes": peak_memory(impl_used, text, source_path),
+            }
+    return record
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {
+        "cases": len(records),
+        "identical": sum(1 for r in records if r["identical"]),
+    }
+    summary["different"] = summary["cases"] - summary["identical"]
+    for label in ("reference", "candidate"):
+        timed = [r[label] for r in records if label in r]
+        if timed:
+            summary[label] = {
+                "parse_seconds": sum(t["parse_seconds"] for t in timed),
+                "render_seconds": sum(t["render_seconds"] for t in timed),
+                "max_peak_bytes": max(t["peak_bytes"] for t in timed),
+            }
+    return summary
+
+
+def format_ms(seconds: float) -> str:
+    return f"{seconds * 1000:.2f} ms"
+
+
+def format_kb(size: int) -> str:
+    return f"{size / 1024:.0f} KB"
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def usage() -> None:
+    print(
+        "Usage:\n"
+        "  python3 conformance.py [DIR_OR_FILE ...] [--impl engine] [--generate N]\n"
+        "                         [--seed 0] [--repeat 1] [--no-timing] [--diff]\n"
+        "                         [--verbose] [--json report.json]\n"
+        "Without files the bundled corpus and every version's example.omd are checked."
+    )
+
+
+def main(argv: List[str]) -> int:
+    args = list(argv)
+    if pop_flag(args, "-h") or pop_flag(args, "--help"):
+        usage()
+        return 0
+    impl_name = pop_option(args, "--impl") or "engine"
+    generate = pop_option(args, "--generate")
+    seed = pop_option(args, "--seed")
+    repeat = pop_option(args, "--repeat")
+    report_path = pop_option(args, "--json")
+    timing = not pop_flag(args, "--no-timing")
+    show_diff = pop_flag(args, "--diff")
+    verbose = pop_flag(args, "--verbose")
+    if any(arg.startswith("--") for arg in args):
+        usage()
+        return 1
+    try:
+        generate_count = int(generate or 0)
+        seed_value = int(seed or 0)
+        repeat_count = max(1, int(repeat or 1))
+    except ValueError:
+        print("Error: --generate, --seed and --repeat must be numbers")
+        return 1
+
+    impl = candidate(impl_name)
+    cases: List[Tuple[str, str, str]] = []
+    if args or not generate_count:
+        cases.extend(iter_cases(args or default_sources()))
+    cases.extend(generated_cases(generate_count, seed_value))
+
+    records = []
+    for name, path, text in cases:
+        record = check_case(name, text, path, impl, repeat_count, timing)
+        records.append(record)
+        if not record["identical"]:
+            print(f"FAIL {name}")
+            for key, lines in record["diff"].items():
+                if show_diff:
+                    for line in lines:
+                        print(f"    {line}")
+                else:
+                    print(f"    {key} differs")
+        elif verbose and timing:
+            ref, cand = record["reference"], record["candidate"]
+            ref_total = ref["parse_seconds"] + ref["render_seconds"]
+            cand_total = cand["parse_seconds"] + cand["render_seconds"]
+            print(
+                f"ok   {name}  reference {format_ms(ref_total)} / {format_kb(ref['peak_bytes'])}"
+                f"  {impl_name} {format_ms(cand_total)} / {format_kb(cand['peak_bytes'])}"
+            )
+
+    summary = summarize(records)
+    print(
+        f"{summary['cases']} cases, {summary['identical']} identical, "
+        f"{summary['different']} different"
+    )
+    if timing and records:
+        for label, title in (("reference", "reference"), ("candidate", impl_name)):
+            s = summary[label]
+            print(
+                f"  {title}: parse {format_ms(s['parse_seconds'])}, "
+                f"render {format_ms(s['render_seconds'])}, "
+                f"peak {format_kb(s['max_peak_bytes'])}"
+            )
+
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"candidate": impl_name, "repeat": repeat_count, "summary": summary, "cases": records},
+                f,
+                indent=2,
+            )
+        print(f"Wrote report: {report_path}")
+    return 1 if summary["different"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
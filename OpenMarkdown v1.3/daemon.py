@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# daemon.py
+
+import hashlib
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+
+import instrument
+from cliargs import pop_flag, pop_option
+from client import DEFAULT_HOST, call, daemon_port
+
+
+DEFAULT_CACHE = 256
+KINDS = ["parse", "html", "pdf"]
+
+
+# ---------------------------
+# Worker processes
+# ---------------------------
+# Parsing and rendering are CPU bound, so they run in a process pool. Each
+# worker imports the parser and renderer once and reuses the compiled patterns
+# and lookup tables for every job it gets. Under --trace each job hands its
+# spans back with the result.
+def warm_worker(settings: Tuple[bool, bool, bool]) -> None:
+    import log_utils
+
+    log_utils.set_reporter(log_utils.QuietReporter())
+    instrument.init_worker(settings)
+    import parser  # noqa: F401
+    import render  # noqa: F401
+
+
+def run_job(kind: str, text: str, source_path: Optional[str], css: Optional[str]) -> Dict[str, Any]:
+    result = render_job(kind, text, source_path, css)
+    result["instrument"] = instrument.take_report()
+    return result
+
+
+def render_job(kind: str, text: str, source_path: Optional[str], css: Optional[str]) -> Dict[str, Any]:
+    from parser import OpenMarkdownError, parse_openmarkdown_v1
+    from render import render_html
+
+    try:
+        ast = parse_openmarkdown_v1(text, source_path=source_path)
+    except OpenMarkdownError as exc:
+        return {"error": str(exc), "line": exc.line_no}
+    if kind == "parse":
+        return {"ast": ast}
+    if kind == "html":
+        return {"html": render_html(ast, css=css)}
+    return {
+        "html": render_html(ast, css=css, inline_local_images=True),
+        "meta": ast.get("meta"),
+        "title": ast.get("title"),
+    }
+
+
+# ---------------------------
+# Browser pool
+# ---------------------------
+# Playwright's sync API is bound to the thread that started it, so every
+# browser lives on its own thread and takes jobs from a shared queue. Browsers
+# are launched on first use and relaunched if they die.
+class BrowserPool:
+    def __init__(self, size: int) -> None:
+        self.jobs: "queue.Queue[Optional[Tuple[str, Any, Any, Future]]]" = queue.Queue()
+        self.threads = [
+            threading.Thread(target=self.run, name=f"browser-{i}", daemon=True)
+            for i in range(size)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, html_content: str, meta: Optional[Dict[str, Any]], title: Optional[str]) -> Future:
+        future: Future = Future()
+        self.jobs.put((html_content, meta, title, future))
+        return future
+
+    def run(self) -> None:
+        playwright = None
+        browser = None
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            html_content, meta, title, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if browser is None or not browser.is_connected():
+                    from playwright.sync_api import sync_playwright
+
+                    if playwright is None:
+                        playwright = sync_playwright().start()
+                    browser = playwright.chromium.launch()
+                future.set_result(self.print_pdf(browser, html_content, meta, title))
+            except BaseException as exc:
+                future.set_exception(exc)
+        if browser is not None:
+            browser.close()
+        if playwright is not None:
+            playwright.stop()
+
+    def print_pdf(
+        self,
+        browser: Any,
+        html_content: str,
+        meta: Optional[Dict[str, Any]],
+        title: Optional[str],
+    ) -> bytes:
+        from render import print_page, set_pdf_metadata
+
+        fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        try:
+            print_page(browser, html_content, tmp_path)
+            set_pdf_metadata(tmp_path, meta=meta, title=title)
+            with open(tmp_path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(tmp_path)
+
+    def close(self) -> None:
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join(timeout=10)
+
+
+# ---------------------------
+# Result cache
+# ---------------------------
+class ResultCache:
+    # LRU of finished parse and HTML responses keyed by everything that goes
+    # into them. PDFs embed image files and are always rendered afresh.
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.entries: "OrderedDict[str, Tuple[int, str, bytes]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[int, str, bytes]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: Tuple[int, str, bytes]) -> None:
+        if self.size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+def cache_key(kind: str, text: str, source_path: Optional[str], css: Optional[str]) -> str:
+    data = json.dumps([kind, text, source_path, css], ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+# ---------------------------
+# Server
+# ---------------------------
+def json_response(status: int, data: Any) -> Tuple[int, str, bytes]:
+    return status, "application/json", (json.dumps(data, indent=2) + "\n").encode("utf-8")
+
+
+class RenderDaemon:
+    def __init__(self, workers: int, browsers: int, cache_size: int) -> None:
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=warm_worker,
+            initargs=(instrument.worker_settings(),),
+        )
+        self.browsers = BrowserPool(browsers)
+        self.cache = ResultCache(cache_size)
+        self.workers = workers
+        self.stats = {"jobs": 0, "cache_hits": 0, "errors": 0}
+        self.lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.stats[name] += 1
+
+    def status(self) -> Dict[str, Any]:
+        with self.lock:
+            stats = dict(self.stats)
+        stats.update({
+            "pid": os.getpid(),
+            "workers": self.workers,
+            "browsers": len(self.browsers.threads),
+            "cached": len(self.cache.entries),
+        })
+        return stats
+
+    def handle(self, kind: str, request: Dict[str, Any]) -> Tuple[int, str, bytes]:
+        text = request.get("text")
+        source_path = request.get("source_path")
+        css = request.get("css")
+        if not isinstance(text, str):
+            return json_response(400, {"error": "request needs a \"text\" string"})
+        self.count("jobs")
+
+        key = cache_key(kind, text, source_path, css)
+        if kind != "pdf":
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.count("cache_hits")
+                return cached
+
+        result = self.pool.submit(run_job, kind, text, source_path, css).result()
+        instrument.merge_report(result.pop("instrument"))
+        if "error" in result:
+            self.count("errors")
+            response = json_response(422, result)
+        elif kind == "parse":
+            response = json_response(200, result["ast"])
+        elif kind == "html":
+            response = (200, "text/html; charset=utf-8", result["html"].encode("utf-8"))
+        else:
+            try:
+                pdf = self.browsers.submit(result["html"], result["meta"], result["title"]).result()
+            except ImportError as exc:
+                self.count("errors")
+                return json_response(500, {"error": f"PDF export needs Playwright ({exc})"})
+            return 200, "application/pdf", pdf
+
+        self.cache.put(key, response)
+        return response
+
+    def close(self) -> None:
+        self.browsers.close()
+        self.pool.shutdown(cancel_futures=True)
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: "DaemonServer"
+
+    def send(self, response: Tuple[int, str, bytes]) -> None:
+        status, content_type, body = response
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path == "/status":
+            self.send(json_response(200, self.server.daemon.status()))
+        else:
+            self.send(json_response(404, {"error": f"unknown path {self.path}"}))
+
+    def do_POST(self) -> None:
+        kind = self.path.strip("/")
+        if kind == "shutdown":
+            self.send(json_response(200, {"stopping": True}))
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        if kind not in KINDS:
+            self.send(json_response(404, {"error": f"unknown path {self.path}"}))
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send(json_response(400, {"error": "request body must be JSON"}))
+            return
+        if not isinstance(request, dict):
+            self.send(json_response(400, {"error": "request body must be a JSON object"}))
+            return
+        try:
+            response = self.server.daemon.handle(kind, request)
+        except Exception as exc:
+            self.server.daemon.count("errors")
+            response = json_response(500, {"error": f"{type(exc).__name__}: {exc}"})
+        self.send(response)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if self.server.verbose:
+            sys.stderr.write(f"{self.address_string()} {format % args}\n")
+
+
+class DaemonServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], daemon: RenderDaemon, verbose: bool) -> None:
+        super().__init__(address, Handler)
+        self.daemon = daemon
+        self.verbose = verbose
+
+
+def serve(
+    port: int,
+    workers: int,
+    browsers: int,
+    cache_size: int,
+    verbose: bool,
+    trace_path: Optional[str] = None,
+) -> int:
+    daemon = RenderDaemon(workers, browsers, cache_size)
+    try:
+        server = DaemonServer((DEFAULT_HOST, port), daemon, verbose)
+    except OSError as exc:
+        daemon.close()
+        print(f"Error: cannot listen on {DEFAULT_HOST}:{port}: {exc.strerror}", file=sys.stderr)
+        return 1
+    print(f"Render daemon on http://{DEFAULT_HOST}:{port} ({workers} workers, {browsers} browsers)")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.close()
+        if trace_path:
+            instrument.write_trace(trace_path)
+    return 0
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def usage() -> None:
+    print(
+        "Usage:\n"
+        "  python3 daemon.py serve [--port 8765] [--workers N] [--browsers N] [--cache 256] [--verbose]\n"
+        "                         [--trace trace.json]\n"
+        "  python3 daemon.py status [--port 8765]\n"
+        "  python3 daemon.py stop [--port 8765]\n"
+        "Send documents with: python3 omd.py render in.omd -o out.html --daemon [--port 8765]"
+    )
+
+
+def main(argv: List[str]) -> int:
+    if not argv:
+        usage()
+        return 1
+    command, args = argv[0], list(argv[1:])
+    try:
+        port = daemon_port(pop_option(args, "--port"))
+        workers = int(pop_option(args, "--workers") or os.cpu_count() or 1)
+        browsers = int(pop_option(args, "--browsers") or 1)
+        cache_size = int(pop_option(args, "--cache") or DEFAULT_CACHE)
+    except ValueError:
+        print("Error: --port, --workers, --browsers and --cache must be numbers")
+        return 1
+    verbose = pop_flag(args, "--verbose")
+    trace_path = instrument.pop_trace_arg(args)
+    if args:
+        usage()
+        return 1
+
+    if command == "serve":
+        return serve(port, max(1, workers), max(1, browsers), cache_size, verbose, trace_path)
+    if command in {"status", "stop"}:
+        try:
+            status, body = call(port, "/status" if command == "status" else "/shutdown")
+        except OSError as exc:
+            print(f"Error: no render daemon on port {port} ({exc})", file=sys.stderr)
+            return 1
+        sys.stdout.write(body.decode("utf-8"))
+        return 0 if status == 200 else 1
+    usage()
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
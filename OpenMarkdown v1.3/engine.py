@@ -0,0 +1,922 @@
+#!/usr/bin/env python3
+# engine.py
+
+import json
+import os
+import re
+import sys
+from typing import Dict, Any, List, Optional, Tuple
+
+from parser import (
+    HEADING_RE,
+    HR_RE,
+    MATH_LINE_RE,
+    OpenMarkdownError,
+    find_code_span,
+    is_table_separator,
+    split_table_row,
+    strip_comments,
+    syntax_error,
+    validate_inline_syntax,
+)
+from render import esc, inline_file_images, render_inline, resolve_local_images
+
+
+LATEST_VERSION = "1.3"
+
+# What each language version supports. The parser and renderer below branch
+# on these flags only, so every version shares one implementation.
+VERSION_FEATURES: Dict[str, Dict[str, Any]] = {
+    "1.0": {
+        # `code` is an ordinary regex pattern; no backtick runs, no escapes.
+        "code_runs": False,
+        "escapes": False,
+        "image_width": False,
+        # Every "#* " line in the body sets the title; the last one wins.
+        "title": "any_line",
+        # Syntax errors carry line numbers and inline markup is validated.
+        "line_numbers": False,
+        "nested_lists": False,
+        "ordered_lists": False,
+        "space_cancel": False,
+        "comments": False,
+        "header_meta": False,
+        "local_images": False,
+        "callouts": "plain",
+    },
+    "1.1": {
+        "code_runs": True,
+        "escapes": True,
+        "image_width": True,
+        # The first line starting with "#*" (after indentation) is the title;
+        # body lines before it are skipped.
+        "title": "first_marker",
+        "line_numbers": False,
+        "nested_lists": False,
+        "ordered_lists": False,
+        "space_cancel": False,
+        "comments": False,
+        "header_meta": False,
+        "local_images": False,
+        "callouts": "alert",
+    },
+    "1.2": {
+        "code_runs": True,
+        "escapes": True,
+        "image_width": True,
+        # The title must be the line right after the header.
+        "title": "header_line",
+        "line_numbers": True,
+        "nested_lists": True,
+        "ordered_lists": False,
+        "space_cancel": False,
+        "comments": False,
+        "header_meta": False,
+        "local_images": False,
+        "callouts": "alert",
+    },
+    "1.3": {
+        "code_runs": True,
+        "escapes": True,
+        "image_width": True,
+        "title": "header_line",
+        "line_numbers": True,
+        "nested_lists": True,
+        "ordered_lists": True,
+        "space_cancel": True,
+        "comments": True,
+        "header_meta": True,
+        "local_images": True,
+        "callouts": "alert",
+    },
+}
+
+_tables: Dict[str, Dict[str, Any]] = {}
+
+
+def inline_patterns(features: Dict[str, Any]) -> List[Tuple[str, Any, bool]]:
+    # (kind, pattern, has_lookbehind) in the reference priority order.
+    if features["image_width"]:
+        image = r"!\[([^\]]*)\]\(([^)]+)\)(?:\{([0-9]+(?:\.[0-9]+)?)%\})?"
+    else:
+        image = r"!\[([^\]]*)\]\(([^)]+)\)"
+    if features["space_cancel"]:
+        sources = [
+            ("math_inline", r"\$(?!\s)(.+?)\$"),
+            ("link", r"\[([^\]]+)\]\(([^)]+)\)"),
+            ("bold", r"\*\*(?!\s)(.+?)\*\*"),
+            ("italic", r"\*(?![\s*])(.+?)\*"),
+            ("highlight", r"==(?!\s)(.+?)=="),
+            ("strike", r"~(?!\s)(.+?)~"),
+        ]
+    else:
+        sources = [
+            ("math_inline", r"\$(.+?)\$"),
+            ("link", r"\[([^\]]+)\]\(([^)]+)\)"),
+            ("bold", r"\*\*(.+?)\*\*"),
+            ("italic", r"\*(.+?)\*"),
+            ("highlight", r"==(.+?)=="),
+            ("strike", r"~(.+?)~"),
+        ]
+    if not features["code_runs"]:
+        sources.insert(2, ("code", r"(?<!`)`(.+?)`(?!`)"))
+    sources.insert(0, ("image", image))
+    return [(kind, re.compile(src), "(?<!" in src) for kind, src in sources]
+
+
+def feature_table(version: str) -> Dict[str, Any]:
+    # Tables (and their compiled patterns) are only built for versions that
+    # actually show up.
+    table = _tables.get(version)
+    if table is None:
+        table = dict(VERSION_FEATURES[version])
+        table["version"] = version
+        table["inline_patterns"] = inline_patterns(table)
+        _tables[version] = table
+    return table
+
+
+def fail(features: Dict[str, Any], message: str, line_no: Optional[int] = None) -> OpenMarkdownError:
+    if features["line_numbers"]:
+        return syntax_error(message, line_no)
+    return OpenMarkdownError(message)
+
+
+# ---------------------------
+# Inline parsing
+# ---------------------------
+def parse_inline(
+    text: str,
+    line_no: Optional[int],
+    features: Dict[str, Any],
+) -> List[Dict[str, Any]]:
+    if features["line_numbers"]:
+        validate_inline_syntax(text, line_no, features["space_cancel"])
+    nodes: List[Dict[str, Any]] = []
+    patterns = features["inline_patterns"]
+    escapes = features["escapes"]
+    code_runs = features["code_runs"]
+
+    # The reference parsers rescan the remaining text for every node. Here
+    # each search result is kept until the cursor passes its start: nothing
+    # between the cursor and a cached hit can match, or the earlier search
+    # would have found it. Right after a backtick the references see a fresh
+    # string start (lookbehinds and backtick runs change), so those rescan.
+    n = len(text)
+    pos = 0
+    hits: List[Any] = [None] * len(patterns)
+    escape_idx: Optional[int] = None
+    span: Any = None
+
+    while pos < n:
+        fresh = pos > 0 and text[pos - 1] == "`"
+
+        if escapes and (escape_idx is None or -1 < escape_idx < pos):
+            escape_idx = text.find("\\", pos)
+        if code_runs and (span is None or fresh or (span and span["start"] < pos)):
+            tick = text.find("`", pos)
+            found = find_code_span(text[tick:]) if tick != -1 else None
+            if found:
+                found["start"] += tick
+                found["end"] += tick
+            span = found or False
+
+        earliest: Any = None
+        earliest_kind = None
+        for k, (kind, pat, lookbehind) in enumerate(patterns):
+            hit = hits[k]
+            if lookbehind and fresh:
+                m = pat.search(text[pos:])
+                hit = (m.start() + pos, m.end() + pos, m.groups()) if m else False
+                hits[k] = hit
+            elif hit is None or (hit and hit[0] < pos):
+                m = pat.search(text, pos)
+                hit = (m.start(), m.end(), m.groups()) if m else False
+                hits[k] = hit
+            if hit and (earliest is None or hit[0] < earliest[0]):
+                earliest = hit
+                earliest_kind = kind
+
+        if (
+            escapes
+            and escape_idx != -1
+            and (earliest is None or escape_idx < earliest[0])
+            and (not span or escape_idx < span["start"])
+        ):
+            if escape_idx > pos:
+                nodes.append({"type": "text", "value": text[pos:escape_idx]})
+            if escape_idx + 1 < n:
+                nodes.append({"type": "text", "value": text[escape_idx + 1]})
+                pos = escape_idx + 2
+            else:
+                nodes.append({"type": "text", "value": "\\"})
+                pos = n
+            continue
+
+        if span and (earliest is None or span["start"] < earliest[0]):
+            if span["start"] > pos:
+                nodes.append({"type": "text", "value": text[pos:span["start"]]})
+            nodes.append({"type": "code", "value": span["content"]})
+            pos = span["end"]
+            continue
+
+        if earliest is None:
+            nodes.append({"type": "text", "value": text[pos:]})
+            break
+
+        start, end, groups = earliest
+        if start > pos:
+            nodes.append({"type": "text", "value": text[pos:start]})
+
+        if earliest_kind == "image":
+            node = {
+                "type": "image",
+                "alt": groups[0],
+                "url": groups[1].strip(),
+            }
+            if features["image_width"]:
+                node["width_percent"] = float(groups[2]) if groups[2] else None
+            nodes.append(node)
+        elif earliest_kind == "link":
+            nodes.append({
+                "type": "link",
+                "text": groups[0],
+                "url": groups[1].strip()
+            })
+        elif earliest_kind == "math_inline":
+            nodes.append({
+                "type": "math_inline",
+                "content": groups[0]
+            })
+        else:
+            nodes.append({
+                "type": earliest_kind,
+                "value": groups[0]
+            })
+
+        pos = end
+
+    return nodes
+
+
+# ---------------------------
+# List helpers
+# ---------------------------
+ORDERED_ITEM_RE = re.compile(r"(\d+)\.")
+
+
+def parse_list_line(
+    line: str,
+    line_no: Optional[int],
+    features: Dict[str, Any],
+) -> Optional[Dict[str, Any]]:
+    if not line:
+        return None
+    leading = re.match(r"[ \t]*", line).group(0)
+    indent = len(leading)
+    stripped = line[indent:]
+    if stripped.startswith("-"):
+        if not stripped.startswith("- "):
+            raise syntax_error("List items must use '- '", line_no)
+        list_type = "unordered"
+        content_start = 2
+    else:
+        m = ORDERED_ITEM_RE.match(stripped) if features["ordered_lists"] else None
+        if not m:
+            return None
+        if len(stripped) <= m.end() or stripped[m.end()] != " ":
+            raise syntax_error("Ordered list items must use '1. '", line_no)
+        list_type = "ordered"
+        content_start = m.end() + 1
+    if "\t" in leading:
+        raise syntax_error("List indentation must use spaces only (two spaces per level)", line_no)
+    if indent % 2 != 0:
+        raise syntax_error("List indentation must use two spaces per level", line_no)
+    raw = stripped[content_start:].strip()
+    checkbox = None
+    if list_type == "unordered":
+        if raw.startswith("[x] "):
+            checkbox, raw = True, raw[4:]
+        elif raw.startswith("[ ] "):
+            checkbox, raw = False, raw[4:]
+    return {
+        "indent": indent,
+        "checkbox": checkbox,
+        "content": raw,
+        "list_type": list_type,
+        "line_no": line_no,
+    }
+
+
+def list_node(list_type: str, items: List[Dict[str, Any]], features: Dict[str, Any]) -> Dict[str, Any]:
+    if features["ordered_lists"]:
+        return {"type": "list", "list_type": list_type, "items": items}
+    return {"type": "list", "items": items}
+
+
+def parse_list(
+    lines: List[str],
+    idx: int,
+    base_indent: int,
+    start_line: int,
+    list_type: str,
+    features: Dict[str, Any],
+) -> Tuple[List[Dict[str, Any]], int]:
+    items: List[Dict[str, Any]] = []
+    while idx < len(lines):
+        line = lines[idx]
+        if not line.strip():
+            break
+        info = parse_list_line(line, start_line + idx, features)
+        if not info:
+            break
+        if info["list_type"] != list_type and info["indent"] == base_indent:
+            break
+        indent = info["indent"]
+        if indent < base_indent:
+            break
+        if indent > base_indent:
+            if not items:
+                break
+            nested_items, idx = parse_list(
+                lines,
+                idx,
+                indent,
+                start_line,
+                info["list_type"],
+                features,
+            )
+            if nested_items:
+                items[-1].setdefault("children", []).append(
+                    list_node(info["list_type"], nested_items, features)
+                )
+            continue
+        items.append({
+            "checkbox": info["checkbox"],
+            "content": parse_inline(info["content"], info["line_no"], features)
+        })
+        idx += 1
+    return items, idx
+
+
+def parse_flat_list(
+    lines: List[str],
+    idx: int,
+    features: Dict[str, Any],
+) -> Tuple[List[Dict[str, Any]], int]:
+    items: List[Dict[str, Any]] = []
+    while idx < len(lines) and lines[idx].lstrip().startswith("- "):
+        raw = lines[idx].lstrip()[2:].strip()
+        checkbox = None
+        if raw.startswith("[x] "):
+            checkbox, raw = True, raw[4:]
+        elif raw.startswith("[ ] "):
+            checkbox, raw = False, raw[4:]
+        items.append({
+            "checkbox": checkbox,
+            "content": parse_inline(raw, None, features)
+        })
+        idx += 1
+    return items, idx
+
+
+# ---------------------------
+# Parser
+# ---------------------------
+CALLOUT_RE = re.compile(r"\[([^\]]+)\]\s*\{([^}]+)\}\s*$")
+CALLOUT_COLOR_RE = re.compile(r"(?:^|[;\s])(?:colour|color)\s*:\s*([^;]+)\s*", re.IGNORECASE)
+
+
+def parse_blocks(
+    lines: List[str],
+    features: Dict[str, Any],
+    allow_title: bool = False,
+    start_line: int = 1,
+) -> Dict[str, Any]:
+    children: List[Dict[str, Any]] = []
+    title: Optional[str] = None
+    title_mode = features["title"]
+    idx = 0
+
+    while idx < len(lines):
+        line = lines[idx]
+        line_no = start_line + idx
+
+        if not line.strip():
+            idx += 1
+            continue
+
+        # Title (versions without a fixed title line)
+        if allow_title:
+            if title_mode == "any_line":
+                if line.startswith("#* "):
+                    title = line[3:].strip()
+                    idx += 1
+                    continue
+            elif title is None:
+                # Everything before the title line is dropped.
+                stripped = line.lstrip()
+                if stripped.startswith("#*"):
+                    title = stripped[2:].strip()
+                idx += 1
+                continue
+
+        # Math block $$ ... $$
+        if line.strip() == "$$":
+            idx += 1
+            math = []
+            while idx < len(lines) and lines[idx].strip() != "$$":
+                math.append(lines[idx])
+                idx += 1
+            if idx >= len(lines):
+                raise fail(features, "Unterminated $$ block", line_no)
+            idx += 1
+            children.append({
+                "type": "math_block",
+                "content": "\n".join(math)
+            })
+            continue
+
+        m = MATH_LINE_RE.match(line)
+        if m:
+            children.append({
+                "type": "math_block",
+                "content": m.group(1)
+            })
+            idx += 1
+            continue
+
+        # Heading
+        m = HEADING_RE.match(line)
+        if m:
+            children.append({
+                "type": "heading",
+                "level": len(m.group(1)),
+                "content": parse_inline(m.group(2), line_no, features)
+            })
+            idx += 1
+            continue
+
+        # Horizontal rule
+        if HR_RE.fullmatch(line.strip()):
+            children.append({"type": "hr"})
+            idx += 1
+            continue
+
+        # Blockquote / Callout
+        if line.lstrip().startswith(">"):
+            quote_start = line_no
+            quote_lines = []
+            while idx < len(lines) and lines[idx].lstrip().startswith(">"):
+                raw = lines[idx].lstrip()[1:]
+                quote_lines.append(raw[1:] if raw.startswith(" ") else raw)
+                idx += 1
+            header = quote_lines[0].strip() if quote_lines else ""
+            callout_match = CALLOUT_RE.match(header)
+            if callout_match:
+                color_match = CALLOUT_COLOR_RE.search(callout_match.group(2))
+                if color_match:
+                    callout_title = callout_match.group(1).strip()
+                    color = color_match.group(1).strip()
+                    body_lines = quote_lines[1:]
+                    if body_lines and not body_lines[0].strip():
+                        body_lines = body_lines[1:]
+                    callout_parsed = parse_blocks(
+                        body_lines,
+                        features,
+                        start_line=quote_start + 1,
+                    )
+                    children.append({
+                        "type": "callout",
+                        "title": parse_inline(callout_title, quote_start, features),
+                        "color": color,
+                        "children": callout_parsed["children"],
+                    })
+                    continue
+
+            quote_parsed = parse_blocks(quote_lines, features, start_line=quote_start)
+            children.append({
+                "type": "blockquote",
+                "children": quote_parsed["children"]
+            })
+            continue
+
+        # Table
+        if idx + 1 < len(lines) and "|" in line and is_table_separator(lines[idx + 1]):
+            header_cells = split_table_row(line)
+            idx += 2
+            rows = []
+            while idx < len(lines) and "|" in lines[idx]:
+                rows.append([
+                    parse_inline(c, start_line + idx, features)
+                    for c in split_table_row(lines[idx])
+                ])
+                idx += 1
+            children.append({
+                "type": "table",
+                "header": [parse_inline(c, line_no, features) for c in header_cells],
+                "rows": rows
+            })
+            continue
+
+        # List
+        if features["nested_lists"]:
+            list_info = parse_list_line(line, line_no, features)
+            if list_info:
+                items, idx = parse_list(
+                    lines,
+                    idx,
+                    list_info["indent"],
+                    start_line,
+                    list_info["list_type"],
+                    features,
+                )
+                children.append(list_node(list_info["list_type"], items, features))
+                continue
+        elif line.lstrip().startswith("- "):
+            items, idx = parse_flat_list(lines, idx, features)
+            children.append(list_node("unordered", items, features))
+            continue
+
+        # Code / Mermaid
+        if line.strip().startswith("```"):
+            opening = line.strip()
+            ticks = len(opening) - len(opening.lstrip("`"))
+            info = opening[ticks:].strip().lower()
+            idx += 1
+            code = []
+            while idx < len(lines) and lines[idx].strip() != "`" * ticks:
+                code.append(lines[idx])
+                idx += 1
+            if idx >= len(lines) and features["line_numbers"]:
+                raise syntax_error("Unterminated code block", line_no)
+            idx += 1
+
+            if info == "mermaid":
+                children.append({
+                    "type": "diagram",
+                    "language": "mermaid",
+                    "content": "\n".join(code)
+                })
+            else:
+                children.append({
+                    "type": "code_block",
+                    "language": info if info else None,
+                    "content": "\n".join(code)
+                })
+            continue
+
+        # Paragraph (soft line breaks)
+        para = [line]
+        idx += 1
+        while idx < len(lines) and lines[idx].strip():
+            if lines[idx].strip().startswith("```"):
+                break
+            para.append(lines[idx])
+            idx += 1
+        tight_after = idx < len(lines) and lines[idx].strip().startswith("```")
+
+        nodes = []
+        for i, p in enumerate(para):
+            nodes.extend(parse_inline(p, line_no + i, features))
+            if i < len(para) - 1:
+                nodes.append({"type": "linebreak"})
+
+        children.append({
+            "type": "paragraph",
+            "content": nodes,
+            "tight_after": tight_after,
+        })
+
+    return {"children": children, "title": title}
+
+
+# ---------------------------
+# Documents
+# ---------------------------
+def sniff_version(lines: List[str]) -> Optional[str]:
+    # Reads the declared version without validating the header, so header
+    # errors can be reported in the style of the version that raises them.
+    if not lines or lines[0].strip() != "---":
+        return None
+    version = None
+    for line in lines[1:]:
+        if line.strip() == "---":
+            break
+        if ":" in line:
+            k, v = line.split(":", 1)
+            if k.strip() == "OpenMarkdown-Version":
+                version = v.strip()
+    return version
+
+
+def read_header(lines: List[str], features: Dict[str, Any]) -> Tuple[Dict[str, str], int]:
+    if not lines or lines[0].strip() != "---":
+        raise fail(features, "Missing YAML header", 1)
+    idx = 1
+    header: Dict[str, str] = {}
+    while idx < len(lines) and lines[idx].strip() != "---":
+        if ":" not in lines[idx]:
+            raise fail(features, f"Invalid header line: {lines[idx]}", idx + 1)
+        k, v = lines[idx].split(":", 1)
+        header[k.strip()] = v.strip()
+        idx += 1
+    return header, idx
+
+
+def header_meta(header: Dict[str, str]) -> Dict[str, Any]:
+    author = header.get("author")
+    date = header.get("date")
+    tags = header.get("tags")
+    if author is not None and author.strip() == "":
+        raise syntax_error("Header author cannot be empty")
+    if date is not None and not re.fullmatch(r"\d{1,2}\.\d{1,2}\.\d{4}", date):
+        raise syntax_error("Header date must use D.M.YYYY format (e.g. 1.1.2026)")
+    meta: Dict[str, Any] = {}
+    if author is not None:
+        meta["author"] = author
+    if date is not None:
+        meta["date"] = date
+    if tags is not None:
+        tag_list = [t.strip() for t in tags.split(",") if t.strip()]
+        if not tag_list:
+            raise syntax_error("Header tags cannot be empty")
+        meta["tags"] = tag_list
+    return meta
+
+
+def parse_document(text: str, source_path: Optional[str] = None) -> Dict[str, Any]:
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = text.splitlines()
+    version = sniff_version(lines)
+    if version in VERSION_FEATURES and not VERSION_FEATURES[version]["comments"]:
+        features = feature_table(version)
+    else:
+        # Comments, and anything we do not recognise, follow the latest rules.
+        features = feature_table(LATEST_VERSION)
+        lines = strip_comments(text).splitlines()
+
+    header, idx = read_header(lines, features)
+    if header.get("OpenMarkdown-Version") != features["version"]:
+        raise fail(features, "Unsupported OpenMarkdownVersion")
+    meta = header_meta(header) if features["header_meta"] else {}
+    idx += 1
+
+    if features["title"] == "header_line":
+        if idx >= len(lines):
+            raise syntax_error("Missing document title", idx + 1)
+        title_line = lines[idx]
+        if not title_line.startswith("#* "):
+            raise syntax_error("Document title must be the first line after the header", idx + 1)
+        title = title_line[3:].strip()
+        idx += 1
+        parsed = parse_blocks(lines[idx:], features, start_line=idx + 1)
+    else:
+        parsed = parse_blocks(lines[idx:], features, allow_title=True)
+        title = parsed["title"]
+
+    ast = {
+        "type": "document",
+        "version": features["version"],
+        "title": title,
+        "children": parsed["children"],
+    }
+    if features["header_meta"]:
+        if source_path:
+            meta["base_dir"] = os.path.dirname(os.path.abspath(source_path))
+        if meta:
+            ast["meta"] = meta
+
+    if not ast["title"]:
+        raise fail(features, "Missing document title", idx)
+
+    return ast
+
+
+# ---------------------------
+# Rendering
+# ---------------------------
+ALERT_CLASSES = {
+    "info": "md-alert-info",
+    "note": "md-alert-note",
+    "tip": "md-alert-tip",
+    "warning": "md-alert-warning",
+    "danger": "md-alert-danger",
+    "important": "md-alert-important",
+    "caution": "md-alert-caution",
+}
+
+
+def render_callout(n: Dict[str, Any], features: Dict[str, Any]) -> str:
+    title_html = render_inline(n.get("title", []))
+    color = n.get("color", "").strip()
+    inner = ""
+    if n.get("children"):
+        inner = "\n".join(render_blocks(n["children"], features))
+
+    if features["callouts"] == "plain":
+        style = f' style="--callout-color: {esc(color)};"' if color else ""
+        if inner:
+            inner = f"<div class=\"callout-body\">{inner}</div>"
+        return (
+            f"<div class=\"callout\"{style}>"
+            f"<div class=\"callout-title\">{title_html}</div>"
+            f"{inner}</div>"
+        )
+
+    classes = ["md-alert"]
+    if color and color.lower() in ALERT_CLASSES:
+        classes.append(ALERT_CLASSES[color.lower()])
+    style = ""
+    if color and len(classes) == 1:
+        style = f' style="--callout-color: {esc(color)};"'
+    return (
+        f"<div class=\"{' '.join(classes)}\"{style}>"
+        f"<p><strong>{title_html}</strong></p>"
+        f"{inner}</div>"
+    )
+
+
+def render_list_items(
+    items: List[Dict[str, Any]],
+    list_type: str,
+    features: Dict[str, Any],
+) -> str:
+    rendered_items = []
+    for it in items:
+        content = render_inline(it["content"])
+        nested = ""
+        if it.get("children"):
+            nested = "".join(render_blocks(it["children"], features))
+        if it["checkbox"] is True or it["checkbox"] is False:
+            checked = " checked" if it["checkbox"] else ""
+            rendered_items.append(
+                "<li class=\"task-list-item\">"
+                f"<input type=\"checkbox\" disabled{checked}> "
+                f"{content}"
+                f"{nested}</li>"
+            )
+        else:
+            rendered_items.append(f"<li>{content}{nested}</li>")
+    tag = "ol" if list_type == "ordered" else "ul"
+    return f"<{tag}>{''.join(rendered_items)}</{tag}>"
+
+
+def render_blocks(nodes: List[Dict[str, Any]], features: Dict[str, Any]) -> List[str]:
+    body: List[str] = []
+
+    for n in nodes:
+        t = n["type"]
+
+        if t == "heading":
+            lvl = min(n["level"] + 1, 6)
+            body.append(f"<h{lvl}>{render_inline(n['content'])}</h{lvl}>")
+
+        elif t == "paragraph":
+            extra_class = " class=\"tight-after\"" if n.get("tight_after") else ""
+            body.append(f"<p{extra_class}>{render_inline(n['content'])}</p>")
+
+        elif t == "blockquote":
+            if "children" in n:
+                inner = "\n".join(render_blocks(n["children"], features))
+                body.append(f"<blockquote>{inner}</blockquote>")
+            else:
+                body.append(f"<blockquote>{render_inline(n['content'])}</blockquote>")
+
+        elif t == "callout":
+            body.append(render_callout(n, features))
+
+        elif t == "list":
+            body.append(render_list_items(
+                n["items"],
+                n.get("list_type", "unordered"),
+                features,
+            ))
+
+        elif t == "table":
+            head = "".join(f"<th>{render_inline(c)}</th>" for c in n["header"])
+            rows = []
+            for r in n["rows"]:
+                rows.append("<tr>" + "".join(f"<td>{render_inline(c)}</td>" for c in r) + "</tr>")
+            body.append(f"<table><thead><tr>{head}</tr></thead><tbody>{''.join(rows)}</tbody></table>")
+
+        elif t == "code_block":
+            lang = n.get("language")
+            lang_attr = f' lang="{esc(lang)}"' if lang else ""
+            body.append(f"<pre class=\"md-fences\"{lang_attr}><code>{esc(n['content'])}</code></pre>")
+
+        elif t == "math_block":
+            body.append(f"<div class='math'>\\[{n['content']}\\]</div>")
+
+        elif t == "diagram":
+            body.append(f"<pre class='mermaid'>{esc(n['content'])}</pre>")
+
+        elif t == "hr":
+            body.append("<hr>")
+
+    return body
+
+
+def render_html(
+    ast: Dict[str, Any],
+    css: Optional[str] = None,
+    inline_local_images: bool = False,
+) -> str:
+    version = ast.get("version")
+    features = feature_table(version if version in VERSION_FEATURES else LATEST_VERSION)
+    generator = f"OpenMarkdown{features['version']} – By Salmomini"
+
+    body = [f"<h1>{esc(ast['title'])}</h1>"]
+    if features["header_meta"]:
+        meta = ast.get("meta") or {}
+        author = meta.get("author")
+        date = meta.get("date")
+        tags = meta.get("tags") or []
+        if features["local_images"]:
+            resolve_local_images(ast.get("children", []), meta.get("base_dir"))
+            if inline_local_images:
+                inline_file_images(ast.get("children", []))
+        meta_parts = [p for p in (author, date) if p]
+        if meta_parts:
+            body.append(f"<i class=\"doc-meta\">{esc(' · '.join(meta_parts))}</i>")
+        doc_title = ast.get("title") or f"OpenMarkdown{features['version']}"
+        meta_tags = "\n".join([
+            f'<meta name="author" content="{esc(author if author else "Salmomini")}">',
+            f'<meta name="date" content="{esc(date)}">' if date else "",
+            f'<meta name="keywords" content="{esc(", ".join(tags))}">' if tags else "",
+        ])
+    else:
+        doc_title = generator
+        meta_tags = '<meta name="author" content="Salmomini">'
+    body.extend(render_blocks(ast["children"], features))
+
+    css_block = f"<style>{css}</style>" if css else ""
+
+    return f"""<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{esc(doc_title)}</title>
+{meta_tags}
+<meta name="generator" content="{generator}">
+
+<!-- MathJax -->
+<script src="https://cdn.jsdelivr.net/npm/mathjax@3/es5/tex-mml-chtml.js"></script>
+
+<!-- Mermaid -->
+<script src="https://cdn.jsdelivr.net/npm/mermaid/dist/mermaid.min.js"></script>
+<script>mermaid.initialize({{ startOnLoad: true }});</script>
+
+{css_block}
+</head>
+<body>
+<div id="write">
+{chr(10).join(body)}
+</div>
+</body>
+</html>
+"""
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def usage() -> None:
+    print(
+        "Usage:\n"
+        "  python3 engine.py file.omd\n"
+        "  python3 engine.py file.omd --html out.html [--css style.example.css]"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 4, 6):
+        usage()
+        sys.exit(1)
+
+    css_text: Optional[str] = None
+    if "--css" in sys.argv:
+        css_idx = sys.argv.index("--css")
+        if css_idx + 1 >= len(sys.argv):
+            print("Error: --css requires a file path")
+            sys.exit(1)
+        with open(sys.argv[css_idx + 1], "r", encoding="utf-8") as f:
+            css_text = f.read()
+
+    try:
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            ast = parse_document(f.read(), source_path=sys.argv[1])
+    except OpenMarkdownError as exc:
+        print(f"Parse error: {exc}", file=sys.stderr)
+        sys.exit(1)
+
+    if "--html" in sys.argv:
+        html_idx = sys.argv.index("--html")
+        if html_idx + 1 >= len(sys.argv):
+            usage()
+            sys.exit(1)
+        with open(sys.argv[html_idx + 1], "w", encoding="utf-8") as f:
+            f.write(render_html(ast, css=css_text))
+        print(f"Wrote HTML: {sys.argv[html_idx + 1]}")
+    else:
+        print(json.dumps(ast, indent=2))
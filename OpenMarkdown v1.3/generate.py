@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# generate.py
+
+import random
+import re
+import sys
+from typing import Dict, Any, Iterator, List, Optional
+
+from cliargs import pop_option
+
+
+WORDS = [
+    "umbrella", "rain", "city", "street", "corner", "silent", "folded", "waiting",
+    "migration", "pattern", "weather", "station", "platform", "shadow", "cloud",
+    "harbor", "lantern", "window", "signal", "archive", "ledger", "quiet", "river",
+    "bridge", "market", "engine", "garden", "paper", "morning", "evening", "north",
+    "south", "ticket", "letter", "number", "system", "parser", "render", "table",
+    "column", "value", "marker", "section", "chapter", "note", "field", "report",
+    "observer", "season", "travel", "return", "forgot", "remember", "borrowed",
+    "tangled", "upright", "collapsed", "hopeful", "careful", "ordinary", "strange",
+]
+CALLOUT_COLORS = ["info", "note", "tip", "warning", "danger", "important", "caution", "#3b82f6"]
+CODE_LANGUAGES = ["python", "text", "bash", "json", ""]
+STRAY_MARKERS = ["*", "**", "==", "~", "$", "\\*", "\\`", "\\~", "\\=="]
+
+DEFAULT_KNOBS: Dict[str, Any] = {
+    # Paragraph shape
+    "paragraph_lines": 4,
+    "line_words": 14,
+    # Share of words that carry inline markup
+    "inline_density": 0.15,
+    # Share of words preceded by a space-cancelled or escaped marker
+    "stray_markers": 0.0,
+    "table_rows": 6,
+    "table_cols": 4,
+    "list_items": 6,
+    "list_depth": 3,
+    # Nesting of blockquotes and callouts
+    "quote_depth": 2,
+    # Share of blocks of each kind; the rest are paragraphs
+    "tables": 0.08,
+    "lists": 0.15,
+    "quotes": 0.1,
+    "code_blocks": 0.08,
+    "math_blocks": 0.05,
+    "images": 0.05,
+    # Chance of a comment after a paragraph line, and of a comment block
+    "comments": 0.05,
+    "code_lines": 8,
+    "section_blocks": 6,
+}
+
+# Pathological variants stay valid v1.3 but stress one part of the pipeline.
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "prose": {"tables": 0.0, "lists": 0.05, "quotes": 0.02, "code_blocks": 0.0,
+              "math_blocks": 0.0, "images": 0.0, "inline_density": 0.05},
+    "long-lines": {"paragraph_lines": 1, "line_words": 20000, "inline_density": 0.5,
+                   "section_blocks": 2},
+    "deep-nesting": {"list_depth": 40, "list_items": 80, "quote_depth": 30,
+                     "lists": 0.4, "quotes": 0.4},
+    "marker-storm": {"inline_density": 0.6, "stray_markers": 0.5},
+    "wide-tables": {"table_rows": 200, "table_cols": 120, "tables": 0.6},
+    "comment-heavy": {"comments": 0.9},
+    "code-heavy": {"code_blocks": 0.5, "math_blocks": 0.2, "code_lines": 60},
+}
+
+SIZE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*([KMG]?)B?", re.IGNORECASE)
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    m = SIZE_RE.fullmatch(text.strip())
+    if not m:
+        raise ValueError(f"Invalid size: {text}")
+    return int(float(m.group(1)) * SIZE_UNITS[m.group(2).upper()])
+
+
+# ---------------------------
+# Inline content
+# ---------------------------
+def styled_word(rng: random.Random, word: str) -> str:
+    kind = rng.randrange(9)
+    if kind == 0:
+        return f"**{word}**"
+    if kind == 1:
+        return f"*{word}*"
+    if kind == 2:
+        return f"=={word}=="
+    if kind == 3:
+        return f"~{word}~"
+    if kind == 4:
+        return f"`{word}`"
+    if kind == 5:
+        return f"${word[0]}^{len(word)}$"
+    if kind == 6:
+        return f"[{word}](https://example.com/{word})"
+    if kind == 7:
+        return f"``{word} `tick` {word}``"
+    return f"*{word} {rng.choice(WORDS)}*"
+
+
+def inline_line(rng: random.Random, knobs: Dict[str, Any], words: Optional[int] = None) -> str:
+    # The first word is always plain so a line never starts a block by accident.
+    count = max(1, words if words is not None else rng.randint(
+        max(1, knobs["line_words"] // 2), max(1, knobs["line_words"] * 3 // 2)
+    ))
+    density = knobs["inline_density"]
+    stray = knobs["stray_markers"]
+    out = [rng.choice(WORDS)]
+    for _ in range(count - 1):
+        # Stray markers always have a word after them, or they would open an
+        # unclosed span at the end of the line.
+        if stray and rng.random() < stray:
+            out.append(rng.choice(STRAY_MARKERS))
+        word = rng.choice(WORDS)
+        if rng.random() < density:
+            word = styled_word(rng, word)
+        out.append(word)
+    return " ".join(out)
+
+
+def cell_text(rng: random.Random, knobs: Dict[str, Any]) -> str:
+    return inline_line(rng, knobs, rng.randint(1, 3))
+
+
+# ---------------------------
+# Blocks
+# ---------------------------
+def paragraph(rng: random.Random, knobs: Dict[str, Any], prefix: str = "") -> List[str]:
+    lines = []
+    for _ in range(max(1, rng.randint(1, knobs["paragraph_lines"] * 2 - 1))):
+        line = inline_line(rng, knobs)
+        if rng.random() < knobs["comments"]:
+            line += f" <# {rng.choice(WORDS)} #>"
+        lines.append(prefix + line)
+    return lines
+
+
+def comment_block(rng: random.Random) -> List[str]:
+    body = [" ".join(rng.choice(WORDS) for _ in range(8)) for _ in range(rng.randint(1, 4))]
+    return ["<# " + body[0]] + body[1:-1] + [body[-1] + " #>"] if len(body) > 1 else [f"<# {body[0]} #>"]
+
+
+def table(rng: random.Random, knobs: Dict[str, Any]) -> List[str]:
+    cols = max(2, rng.randint(max(2, knobs["table_cols"] // 2), max(2, knobs["table_cols"])))
+    rows = rng.randint(1, max(1, knobs["table_rows"]))
+    lines = ["| " + " | ".join(rng.choice(WORDS).title() for _ in range(cols)) + " |"]
+    lines.append("|" + "|".join(rng.choice(["---", ":---", "---:", ":---:"]) for _ in range(cols)) + "|")
+    for _ in range(rows):
+        lines.append("| " + " | ".join(cell_text(rng, knobs) for _ in range(cols)) + " |")
+    return lines
+
+
+def list_block(rng: random.Random, knobs: Dict[str, Any], prefix: str = "") -> List[str]:
+    lines: List[str] = []
+    max_depth = max(1, knobs["list_depth"])
+    kinds = [rng.choice(["unordered", "ordered"]) for _ in range(max_depth)]
+    counters = [0] * max_depth
+    depth = 0
+    for _ in range(max(1, rng.randint(1, knobs["list_items"]))):
+        kind = kinds[depth]
+        counters[depth] += 1
+        text = inline_line(rng, knobs, rng.randint(2, 8))
+        if kind == "ordered":
+            marker = f"{counters[depth]}. "
+        else:
+            marker = rng.choice(["- ", "- ", "- [x] ", "- [ ] "])
+        lines.append(prefix + "  " * depth + marker + text)
+        # Only step one level deeper at a time; any shallower level is fine.
+        r = rng.random()
+        if r < 0.35 and depth + 1 < max_depth:
+            depth += 1
+            counters[depth] = 0
+        elif r < 0.55 and depth > 0:
+            depth = rng.randint(0, depth - 1)
+    return lines
+
+
+def code_block(rng: random.Random, knobs: Dict[str, Any]) -> List[str]:
+    lines = ["```" + rng.choice(CODE_LANGUAGES)]
+    for i in range(rng.randint(1, max(1, knobs["code_lines"]))):
+        a, b = rng.choice(WORDS), rng.choice(WORDS)
+        lines.append(f"{'    ' * (i % 3)}{a} = {b}({a}, {i}) * 2  # {rng.choice(WORDS)}")
+    lines.append("```")
+    return lines
+
+
+def math_block(rng: random.Random) -> List[str]:
+    if rng.random() < 0.3:
+        return [f"$$\\sum_{{i=1}}^{{{rng.randint(2, 99)}}} x_i$$"]
+    return [
+        "$$",
+        f"\\int_0^{{{rng.randint(1, 9)}}} f(x)\\,dx = \\frac{{{rng.randint(1, 9)}}}{{{rng.randint(2, 9)}}}",
+        "$$",
+    ]
+
+
+def image_line(rng: random.Random, image_id: int) -> List[str]:
+    alt = " ".join(rng.choice(WORDS) for _ in range(3))
+    width = rng.choice(["", "{25%}", "{50%}", "{100%}"])
+    return [f"![{alt}](local:./assets/image{image_id % 16}.png){width}"]
+
+
+def quote_block(rng: random.Random, knobs: Dict[str, Any]) -> List[str]:
+    depth = rng.randint(1, max(1, knobs["quote_depth"]))
+    lines: List[str] = []
+    for level in range(1, depth + 1):
+        prefix = "> " * level
+        if rng.random() < 0.5:
+            color = rng.choice(CALLOUT_COLORS)
+            lines.append(f"{prefix}[{rng.choice(WORDS).title()}]{{color: {color}}}")
+        lines.extend(paragraph(rng, knobs, prefix))
+        if level < depth:
+            lines.append(prefix.rstrip())
+    if rng.random() < 0.3:
+        lines.append("> " * depth)
+        lines.extend(list_block(rng, dict(knobs, list_depth=2, list_items=3), "> " * depth))
+    return lines
+
+
+def block(rng: random.Random, knobs: Dict[str, Any], image_id: int) -> List[str]:
+    r = rng.random()
+    for name, make in (
+        ("tables", lambda: table(rng, knobs)),
+        ("lists", lambda: list_block(rng, knobs)),
+        ("quotes", lambda: quote_block(rng, knobs)),
+        ("code_blocks", lambda: code_block(rng, knobs)),
+        ("math_blocks", lambda: math_block(rng)),
+        ("images", lambda: image_line(rng, image_id)),
+    ):
+        if r < knobs[name]:
+            return make()
+        r -= knobs[name]
+    if rng.random() < knobs["comments"] / 4:
+        return comment_block(rng) + [""] + paragraph(rng, knobs)
+    return paragraph(rng, knobs)
+
+
+# ---------------------------
+# Documents
+# ---------------------------
+def iter_document(
+    seed: int = 0,
+    size: int = 64 * 1024,
+    knobs: Optional[Dict[str, Any]] = None,
+) -> Iterator[str]:
+    # Yields the document in section-sized chunks until at least `size`
+    # bytes were produced. Everything is ASCII, so characters are bytes.
+    knobs = dict(DEFAULT_KNOBS, **(knobs or {}))
+    rng = random.Random(seed)
+    head = (
+        "---\n"
+        "OpenMarkdown-Version: 1.3\n"
+        "author: Synthetic Generator\n"
+        f"date: {rng.randint(1, 28)}.{rng.randint(1, 12)}.{rng.randint(2000, 2030)}\n"
+        f"tags: synthetic, seed-{seed}\n"
+        "---\n"
+        f"#* Synthetic document {seed}\n"
+        "\n"
+    )
+    yield head
+    written = len(head)
+    section = 0
+    image_id = 0
+    while written < size:
+        section += 1
+        lines = [f"## Section {section}: {rng.choice(WORDS)} {rng.choice(WORDS)}", ""]
+        for i in range(max(1, rng.randint(1, knobs["section_blocks"] * 2))):
+            if i and rng.random() < 0.15:
+                lines.extend([f"### {rng.choice(WORDS).title()} {section}.{i}", ""])
+            lines.extend(block(rng, knobs, image_id))
+            lines.append("")
+            image_id += 1
+        chunk = "\n".join(lines) + "\n"
+        written += len(chunk)
+        yield chunk
+
+
+def generate(seed: int = 0, size: int = 64 * 1024, knobs: Optional[Dict[str, Any]] = None) -> str:
+    return "".join(iter_document(seed, size, knobs))
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def usage() -> None:
+    lines = [""]
+    for k in DEFAULT_KNOBS:
+        option = f"[--{k.replace('_', '-')} N]"
+        if len(lines[-1]) + len(option) > 56:
+            lines.append("")
+        lines[-1] += (" " if lines[-1] else "") + option
+    knob_options = "\n".join(" " * 22 + line for line in lines)
+    print(
+        "Usage:\n"
+        "  python3 generate.py [--seed 0] [--size 64KB] [--profile default] [-o out.omd]\n"
+        f"{knob_options}\n"
+        f"Profiles: {', '.join(PROFILES)}"
+    )
+
+
+def main(argv: List[str]) -> int:
+    args = list(argv)
+    if "-h" in args or "--help" in args:
+        usage()
+        return 0
+    out_path = pop_option(args, "-o")
+    profile = pop_option(args, "--profile") or "default"
+    if profile not in PROFILES:
+        print(f"Error: unknown profile {profile!r}")
+        return 1
+    knobs = dict(PROFILES[profile])
+    try:
+        seed = int(pop_option(args, "--seed") or 0)
+        size = parse_size(pop_option(args, "--size") or "64KB")
+    except ValueError:
+        print("Error: --seed must be a number and --size like 512KB, 10MB or 1GB")
+        return 1
+    for name, default in DEFAULT_KNOBS.items():
+        option = "--" + name.replace("_", "-")
+        value = pop_option(args, option)
+        if value is None:
+            continue
+        try:
+            knobs[name] = type(default)(value)
+        except ValueError:
+            print(f"Error: {option} must be a number")
+            return 1
+    if args:
+        usage()
+        return 1
+
+    chunks = iter_document(seed, size, knobs)
+    if out_path:
+        with open(out_path, "w", encoding="utf-8", newline="\n") as f:
+            for chunk in chunks:
+                f.write(chunk)
+    else:
+        for chunk in chunks:
+            sys.stdout.write(chunk)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
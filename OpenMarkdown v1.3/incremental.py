@@ -0,0 +1,192 @@
+# incremental.py
+
+from typing import Dict, Any, List, Optional, Tuple
+
+from parser import (
+    OpenMarkdownError,
+    build_document,
+    iter_blocks,
+    parse_blocks,
+    parse_header,
+    parse_openmarkdown_v1,
+    source_lines,
+    syntax_error,
+)
+
+
+def common_prefix(a: List[str], b: List[str]) -> int:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def common_suffix(a: List[str], b: List[str], limit: int) -> int:
+    i = 0
+    while i < limit and a[len(a) - 1 - i] == b[len(b) - 1 - i]:
+        i += 1
+    return i
+
+
+def shift_error(exc: OpenMarkdownError, delta: int) -> OpenMarkdownError:
+    if not delta or exc.line_no is None:
+        return exc
+    message = str(exc).split(": ", 1)[1]
+    return syntax_error(message, exc.line_no + delta)
+
+
+def unterminated(lines: List[str], span: Tuple[int, int]) -> bool:
+    # Closed $$ and fenced blocks span at least two lines.
+    start, stop = span
+    opening = lines[start].strip()
+    return stop - start == 1 and (opening == "$$" or opening.startswith("```"))
+
+
+def full_parse(
+    new_text: str,
+    source_path: Optional[str],
+    diagnostics: Optional[List[OpenMarkdownError]] = None,
+) -> Tuple[Dict[str, Any], List[Tuple[int, int]]]:
+    recover = diagnostics is not None
+    ast = parse_openmarkdown_v1(new_text, source_path=source_path, diagnostics=diagnostics)
+    lines = source_lines(new_text)
+    body_start = parse_header(lines, [] if recover else None)["body_start"]
+    return ast, list(iter_blocks(lines[body_start:], 0, body_start + 1, recover))
+
+
+def reparse_with_spans(
+    old_ast: Dict[str, Any],
+    old_text: str,
+    new_text: str,
+    source_path: Optional[str] = None,
+    old_spans: Optional[List[Tuple[int, int]]] = None,
+    diagnostics: Optional[List[OpenMarkdownError]] = None,
+    old_diagnostics: Optional[List[OpenMarkdownError]] = None,
+) -> Tuple[Dict[str, Any], List[Tuple[int, int]]]:
+    # Spans are (start, stop) line indices of each top-level child, relative
+    # to the first line after the title. Passing the spans returned by the
+    # previous call skips rescanning the old text.
+    #
+    # In recovering mode pass a diagnostics list to fill, plus the old AST and
+    # the diagnostics of the previous recovering pass. Only the dirty blocks
+    # are parsed again; errors in the blocks before them are kept and errors
+    # in the blocks after them are moved to their new lines.
+    recover = diagnostics is not None
+    if recover and old_diagnostics is None:
+        return full_parse(new_text, source_path, diagnostics)
+    old_lines = source_lines(old_text)
+    new_lines = source_lines(new_text)
+    header_errors: List[OpenMarkdownError] = []
+    try:
+        old_header = parse_header(old_lines, [] if recover else None)
+        new_header = parse_header(new_lines, header_errors if recover else None)
+    except OpenMarkdownError:
+        return full_parse(new_text, source_path, diagnostics)
+
+    body_start = old_header["body_start"]
+    if (
+        new_header["body_start"] != body_start
+        or old_lines[:body_start] != new_lines[:body_start]
+        or not new_header["title"]
+    ):
+        return full_parse(new_text, source_path, diagnostics)
+
+    old_body = old_lines[body_start:]
+    new_body = new_lines[body_start:]
+    old_children = old_ast.get("children", [])
+
+    if old_spans is None:
+        try:
+            old_spans = list(iter_blocks(old_body, 0, body_start + 1, recover))
+        except OpenMarkdownError:
+            return full_parse(new_text, source_path, diagnostics)
+    if len(old_spans) != len(old_children):
+        return full_parse(new_text, source_path, diagnostics)
+
+    prefix = common_prefix(old_body, new_body)
+    suffix = common_suffix(
+        old_body,
+        new_body,
+        min(len(old_body), len(new_body)) - prefix,
+    )
+
+    # Keep blocks whose terminating line is still untouched. A block that
+    # recovery cut short at an unterminated opener depends on every line after
+    # it, since an edit further down may add its closing line.
+    keep = 0
+    while keep < len(old_spans) and old_spans[keep][1] < prefix:
+        if recover and unterminated(old_body, old_spans[keep]):
+            break
+        keep += 1
+    # The dirty slice is parsed on its own, so like the resume point it has to
+    # follow a blank line. A block right after another, such as a bad line
+    # that recovery splits off the end of a list, depends on the one before.
+    while keep and old_spans[keep - 1][1] < len(old_body) and old_body[old_spans[keep - 1][1]].strip():
+        keep -= 1
+    dirty_start = old_spans[keep - 1][1] if keep else 0
+
+    # Walk the new text from the dirty start until a block begins after a
+    # blank line inside the unchanged tail at a position where the old text
+    # also had a block start after a blank line. From there both parses are
+    # identical.
+    delta = len(new_body) - len(old_body)
+    old_starts = {start: i for i, (start, _) in enumerate(old_spans)}
+    dirty_end = len(new_body)
+    resume = len(old_spans)
+    dirty_spans: List[Tuple[int, int]] = []
+    try:
+        for start, stop in iter_blocks(new_body, dirty_start, body_start + 1, recover):
+            if (
+                start >= len(new_body) - suffix
+                and start > dirty_start
+                and not new_body[start - 1].strip()
+                and start - delta in old_starts
+                and (start == delta or not old_body[start - delta - 1].strip())
+            ):
+                dirty_end = start
+                resume = old_starts[start - delta]
+                break
+            dirty_spans.append((start, stop))
+    except OpenMarkdownError:
+        return full_parse(new_text, source_path, diagnostics)
+
+    dirty_errors: Optional[List[OpenMarkdownError]] = [] if recover else None
+    parsed = parse_blocks(
+        new_body[dirty_start:dirty_end],
+        allow_title=False,
+        start_line=body_start + dirty_start + 1,
+        diagnostics=dirty_errors,
+    )
+    children = old_children[:keep] + parsed["children"] + old_children[resume:]
+    if recover:
+        first_dirty = body_start + dirty_start + 1
+        first_resumed = body_start + 1 + (old_spans[resume][0] if resume < len(old_spans) else len(old_body))
+        diagnostics.extend(header_errors)
+        diagnostics.extend(
+            exc for exc in old_diagnostics
+            if exc.line_no is not None and body_start < exc.line_no < first_dirty
+        )
+        diagnostics.extend(dirty_errors)
+        diagnostics.extend(
+            shift_error(exc, delta) for exc in old_diagnostics
+            if exc.line_no is not None and exc.line_no >= first_resumed
+        )
+    spans = (
+        old_spans[:keep]
+        + dirty_spans
+        + [(start + delta, stop + delta) for start, stop in old_spans[resume:]]
+    )
+    return build_document(new_header, children, source_path), spans
+
+
+def reparse(
+    old_ast: Dict[str, Any],
+    old_text: str,
+    new_text: str,
+    source_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    # Unchanged top-level nodes are shared with old_ast, not copied. Do not
+    # reuse an AST that has already been through render_html, which rewrites
+    # image urls in place.
+    return reparse_with_spans(old_ast, old_text, new_text, source_path)[0]
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# index.py
+
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import sys
+from typing import Dict, Any, Iterator, List, Optional
+
+from cliargs import pop_flag, pop_option
+from parser import OpenMarkdownError, read_metadata_from
+
+
+DEFAULT_DB = "omd-index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    title TEXT,
+    author TEXT,
+    date TEXT,
+    iso_date TEXT,
+    year INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS tags (
+    path TEXT NOT NULL REFERENCES documents(path) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (path, tag)
+);
+CREATE INDEX IF NOT EXISTS tags_by_tag ON tags (tag COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS documents_by_author ON documents (author COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS documents_by_date ON documents (iso_date);
+"""
+
+
+def connect(db_path: str = DEFAULT_DB) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def iso_date(date: Optional[str]) -> Optional[str]:
+    # Header dates are already validated as D.M.YYYY.
+    if not date:
+        return None
+    day, month, year = (int(p) for p in date.split("."))
+    return f"{year:04d}-{month:02d}-{day:02d}"
+
+
+def iter_omd_files(roots: List[str]) -> Iterator[str]:
+    for root in roots:
+        if os.path.isfile(root):
+            yield os.path.abspath(root)
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if name.endswith(".omd"):
+                    yield os.path.abspath(os.path.join(dirpath, name))
+
+
+# ---------------------------
+# Indexing
+# ---------------------------
+def index_file(conn: sqlite3.Connection, path: str, st: os.stat_result) -> str:
+    row = conn.execute(
+        "SELECT mtime, size, hash FROM documents WHERE path = ?", (path,)
+    ).fetchone()
+    if row and row[0] == st.st_mtime and row[1] == st.st_size:
+        return "unchanged"
+
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if row and row[2] == digest:
+        conn.execute(
+            "UPDATE documents SET mtime = ?, size = ? WHERE path = ?",
+            (st.st_mtime, st.st_size, path),
+        )
+        return "unchanged"
+
+    meta: Dict[str, Any] = {}
+    error = None
+    try:
+        meta = read_metadata_from(io.TextIOWrapper(io.BytesIO(data), encoding="utf-8"))
+    except (OpenMarkdownError, UnicodeDecodeError) as exc:
+        error = str(exc)
+
+    conn.execute("DELETE FROM tags WHERE path = ?", (path,))
+    conn.execute(
+        "INSERT OR REPLACE INTO documents "
+        "(path, mtime, size, hash, title, author, date, iso_date, year, error) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            path,
+            st.st_mtime,
+            st.st_size,
+            digest,
+            meta.get("title"),
+            meta.get("author"),
+            meta.get("date"),
+            iso_date(meta.get("date")),
+            int(meta["date"].split(".")[2]) if meta.get("date") else None,
+            error,
+        ),
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO tags (path, tag, position) VALUES (?, ?, ?)",
+        [(path, tag, i) for i, tag in enumerate(meta.get("tags") or [])],
+    )
+    return "error" if error else ("updated" if row else "added")
+
+
+def update_index(conn: sqlite3.Connection, roots: List[str]) -> Dict[str, int]:
+    stats = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "error": 0}
+    seen = set()
+    with conn:
+        for path in iter_omd_files(roots):
+            seen.add(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stats[index_file(conn, path, st)] += 1
+
+        # Forget documents that disappeared from the indexed roots.
+        for root in roots:
+            prefix = os.path.abspath(root)
+            if os.path.isdir(prefix):
+                prefix = os.path.join(prefix, "")
+            rows = conn.execute(
+                "SELECT path FROM documents WHERE path = ? OR substr(path, 1, ?) = ?",
+                (prefix, len(prefix), prefix),
+            ).fetchall()
+            for (path,) in rows:
+                if path not in seen:
+                    conn.execute("DELETE FROM documents WHERE path = ?", (path,))
+                    stats["removed"] += 1
+    return stats
+
+
+# ---------------------------
+# Queries
+# ---------------------------
+def query(
+    conn: sqlite3.Connection,
+    tags: Optional[List[str]] = None,
+    author: Optional[str] = None,
+    year: Optional[int] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    title: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    where = ["error IS NULL"]
+    params: List[Any] = []
+    for tag in tags or []:
+        where.append(
+            "EXISTS (SELECT 1 FROM tags t WHERE t.path = d.path AND t.tag = ? COLLATE NOCASE)"
+        )
+        params.append(tag)
+    if author is not None:
+        where.append("author = ? COLLATE NOCASE")
+        params.append(author)
+    if year is not None:
+        where.append("year = ?")
+        params.append(year)
+    if since is not None:
+        where.append("iso_date >= ?")
+        params.append(iso_date(since))
+    if until is not None:
+        where.append("iso_date <= ?")
+        params.append(iso_date(until))
+    if title is not None:
+        where.append("instr(lower(title), lower(?)) > 0")
+        params.append(title)
+
+    rows = conn.execute(
+        "SELECT path, title, author, date, "
+        "(SELECT group_concat(tag, ', ') FROM "
+        "(SELECT tag FROM tags t WHERE t.path = d.path ORDER BY position)) "
+        f"FROM documents d WHERE {' AND '.join(where)} "
+        "ORDER BY iso_date, path",
+        params,
+    ).fetchall()
+    return [
+        {
+            "path": path,
+            "title": doc_title,
+            "author": doc_author,
+            "date": date,
+            "tags": doc_tags.split(", ") if doc_tags else [],
+        }
+        for path, doc_title, doc_author, date, doc_tags in rows
+    ]
+
+
+def errors(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    rows = conn.execute(
+        "SELECT path, error FROM documents WHERE error IS NOT NULL ORDER BY path"
+    ).fetchall()
+    return [{"path": path, "error": error} for path, error in rows]
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def usage() -> None:
+    print(
+        "Usage:\n"
+        "  python3 index.py update DIR_OR_FILE [...] [--db omd-index.sqlite]\n"
+        "  python3 index.py query [--tag TAG ...] [--author NAME] [--year YYYY]\n"
+        "                         [--since D.M.YYYY] [--until D.M.YYYY] [--title TEXT]\n"
+        "                         [--db omd-index.sqlite] [--json]\n"
+        "  python3 index.py errors [--db omd-index.sqlite]"
+    )
+
+
+def main(argv: List[str]) -> int:
+    if not argv:
+        usage()
+        return 1
+    command, args = argv[0], list(argv[1:])
+    db_path = pop_option(args, "--db") or DEFAULT_DB
+
+    if command == "update":
+        if not args:
+            usage()
+            return 1
+        conn = connect(db_path)
+        stats = update_index(conn, args)
+        print(
+            f"Indexed {db_path}: {stats['added']} added, {stats['updated']} updated, "
+            f"{stats['unchanged']} unchanged, {stats['removed']} removed, "
+            f"{stats['error']} with errors"
+        )
+        return 0
+
+    if command == "query":
+        tags = []
+        tag = pop_option(args, "--tag")
+        while tag is not None:
+            tags.append(tag)
+            tag = pop_option(args, "--tag")
+        author = pop_option(args, "--author")
+        year = pop_option(args, "--year")
+        since = pop_option(args, "--since")
+        until = pop_option(args, "--until")
+        title = pop_option(args, "--title")
+        as_json = pop_flag(args, "--json")
+        if args:
+            usage()
+            return 1
+        try:
+            for date in (since, until):
+                if date is not None:
+                    iso_date(date)
+            year_value = int(year) if year is not None else None
+        except ValueError:
+            print("Error: dates must use D.M.YYYY and --year must be a number")
+            return 1
+        results = query(
+            connect(db_path),
+            tags=tags,
+            author=author,
+            year=year_value,
+            since=since,
+            until=until,
+            title=title,
+        )
+        if as_json:
+            print(json.dumps(results, indent=2))
+        else:
+            for r in results:
+                print(r["path"])
+        return 0
+
+    if command == "errors":
+        found = errors(connect(db_path))
+        for e in found:
+            print(f"{e['path']}: {e['error']}")
+        return 1 if found else 0
+
+    usage()
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
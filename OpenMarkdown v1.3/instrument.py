@@ -0,0 +1,430 @@
+# instrument.py
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+
+# Phase timings and trace spans are off by default. While both are disabled
+# start() returns None and stop()/lap() return straight away, so each hook in
+# parser/render costs a function call and nothing else.
+enabled = False
+tracing = False
+_active = False
+_lock = threading.Lock()
+_totals: Dict[str, List[float]] = {}
+_events: List[Dict[str, Any]] = []
+
+
+def enable(on: bool = True) -> None:
+    global enabled, _active
+    enabled = on
+    _active = enabled or tracing
+
+
+def enable_tracing(on: bool = True) -> None:
+    global tracing, _active
+    tracing = on
+    _active = enabled or tracing
+
+
+def reset() -> None:
+    with _lock:
+        _totals.clear()
+        _events.clear()
+        _memory.clear()
+
+
+def record(name: str, seconds: float, calls: int = 1) -> None:
+    with _lock:
+        entry = _totals.get(name)
+        if entry is None:
+            _totals[name] = [calls, seconds]
+        else:
+            entry[0] += calls
+            entry[1] += seconds
+
+
+# Complete ("X") events in the Chrome Trace Event format, which both
+# chrome://tracing and Perfetto load. pid/tid tag the worker that ran the span.
+def add_span(name: str, started: float, finished: float) -> None:
+    event = {
+        "name": name,
+        "cat": name.split(".", 1)[0],
+        "ph": "X",
+        "ts": started * 1e6,
+        "dur": (finished - started) * 1e6,
+        "pid": os.getpid(),
+        "tid": threading.get_native_id(),
+    }
+    with _lock:
+        _events.append(event)
+
+
+def finish(name: str, started: float, finished: float, trace: bool = True) -> None:
+    if enabled:
+        record(name, finished - started)
+    if tracing and trace:
+        add_span(name, started, finished)
+
+
+def start() -> Optional[float]:
+    if not _active:
+        return None
+    return time.perf_counter()
+
+
+def stop(name: str, started: Optional[float], trace: bool = True) -> None:
+    if started is None:
+        return
+    finish(name, started, time.perf_counter(), trace)
+
+
+# Records the time since `started` and returns a fresh start mark, for loops
+# that attribute consecutive slices of work to different phases.
+def lap(name: str, started: Optional[float]) -> Optional[float]:
+    if started is None:
+        return None
+    now = time.perf_counter()
+    finish(name, started, now)
+    return now
+
+
+def count(name: str, n: int = 1) -> None:
+    if enabled:
+        record(name, 0.0, n)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    started = start()
+    try:
+        yield
+    finally:
+        stop(name, started)
+
+
+# ---------------------------
+# Reporting
+# ---------------------------
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        items = sorted((name, entry[0], entry[1]) for name, entry in _totals.items())
+    return {
+        name: {"calls": int(calls), "seconds": seconds}
+        for name, calls, seconds in items
+    }
+
+
+def format_table(stats: Dict[str, Dict[str, Any]]) -> str:
+    if not stats:
+        return "No phase timings recorded."
+    width = max(len("phase"), max(len(name) for name in stats))
+    lines = [f"{'phase':<{width}}  {'calls':>8}  {'total ms':>10}  {'mean us':>10}"]
+    for name, s in stats.items():
+        calls = s["calls"]
+        total_ms = s["seconds"] * 1000
+        mean = f"{s['seconds'] / calls * 1e6:10.1f}" if calls and s["seconds"] else f"{'-':>10}"
+        lines.append(f"{name:<{width}}  {calls:>8}  {total_ms:>10.3f}  {mean}")
+    return "\n".join(lines)
+
+
+# ---------------------------
+# Tracing
+# ---------------------------
+def name_worker(name: str) -> None:
+    # Labels the calling thread's track, e.g. "worker 3" for a pool process.
+    if not tracing:
+        return
+    with _lock:
+        _events.append({
+            "name": "thread_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            "args": {"name": name},
+        })
+
+
+def trace_events() -> List[Dict[str, Any]]:
+    with _lock:
+        return list(_events)
+
+
+def add_events(events: List[Dict[str, Any]]) -> None:
+    with _lock:
+        _events.extend(events)
+
+
+def write_trace(path: str) -> None:
+    events = trace_events()
+    events.insert(0, {
+        "name": "process_name",
+        "ph": "M",
+        "pid": os.getpid(),
+        "tid": 0,
+        "args": {"name": "openmarkdown"},
+    })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        f.write("\n")
+
+
+# ---------------------------
+# Memory
+# ---------------------------
+# tracemalloc has a single peak counter, so each phase resets it on entry and
+# first folds the current peak into every enclosing phase. Peak is the highest
+# traced size above the level at entry; retained is what is still allocated at
+# exit. Meant for one document at a time: other threads allocating during a
+# phase are counted towards it. tracemalloc is imported on first use so the
+# normal start-up path does not pay for it.
+TOP_SITES = 5
+memory_enabled = False
+_memory: Dict[str, Dict[str, Any]] = {}
+_memory_stack: List[Dict[str, Any]] = []
+
+
+def enable_memory(on: bool = True) -> None:
+    import tracemalloc
+
+    global memory_enabled
+    memory_enabled = on
+    if on and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not on and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def memory_start() -> Optional[Dict[str, Any]]:
+    if not memory_enabled:
+        return None
+    import tracemalloc
+
+    with _lock:
+        # Allocation sites are only reported for outermost phases, so nested
+        # phases skip the snapshot. It is taken before the baseline is read,
+        # so its own allocations are part of the baseline rather than the phase.
+        before = None if _memory_stack else tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        for outer in _memory_stack:
+            outer["peak"] = max(outer["peak"], peak)
+        tracemalloc.reset_peak()
+        mark = {"start": current, "peak": current, "snapshot": before}
+        _memory_stack.append(mark)
+    return mark
+
+
+def allocation_sites(after: Any, before: Any) -> List[Dict[str, Any]]:
+    import tracemalloc
+
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    diff = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    sites = []
+    for stat in diff[:TOP_SITES]:
+        if stat.size_diff <= 0:
+            break
+        frame = stat.traceback[0]
+        sites.append({
+            "site": f"{frame.filename}:{frame.lineno}",
+            "bytes": stat.size_diff,
+            "blocks": stat.count_diff,
+        })
+    return sites
+
+
+def memory_stop(name: str, mark: Optional[Dict[str, Any]]) -> None:
+    if mark is None:
+        return
+    import tracemalloc
+
+    with _lock:
+        current, peak = tracemalloc.get_traced_memory()
+        after = None if mark["snapshot"] is None else tracemalloc.take_snapshot()
+        if mark in _memory_stack:
+            _memory_stack.remove(mark)
+        peak_bytes = max(mark["peak"], peak) - mark["start"]
+        retained = current - mark["start"]
+        entry = _memory.get(name)
+        if entry is None:
+            entry = _memory[name] = {"calls": 0, "peak_bytes": 0, "retained_bytes": 0, "top_sites": []}
+        entry["calls"] += 1
+        entry["retained_bytes"] += retained
+        # Sites are kept from the call with the highest peak.
+        if peak_bytes >= entry["peak_bytes"]:
+            entry["peak_bytes"] = peak_bytes
+            entry["top_sites"] = [] if after is None else allocation_sites(after, mark["snapshot"])
+
+
+# The mark is always removed, so a phase that raises or a generator that is
+# closed early does not stay on the stack with its snapshot.
+@contextmanager
+def memory_phase(name: str) -> Iterator[None]:
+    mark = memory_start()
+    try:
+        yield
+    finally:
+        memory_stop(name, mark)
+
+
+def memory_snapshot() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        return {name: dict(entry) for name, entry in sorted(_memory.items())}
+
+
+def format_bytes(n: int) -> str:
+    if abs(n) < 1024:
+        return f"{n} B"
+    if abs(n) < 1024 * 1024:
+        return f"{n / 1024:.1f} KB"
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def format_memory_table(stats: Dict[str, Dict[str, Any]]) -> str:
+    if not stats:
+        return "No memory phases recorded."
+    width = max(len("phase"), max(len(name) for name in stats))
+    lines = [f"{'phase':<{width}}  {'calls':>6}  {'peak':>10}  {'retained':>10}"]
+    for name, s in stats.items():
+        lines.append(
+            f"{name:<{width}}  {s['calls']:>6}  {format_bytes(s['peak_bytes']):>10}  "
+            f"{format_bytes(s['retained_bytes']):>10}"
+        )
+        for site in s["top_sites"]:
+            lines.append(f"{'':<{width}}    {format_bytes(site['bytes']):>10}  {site['site']}")
+    return "\n".join(lines)
+
+
+# ---------------------------
+# Worker processes
+# ---------------------------
+# A pool initializer calls init_worker() with worker_settings() read in the
+# parent. Each task returns take_report() next to its result and the parent
+# passes it to merge_report(), so timings, memory phases and trace spans
+# recorded in worker processes end up in the parent's reports and trace file.
+def worker_settings() -> Tuple[bool, bool, bool]:
+    return enabled, tracing, memory_enabled
+
+
+def init_worker(settings: Tuple[bool, bool, bool]) -> None:
+    import multiprocessing
+
+    # A forked worker starts with a copy of the parent's records and memory
+    # marks; drop them so they are not reported twice.
+    reset()
+    with _lock:
+        _memory_stack.clear()
+    enable(settings[0])
+    enable_tracing(settings[1])
+    if settings[2]:
+        enable_memory()
+    number = multiprocessing.current_process().name.rsplit("-", 1)[-1]
+    name_worker(f"worker {number}")
+
+
+# Returns the records made since the last call and clears them, or None when
+# nothing is being recorded.
+def take_report() -> Optional[Dict[str, Any]]:
+    if not _active and not memory_enabled:
+        return None
+    with _lock:
+        report = {
+            "timings": {name: list(entry) for name, entry in _totals.items()},
+            "events": list(_events),
+            "memory": {name: dict(entry) for name, entry in _memory.items()},
+        }
+        _totals.clear()
+        _events.clear()
+        _memory.clear()
+    return report
+
+
+# Memory entries merge like calls of the same phase in one process: calls and
+# retained bytes add up, and peak and sites come from the highest peak.
+def merge_report(report: Optional[Dict[str, Any]]) -> None:
+    if report is None:
+        return
+    for name, (calls, seconds) in report["timings"].items():
+        record(name, seconds, int(calls))
+    add_events(report["events"])
+    with _lock:
+        for name, stats in report["memory"].items():
+            entry = _memory.get(name)
+            if entry is None:
+                _memory[name] = dict(stats)
+                continue
+            entry["calls"] += stats["calls"]
+            entry["retained_bytes"] += stats["retained_bytes"]
+            if stats["peak_bytes"] >= entry["peak_bytes"]:
+                entry["peak_bytes"] = stats["peak_bytes"]
+                entry["top_sites"] = stats["top_sites"]
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def pop_path(args: List[str], name: str) -> Optional[str]:
+    if name not in args:
+        return None
+    i = args.index(name)
+    if i + 1 >= len(args):
+        print(f"Error: {name} requires a file path")
+        sys.exit(1)
+    path = args[i + 1]
+    del args[i:i + 2]
+    return path
+
+
+# Pops FLAG / FLAG-json PATH from a CLI argument list. Returns (wanted,
+# json_path); the report is a table on stderr unless a path is given.
+def pop_report_args(args: List[str], flag: str) -> Tuple[bool, Optional[str]]:
+    json_path = pop_path(args, flag + "-json")
+    wanted = json_path is not None
+    if flag in args:
+        args.remove(flag)
+        wanted = True
+    return wanted, json_path
+
+
+def emit_report(text: str, data: Any, json_path: Optional[str]) -> None:
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(data, indent=2))
+            f.write("\n")
+    else:
+        print(text, file=sys.stderr)
+
+
+def pop_timing_args(args: List[str]) -> Tuple[bool, Optional[str]]:
+    wanted, json_path = pop_report_args(args, "--timings")
+    if wanted:
+        enable()
+    return wanted, json_path
+
+
+def write_report(json_path: Optional[str] = None) -> None:
+    stats = snapshot()
+    emit_report(format_table(stats), stats, json_path)
+
+
+def pop_memory_args(args: List[str]) -> Tuple[bool, Optional[str]]:
+    wanted, json_path = pop_report_args(args, "--memory")
+    if wanted:
+        enable_memory()
+    return wanted, json_path
+
+
+def write_memory_report(json_path: Optional[str] = None) -> None:
+    stats = memory_snapshot()
+    emit_report(format_memory_table(stats), stats, json_path)
+
+
+def pop_trace_arg(args: List[str]) -> Optional[str]:
+    path = pop_path(args, "--trace")
+    if path is not None:
+        enable_tracing()
+    return path
@@ -1,53 +1,303 @@
+import json
+import os
 import sys
-from typing import Iterable, Dict, List, Set
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
 
 
 _PENDING_PREFIX = "\u2192"
 _DONE_PREFIX = "\u2713"
 _DIM = "\033[2m"
 _RESET = "\033[0m"
-_steps: List[str] = []
-_step_index: Dict[str, int] = {}
-_shown = False
-_completed: Set[str] = set()
 
+MODES = ["auto", "tty", "text", "json", "quiet"]
 
-def set_steps(steps: Iterable[str]) -> None:
-    global _steps, _step_index, _shown, _completed
-    _steps = list(steps)
-    _step_index = {message: idx for idx, message in enumerate(_steps)}
-    _shown = False
-    _completed = set()
 
+# ---------------------------
+# Jobs
+# ---------------------------
+# One Job per document being processed. Steps declared up front render as a
+# checklist on a TTY; any other message is reported as it happens. Every event
+# carries a wall-clock timestamp and the time since the job's previous event.
+class Job:
+    def __init__(self, reporter: "Reporter", name: str, steps: Iterable[str] = ()) -> None:
+        self.reporter = reporter
+        self.name = name
+        self.steps = list(steps)
+        self.step_index = {message: idx for idx, message in enumerate(self.steps)}
+        self.completed: Set[str] = set()
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._last = self._started
 
-def _show_pending() -> None:
-    global _shown
-    if _shown or not _steps:
-        return
-    for message in _steps:
-        sys.stdout.write(f"{_PENDING_PREFIX} {message}\n")
-    sys.stdout.flush()
-    _shown = True
+    def event(self, kind: str, message: Optional[str], duration: float) -> Dict[str, Any]:
+        return {
+            "ts": time.time(),
+            "pid": os.getpid(),
+            "job": self.name,
+            "event": kind,
+            "message": message,
+            "index": self.step_index.get(message) if message is not None else None,
+            "total": len(self.steps),
+            "duration": duration,
+        }
+
+    def _elapsed(self) -> float:
+        now = time.perf_counter()
+        duration = now - self._last
+        self._last = now
+        return duration
+
+    def start(self) -> None:
+        event = self.event("start", None, 0.0)
+        event["steps"] = self.steps
+        self.reporter.emit(event)
+
+    def step(self, message: str) -> None:
+        with self._lock:
+            if message in self.completed:
+                return
+            if message in self.step_index:
+                self.completed.add(message)
+            duration = self._elapsed()
+        self.reporter.emit(self.event("step", message, duration))
+
+    def finish(self, error: Optional[str] = None) -> None:
+        with self._lock:
+            self._elapsed()
+            duration = self._last - self._started
+        self.reporter.emit(self.event("error" if error else "finish", error, duration))
+
+
+# ---------------------------
+# Reporters
+# ---------------------------
+class Reporter:
+    def job(self, name: str, steps: Iterable[str] = ()) -> Job:
+        job = Job(self, name, steps)
+        job.start()
+        return job
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        pass
+
+
+class QuietReporter(Reporter):
+    pass
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:.1f} ms"
+    return f"{seconds:.2f} s"
+
+
+class TextReporter(Reporter):
+    # Plain lines without escape codes, for logs and pipes. Writes to stderr
+    # by default so stdout stays free for the actual output.
+    def __init__(self, stream: Optional[Any] = None) -> None:
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        kind = event["event"]
+        if kind == "start":
+            return
+        label = f"{event['job']}: " if event["job"] != "main" else ""
+        if kind == "step":
+            line = f"{_DONE_PREFIX} {label}{event['message']} ({format_duration(event['duration'])})"
+        elif kind == "finish":
+            line = f"{_DONE_PREFIX} {label}done in {format_duration(event['duration'])}"
+        else:
+            line = f"x {label}{event['message']}"
+        stream = self.stream or sys.stderr
+        with self._lock:
+            stream.write(line + "\n")
+            stream.flush()
+
+
+class TtyReporter(Reporter):
+    # The interactive checklist: declared steps are printed as pending and
+    # ticked off in place. That only works while a single job is running, so
+    # concurrent jobs fall back to one line per event.
+    def __init__(self, stream: Optional[Any] = None) -> None:
+        self.stream = stream
+        self._lock = threading.Lock()
+        self._active: Dict[str, Dict[str, Any]] = {}
+
+    def _write(self, text: str) -> None:
+        stream = self.stream or sys.stdout
+        stream.write(text)
+        stream.flush()
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            kind = event["event"]
+            name = event["job"]
+            if kind == "start":
+                self._active[name] = {"steps": event["steps"], "shown": False}
+                return
+            if kind in {"finish", "error"}:
+                self._active.pop(name, None)
+                if kind == "error":
+                    self._write(f"\033[31m{name}: {event['message']}{_RESET}\n")
+                return
+            state = self._active.get(name)
+            message = event["message"]
+            if len(self._active) > 1 or state is None:
+                self._write(
+                    f"{_DIM}{_DONE_PREFIX} {name}: {message} "
+                    f"({format_duration(event['duration'])}){_RESET}\n"
+                )
+                return
+            if not state["shown"]:
+                # Drawn at the first step, so jobs that never report draw nothing.
+                for step in state["steps"]:
+                    self._write(f"{_PENDING_PREFIX} {step}\n")
+                state["shown"] = True
+            idx = event["index"]
+            if idx is None:
+                self._write(f"{_PENDING_PREFIX} {message}\n")
+                return
+            lines_up = len(state["steps"]) - idx
+            out = f"\033[{lines_up}A\r{_DIM}{_DONE_PREFIX} {message}{_RESET}\033[K\n"
+            if lines_up > 1:
+                out += f"\033[{lines_up - 1}B"
+            self._write(out)
+
+
+class JsonLinesReporter(Reporter):
+    # One JSON object per line. Each line goes out in a single write, so lines
+    # from several processes sharing the stream do not interleave.
+    def __init__(self, stream: Optional[Any] = None) -> None:
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        stream = self.stream or sys.stderr
+        with self._lock:
+            stream.write(line)
+            stream.flush()
 
 
-def _mark_done(message: str) -> None:
-    idx = _step_index[message]
-    total = len(_steps)
-    lines_up = total - idx
-    sys.stdout.write(f"\033[{lines_up}A\r")
-    sys.stdout.write(f"{_DIM}{_DONE_PREFIX} {message}{_RESET}\033[K\n")
-    if lines_up > 1:
-        sys.stdout.write(f"\033[{lines_up - 1}B")
-    sys.stdout.flush()
+class QueueReporter(Reporter):
+    # For worker processes: events are put on a multiprocessing queue and the
+    # parent hands them to its own reporter with forward().
+    def __init__(self, queue: Any) -> None:
+        self.queue = queue
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        self.queue.put(event)
+
+
+def forward(queue: Any, reporter: "Reporter") -> None:
+    # Runs until a None sentinel arrives on the queue.
+    while True:
+        event = queue.get()
+        if event is None:
+            return
+        reporter.emit(event)
+
+
+def reporter_for(mode: Optional[str]) -> Reporter:
+    if mode in {None, "", "auto"}:
+        mode = "tty" if sys.stdout.isatty() else "text"
+    if mode == "tty":
+        return TtyReporter()
+    if mode == "text":
+        return TextReporter()
+    if mode == "json":
+        return JsonLinesReporter()
+    if mode == "quiet":
+        return QuietReporter()
+    raise ValueError(f"Unknown progress mode: {mode}")
+
+
+# ---------------------------
+# Process-wide defaults
+# ---------------------------
+# parser.py and render.py call log_step(); it goes to the job bound to the
+# calling thread with job_scope(), or else to the process default job that
+# set_steps() replaces.
+_reporter: Optional[Reporter] = None
+_default_job: Optional[Job] = None
+_state_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_reporter() -> Reporter:
+    global _reporter
+    with _state_lock:
+        if _reporter is None:
+            _reporter = reporter_for(os.environ.get("OMD_PROGRESS"))
+        return _reporter
+
+
+def set_reporter(reporter: Reporter) -> None:
+    global _reporter, _default_job
+    with _state_lock:
+        _reporter = reporter
+        _default_job = None
+
+
+@contextmanager
+def reporting(reporter: Reporter) -> Iterator[Reporter]:
+    # Temporarily swaps the process reporter, e.g. QuietReporter() in tools
+    # that call the parser many times.
+    global _reporter, _default_job
+    with _state_lock:
+        previous = (_reporter, _default_job)
+        _reporter, _default_job = reporter, None
+    try:
+        yield reporter
+    finally:
+        with _state_lock:
+            _reporter, _default_job = previous
+
+
+@contextmanager
+def job_scope(job: Job) -> Iterator[Job]:
+    previous = getattr(_local, "job", None)
+    _local.job = job
+    try:
+        yield job
+    finally:
+        _local.job = previous
+
+
+def current_job() -> Job:
+    global _default_job
+    job = getattr(_local, "job", None)
+    if job is not None:
+        return job
+    reporter = get_reporter()
+    with _state_lock:
+        if _default_job is None:
+            _default_job = reporter.job("main")
+        return _default_job
+
+
+def set_steps(steps: Iterable[str]) -> None:
+    global _default_job
+    job = get_reporter().job("main", steps)
+    with _state_lock:
+        _default_job = job
 
 
 def log_step(message: str) -> None:
-    _show_pending()
-    if message not in _step_index:
-        sys.stdout.write(f"{_PENDING_PREFIX} {message}\n")
-        sys.stdout.flush()
-        return
-    if message in _completed:
+    current_job().step(message)
+
+
+def pop_progress_arg(args: List[str]) -> None:
+    # --progress auto|tty|text|json|quiet; OMD_PROGRESS sets the same default.
+    if "--progress" not in args:
         return
-    _mark_done(message)
-    _completed.add(message)
+    i = args.index("--progress")
+    if i + 1 >= len(args) or args[i + 1] not in MODES:
+        print(f"Error: --progress requires one of {', '.join(MODES)}")
+        sys.exit(1)
+    set_reporter(reporter_for(args[i + 1]))
+    del args[i:i + 2]
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# lsp.py
+
+import json
+import re
+import sys
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from urllib.parse import urlparse, unquote
+
+import log_utils
+from parser import OpenMarkdownError, parse_header, source_lines
+from incremental import full_parse, reparse_with_spans
+from sections import inline_text
+
+
+DEBOUNCE_SECONDS = 0.15
+
+# LSP constants
+SYNC_INCREMENTAL = 2
+SEVERITY_ERROR = 1
+SYMBOL_STRING = 15
+METHOD_NOT_FOUND = -32601
+INVALID_REQUEST = -32600
+
+
+# ---------------------------
+# Text helpers
+# ---------------------------
+def utf16_len(text: str) -> int:
+    if text.isascii():
+        return len(text)
+    return len(text.encode("utf-16-le")) // 2
+
+
+def utf16_to_index(line: str, character: int) -> int:
+    units = 0
+    for i, ch in enumerate(line):
+        if units >= character:
+            return i
+        units += 2 if ord(ch) > 0xFFFF else 1
+    return len(line)
+
+
+def line_offset(text: str, line: int) -> int:
+    offset = 0
+    for _ in range(line):
+        nl = text.find("\n", offset)
+        if nl == -1:
+            return len(text)
+        offset = nl + 1
+    return offset
+
+
+def position_to_offset(text: str, position: Dict[str, int]) -> int:
+    start = line_offset(text, position["line"])
+    end = text.find("\n", start)
+    if end == -1:
+        end = len(text)
+    return start + utf16_to_index(text[start:end], position["character"])
+
+
+def apply_change(text: str, change: Dict[str, Any]) -> str:
+    if "range" not in change:
+        return change["text"]
+    start = position_to_offset(text, change["range"]["start"])
+    end = position_to_offset(text, change["range"]["end"])
+    return text[:start] + change["text"] + text[end:]
+
+
+def line_range(lines: List[str], first: int, last: int) -> Dict[str, Any]:
+    last_len = utf16_len(lines[last]) if last < len(lines) else 0
+    return {
+        "start": {"line": first, "character": 0},
+        "end": {"line": last, "character": last_len},
+    }
+
+
+# ---------------------------
+# Document analysis
+# ---------------------------
+class Document:
+    def __init__(self, uri: str, text: str, version: Optional[int]) -> None:
+        self.uri = uri
+        self.text = text
+        self.version = version
+        self.ast: Optional[Dict[str, Any]] = None
+        self.ast_text: Optional[str] = None
+        self.spans: Optional[List[Tuple[int, int]]] = None
+        self.errors: List[OpenMarkdownError] = []
+        self.symbols: List[Dict[str, Any]] = []
+        self.folds: List[Dict[str, Any]] = []
+        self.dirty = True
+
+
+def source_path_from_uri(uri: str) -> Optional[str]:
+    if not uri.startswith("file://"):
+        return None
+    return unquote(urlparse(uri).path)
+
+
+def diagnostic_for(exc: OpenMarkdownError, lines: List[str]) -> Dict[str, Any]:
+    line = (exc.line_no - 1) if exc.line_no else 0
+    line = max(0, min(line, len(lines) - 1)) if lines else 0
+    return {
+        "range": line_range(lines, line, line),
+        "severity": SEVERITY_ERROR,
+        "source": "openmarkdown",
+        "message": str(exc),
+    }
+
+
+def build_outline(
+    ast: Dict[str, Any],
+    lines: List[str],
+    spans: List[Tuple[int, int]],
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    body_start = parse_header(lines)["body_start"]
+
+    folds: List[Dict[str, Any]] = [{
+        "startLine": 0,
+        "endLine": body_start - 2,
+        "kind": "region",
+    }]
+    for start, stop in spans:
+        if stop - start > 1:
+            folds.append({
+                "startLine": body_start + start,
+                "endLine": body_start + stop - 1,
+            })
+
+    # Headings own every following block up to the next heading of the same
+    # or a higher level.
+    roots: List[Dict[str, Any]] = []
+    stack: List[Tuple[int, Dict[str, Any]]] = []
+    last_line = len(lines) - 1
+
+    def close(entry: Tuple[int, Dict[str, Any]], end_line: int) -> None:
+        symbol = entry[1]
+        first = symbol["range"]["start"]["line"]
+        while end_line > first and not lines[end_line].strip():
+            end_line -= 1
+        symbol["range"] = line_range(lines, first, end_line)
+        if end_line > first:
+            folds.append({"startLine": first, "endLine": end_line, "kind": "region"})
+
+    for (start, _), node in zip(spans, ast["children"]):
+        if node["type"] != "heading":
+            continue
+        line = body_start + start
+        while stack and stack[-1][0] >= node["level"]:
+            close(stack.pop(), line - 1)
+        symbol = {
+            "name": inline_text(node["content"]) or "#" * node["level"],
+            "kind": SYMBOL_STRING,
+            "range": line_range(lines, line, line),
+            "selectionRange": line_range(lines, line, line),
+            "children": [],
+        }
+        if stack:
+            stack[-1][1]["children"].append(symbol)
+        else:
+            roots.append(symbol)
+        stack.append((node["level"], symbol))
+    while stack:
+        close(stack.pop(), last_line)
+
+    return roots, folds
+
+
+def analyze(doc: Document) -> List[Dict[str, Any]]:
+    lines = source_lines(doc.text)
+    source_path = source_path_from_uri(doc.uri)
+    # Both paths recover from errors, so an error only costs a reparse of the
+    # blocks around the edit and the outline stays current.
+    errors: List[OpenMarkdownError] = []
+    try:
+        if doc.ast is not None and doc.ast_text is not None:
+            ast, spans = reparse_with_spans(
+                doc.ast,
+                doc.ast_text,
+                doc.text,
+                source_path=source_path,
+                old_spans=doc.spans,
+                diagnostics=errors,
+                old_diagnostics=doc.errors,
+            )
+        else:
+            ast, spans = full_parse(doc.text, source_path, errors)
+        doc.symbols, doc.folds = build_outline(ast, lines, spans)
+    except OpenMarkdownError as exc:
+        # Keep the last good outline so the editor does not flicker.
+        doc.dirty = False
+        return [diagnostic_for(exc, lines)]
+    doc.ast = ast
+    doc.ast_text = doc.text
+    doc.spans = spans
+    doc.errors = errors
+    doc.dirty = False
+    return [diagnostic_for(error, lines) for error in errors]
+
+
+# ---------------------------
+# Server
+# ---------------------------
+class Server:
+    def __init__(self, reader, writer) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.documents: Dict[str, Document] = {}
+        self.lock = threading.RLock()
+        self.write_lock = threading.Lock()
+        self.timers: Dict[str, threading.Timer] = {}
+        self.shutdown_requested = False
+
+    # --- transport ---
+    def read_message(self) -> Optional[Dict[str, Any]]:
+        length = None
+        while True:
+            line = self.reader.readline()
+            if not line:
+                return None
+            line = line.decode("ascii").strip()
+            if not line:
+                break
+            m = re.match(r"Content-Length:\s*(\d+)", line, re.IGNORECASE)
+            if m:
+                length = int(m.group(1))
+        if length is None:
+            return {}
+        return json.loads(self.reader.read(length).decode("utf-8"))
+
+    def send(self, payload: Dict[str, Any]) -> None:
+        payload["jsonrpc"] = "2.0"
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        with self.write_lock:
+            self.writer.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii"))
+            self.writer.write(body)
+            self.writer.flush()
+
+    def notify(self, method: str, params: Dict[str, Any]) -> None:
+        self.send({"method": method, "params": params})
+
+    # --- analysis scheduling ---
+    def schedule(self, uri: str) -> None:
+        with self.lock:
+            timer = self.timers.pop(uri, None)
+            if timer:
+                timer.cancel()
+            timer = threading.Timer(DEBOUNCE_SECONDS, self.publish, args=(uri,))
+            timer.daemon = True
+            self.timers[uri] = timer
+            timer.start()
+
+    def publish(self, uri: str) -> None:
+        with self.lock:
+            self.timers.pop(uri, None)
+            doc = self.documents.get(uri)
+            if doc is None or not doc.dirty:
+                return
+            diagnostics = analyze(doc)
+            version = doc.version
+        params = {"uri": uri, "diagnostics": diagnostics}
+        if version is not None:
+            params["version"] = version
+        self.notify("textDocument/publishDiagnostics", params)
+
+    def current(self, uri: str) -> Optional[Document]:
+        # Requests never wait for the debounce timer.
+        with self.lock:
+            doc = self.documents.get(uri)
+            if doc is not None and doc.dirty:
+                timer = self.timers.pop(uri, None)
+                if timer:
+                    timer.cancel()
+        if doc is not None and doc.dirty:
+            self.publish(uri)
+        return doc
+
+    # --- handlers ---
+    def on_initialize(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "capabilities": {
+                "textDocumentSync": {"openClose": True, "change": SYNC_INCREMENTAL},
+                "documentSymbolProvider": True,
+                "foldingRangeProvider": True,
+            },
+            "serverInfo": {"name": "openmarkdown-lsp", "version": "1.3"},
+        }
+
+    def on_did_open(self, params: Dict[str, Any]) -> None:
+        item = params["textDocument"]
+        with self.lock:
+            self.documents[item["uri"]] = Document(
+                item["uri"], item["text"], item.get("version")
+            )
+        self.publish(item["uri"])
+
+    def on_did_change(self, params: Dict[str, Any]) -> None:
+        uri = params["textDocument"]["uri"]
+        with self.lock:
+            doc = self.documents.get(uri)
+            if doc is None:
+                return
+            for change in params["contentChanges"]:
+                doc.text = apply_change(doc.text, change)
+            doc.version = params["textDocument"].get("version")
+            doc.dirty = True
+        self.schedule(uri)
+
+    def on_did_close(self, params: Dict[str, Any]) -> None:
+        uri = params["textDocument"]["uri"]
+        with self.lock:
+            timer = self.timers.pop(uri, None)
+            if timer:
+                timer.cancel()
+            self.documents.pop(uri, None)
+        self.notify("textDocument/publishDiagnostics", {"uri": uri, "diagnostics": []})
+
+    def on_document_symbol(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        doc = self.current(params["textDocument"]["uri"])
+        return doc.symbols if doc else []
+
+    def on_folding_range(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        doc = self.current(params["textDocument"]["uri"])
+        return doc.folds if doc else []
+
+    def on_shutdown(self, params: Any) -> None:
+        self.shutdown_requested = True
+        return None
+
+    def dispatch(self, message: Dict[str, Any]) -> Optional[int]:
+        method = message.get("method")
+        params = message.get("params") or {}
+        msg_id = message.get("id")
+        requests = {
+            "initialize": self.on_initialize,
+            "shutdown": self.on_shutdown,
+            "textDocument/documentSymbol": self.on_document_symbol,
+            "textDocument/foldingRange": self.on_folding_range,
+        }
+        notifications = {
+            "textDocument/didOpen": self.on_did_open,
+            "textDocument/didChange": self.on_did_change,
+            "textDocument/didClose": self.on_did_close,
+        }
+
+        if method == "exit":
+            return 0 if self.shutdown_requested else 1
+        if msg_id is None:
+            handler = notifications.get(method)
+            if handler:
+                handler(params)
+            return None
+        if self.shutdown_requested and method != "shutdown":
+            self.send({
+                "id": msg_id,
+                "error": {"code": INVALID_REQUEST, "message": "Server is shutting down"},
+            })
+            return None
+        handler = requests.get(method)
+        if handler is None:
+            self.send({
+                "id": msg_id,
+                "error": {"code": METHOD_NOT_FOUND, "message": f"Unknown method: {method}"},
+            })
+            return None
+        self.send({"id": msg_id, "result": handler(params)})
+        return None
+
+    def serve(self) -> int:
+        while True:
+            message = self.read_message()
+            if message is None:
+                return 0 if self.shutdown_requested else 1
+            if not message:
+                continue
+            code = self.dispatch(message)
+            if code is not None:
+                return code
+
+
+def main() -> int:
+    reader = sys.stdin.buffer
+    writer = sys.stdout.buffer
+    # stdout is the protocol channel; keep parser progress output off it.
+    log_utils.set_reporter(log_utils.QuietReporter())
+    return Server(reader, writer).serve()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -6,7 +6,8 @@ from typing import Optional
 
 from parser import OpenMarkdownError, parse_openmarkdown_v1
 from render import render_html, export_pdf
-from log_utils import set_steps
+from log_utils import pop_progress_arg, set_steps
+import instrument
 
 from prompt_toolkit import PromptSession
 from prompt_toolkit.completion import PathCompleter
@@ -96,6 +97,21 @@ def choose_export_format(default: str = "html") -> str:
 
 
 def main() -> int:
+    timings, timings_json = instrument.pop_timing_args(sys.argv)
+    memory, memory_json = instrument.pop_memory_args(sys.argv)
+    trace_path = instrument.pop_trace_arg(sys.argv)
+    pop_progress_arg(sys.argv)
+    status = run()
+    if timings:
+        instrument.write_report(timings_json)
+    if memory:
+        instrument.write_memory_report(memory_json)
+    if trace_path:
+        instrument.write_trace(trace_path)
+    return status
+
+
+def run() -> int:
     print("OpenMarkdown v1.3")
     print("Minimal renderer")
     print("-----------------")
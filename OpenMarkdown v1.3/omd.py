@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# omd.py
+
+import functools
+import os
+import sys
+from typing import List, Optional
+
+import instrument
+import log_utils
+from cliargs import pop_flag, pop_option
+
+
+# Headless entry point for scripts and builds. Only what a command needs is
+# imported: prompt_toolkit for interactive mode, and Playwright/PyPDF2 (inside
+# render.export_pdf) for PDF output. Successful runs print nothing. "-" as
+# input or output reads stdin / writes stdout, and the AST never leaves the
+# process. With --daemon the document is sent to a running daemon.py and the
+# parser and renderer are not imported at all.
+FORMATS = ["html", "pdf", "pages"]
+
+
+def usage() -> None:
+    print(
+        "Usage:\n"
+        "  python3 omd.py render in.omd|- -o out.html|out.pdf|- [--css style.css] [--format html|pdf]\n"
+        "  python3 omd.py render in.omd|- -o out_dir --format pages [--split-level N] [--css style.css]\n"
+        "                        [--base-dir DIR] [--section ID|\"Title > Subtitle\"]\n"
+        "                        [--jobs N] [--columnar-tables]\n"
+        "                        [--progress auto|tty|text|json|quiet] [--timings] [--memory]\n"
+        "                        [--trace trace.json] [--daemon [--port 8765]]\n"
+        "  python3 omd.py sections in.omd|-   # heading index as JSON\n"
+        "  python3 omd.py interactive"
+    )
+
+
+def output_format(out_path: str, fmt: Optional[str]) -> Optional[str]:
+    if fmt is None:
+        fmt = "pdf" if out_path.lower().endswith(".pdf") else "html"
+    return fmt if fmt in FORMATS else None
+
+
+def render_command(args: List[str]) -> int:
+    out_path = pop_option(args, "-o") or pop_option(args, "--output")
+    css_path = pop_option(args, "--css")
+    fmt = pop_option(args, "--format")
+    level = pop_option(args, "--split-level")
+    section = pop_option(args, "--section")
+    base_dir = pop_option(args, "--base-dir")
+    use_daemon = pop_flag(args, "--daemon")
+    port = pop_option(args, "--port")
+    jobs = pop_option(args, "--jobs")
+    columnar_tables = pop_flag(args, "--columnar-tables")
+    timings, timings_json = instrument.pop_timing_args(args)
+    memory, memory_json = instrument.pop_memory_args(args)
+    trace_path = instrument.pop_trace_arg(args)
+    # Scripted runs are quiet unless progress output is asked for.
+    if "--progress" not in args:
+        log_utils.set_reporter(log_utils.QuietReporter())
+    log_utils.pop_progress_arg(args)
+    if len(args) != 1 or not out_path:
+        usage()
+        return 1
+    fmt = output_format(out_path, fmt)
+    if fmt is None:
+        print(f"Error: --format must be one of {', '.join(FORMATS)}", file=sys.stderr)
+        return 1
+    if jobs is not None and not jobs.isdigit():
+        print("Error: --jobs must be a number", file=sys.stderr)
+        return 1
+    if level is not None and not level.isdigit():
+        print("Error: --split-level must be a heading level", file=sys.stderr)
+        return 1
+    if fmt == "pages" and (use_daemon or out_path == "-"):
+        print("Error: --format pages writes a directory and cannot use --daemon or -o -", file=sys.stderr)
+        return 1
+    if section and (use_daemon or jobs is not None):
+        print("Error: --section cannot be used with --daemon or --jobs", file=sys.stderr)
+        return 1
+
+    in_path = args[0]
+    # local: images resolve against --base-dir, the input's folder, or for
+    # stdin the current directory.
+    source_path = in_path
+    if in_path == "-":
+        source_path = os.path.join(os.path.abspath(base_dir or "."), "-")
+    elif base_dir:
+        source_path = os.path.join(os.path.abspath(base_dir), os.path.basename(in_path))
+    try:
+        if in_path == "-":
+            text = sys.stdin.read()
+        else:
+            with open(in_path, "r", encoding="utf-8") as f:
+                text = f.read()
+        css_text = None
+        if css_path:
+            with open(css_path, "r", encoding="utf-8") as f:
+                css_text = f.read()
+    except OSError as exc:
+        print(f"Error: cannot read {exc.filename}: {exc.strerror}", file=sys.stderr)
+        return 1
+
+    if use_daemon:
+        return render_remote(fmt, text, os.path.abspath(source_path), css_text, out_path, port)
+
+    from parser import OpenMarkdownError, parse_openmarkdown_v1
+    from render import iter_body, render_html, write_html
+
+    # --jobs N parses and renders in N worker processes. Pages share one pool;
+    # a single page starts its own, which inherits the children at fork.
+    workers = int(jobs or 1)
+    render_body = iter_body
+    pool = None
+    if workers > 1:
+        import parallel
+
+        if fmt == "pages":
+            pool = parallel.worker_pool(workers)
+        render_body = functools.partial(parallel.render_body, workers=workers, executor=pool)
+
+    status = 0
+    try:
+        if section:
+            from sections import parse_section
+
+            ast = parse_section(text, section, source_path=source_path, columnar_tables=columnar_tables)
+        elif workers > 1:
+            ast = parallel.parse_openmarkdown_parallel(
+                text,
+                source_path=source_path,
+                workers=workers,
+                executor=pool,
+                columnar_tables=columnar_tables,
+            )
+        else:
+            ast = parse_openmarkdown_v1(text, source_path=source_path, columnar_tables=columnar_tables)
+    except OpenMarkdownError as exc:
+        print(f"Parse error: {exc}", file=sys.stderr)
+        status = 1
+    except LookupError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        status = 1
+    else:
+        if fmt == "html":
+            write_html(ast, out_path, css=css_text, render_body=render_body)
+        elif fmt == "pages":
+            from pages import write_pages
+
+            write_pages(
+                ast,
+                out_path,
+                css=css_text,
+                level=int(level) if level else None,
+                render_body=render_body,
+            )
+        else:
+            from render import write_pdf
+
+            html_out = render_html(ast, css=css_text, inline_local_images=True, render_body=render_body)
+            try:
+                write_pdf(html_out, out_path, meta=ast.get("meta"), title=ast.get("title"))
+            except ImportError as exc:
+                print(f"Error: PDF export needs Playwright ({exc})", file=sys.stderr)
+                status = 1
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    if timings:
+        instrument.write_report(timings_json)
+    if memory:
+        instrument.write_memory_report(memory_json)
+    if trace_path:
+        instrument.write_trace(trace_path)
+    return status
+
+
+def render_remote(
+    fmt: str,
+    text: str,
+    source_path: str,
+    css_text: Optional[str],
+    out_path: str,
+    port: Optional[str],
+) -> int:
+    import client
+
+    try:
+        port_no = client.daemon_port(port)
+    except ValueError:
+        print("Error: --port must be a number", file=sys.stderr)
+        return 1
+    payload = {"text": text, "source_path": source_path, "css": css_text}
+    try:
+        status, body = client.call(port_no, f"/{fmt}", payload)
+    except OSError as exc:
+        print(f"Error: no render daemon on port {port_no} ({exc})", file=sys.stderr)
+        return 1
+    if status != 200:
+        prefix = "Parse error" if status == 422 else "Error"
+        print(f"{prefix}: {client.error_message(body)}", file=sys.stderr)
+        return 1
+    if out_path == "-":
+        sys.stdout.buffer.write(body)
+        sys.stdout.buffer.flush()
+    else:
+        with open(out_path, "wb") as f:
+            f.write(body)
+    return 0
+
+
+def sections_command(args: List[str]) -> int:
+    if len(args) != 1:
+        usage()
+        return 1
+    import json
+
+    from parser import OpenMarkdownError
+    from sections import document_index
+
+    log_utils.set_reporter(log_utils.QuietReporter())
+    try:
+        if args[0] == "-":
+            text = sys.stdin.read()
+        else:
+            with open(args[0], "r", encoding="utf-8") as f:
+                text = f.read()
+        index = document_index(text)
+    except OSError as exc:
+        print(f"Error: cannot read {exc.filename}: {exc.strerror}", file=sys.stderr)
+        return 1
+    except OpenMarkdownError as exc:
+        print(f"Parse error: {exc}", file=sys.stderr)
+        return 1
+    print(json.dumps(index, indent=2, ensure_ascii=False))
+    return 0
+
+
+def main(argv: List[str]) -> int:
+    if not argv or argv[0] in {"-h", "--help"}:
+        usage()
+        return 0 if argv else 1
+    command, args = argv[0], list(argv[1:])
+    if command == "render":
+        return render_command(args)
+    if command == "sections":
+        return sections_command(args)
+    if command == "interactive" and not args:
+        import main as interactive
+
+        return interactive.main()
+    usage()
+    return 1
+
+
+def run(argv: List[str]) -> int:
+    try:
+        status = main(argv)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader of "-o -" went away, e.g. "| head". Later flushes, at
+        # exit included, go to devnull so no second error is printed.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(run(sys.argv[1:]))
@@ -0,0 +1,152 @@
+# pages.py
+
+import json
+import os
+from typing import Callable, Dict, Any, Iterable, List, Optional
+
+import instrument
+from log_utils import log_step
+from render import HTML_TAIL, esc, html_head, iter_body, prepare_images, title_block
+from sections import inline_text, unique_slug
+
+
+# Splits a rendered document into one HTML file per top-level section so that
+# huge documents stay usable in a browser. A new page starts at every top-level
+# heading of the split level, which defaults to the highest level used at the
+# top level. Blocks before the first such heading form index.html with the
+# title and a table of contents; if there are none, the first section is the
+# index. The stylesheet is written once as style.css and linked from every
+# page, and sections.json lists the pages and the headings on each.
+CSS_FILE = "style.css"
+INDEX_FILE = "sections.json"
+
+
+def split_level(children: List[Dict[str, Any]]) -> Optional[int]:
+    levels = [n["level"] for n in children if n["type"] == "heading"]
+    return min(levels) if levels else None
+
+
+def split_pages(children: List[Dict[str, Any]], level: Optional[int]) -> List[List[Dict[str, Any]]]:
+    pages: List[List[Dict[str, Any]]] = [[]]
+    for node in children:
+        if (
+            level is not None
+            and node["type"] == "heading"
+            and node["level"] <= level
+            and pages[-1]
+        ):
+            pages.append([])
+        pages[-1].append(node)
+    return pages
+
+
+def page_entries(
+    ast: Dict[str, Any],
+    pages: List[List[Dict[str, Any]]],
+    level: Optional[int],
+) -> List[Dict[str, Any]]:
+    entries = []
+    used = {"index"}
+    for i, nodes in enumerate(pages):
+        headings = [
+            {"level": n["level"], "title": inline_text(n["content"])}
+            for n in nodes
+            if n["type"] == "heading"
+        ]
+        starts_section = (
+            level is not None
+            and bool(nodes)
+            and nodes[0]["type"] == "heading"
+            and nodes[0]["level"] <= level
+        )
+        title = headings[0]["title"] if starts_section else ast.get("title", "")
+        if i == 0:
+            name = "index.html"
+        else:
+            name = f"{i:03d}-{unique_slug(title, used)}.html"
+        entries.append({
+            "file": name,
+            "title": title,
+            "blocks": len(nodes),
+            "headings": headings,
+        })
+    return entries
+
+
+def page_nav(ast: Dict[str, Any], entries: List[Dict[str, Any]], i: int) -> str:
+    links = []
+    if i > 0:
+        prev = entries[i - 1]
+        links.append(f'<a rel="prev" href="{esc(prev["file"])}">← {esc(prev["title"])}</a>')
+        links.append(f'<a href="index.html">{esc(ast.get("title", ""))}</a>')
+    links.append(f"<span>{i + 1} / {len(entries)}</span>")
+    if i + 1 < len(entries):
+        nxt = entries[i + 1]
+        links.append(f'<a rel="next" href="{esc(nxt["file"])}">{esc(nxt["title"])} →</a>')
+    return f"<nav class=\"omd-pages\">{' · '.join(links)}</nav>"
+
+
+def contents(entries: List[Dict[str, Any]]) -> str:
+    items = "".join(
+        f'<li><a href="{esc(e["file"])}">{esc(e["title"])}</a></li>'
+        for e in entries[1:]
+    )
+    return f"<ol class=\"omd-toc\">{items}</ol>" if items else ""
+
+
+def write_pages(
+    ast: Dict[str, Any],
+    out_dir: str,
+    css: Optional[str] = None,
+    level: Optional[int] = None,
+    inline_local_images: bool = False,
+    render_body: Callable[[List[Dict[str, Any]]], Iterable[str]] = iter_body,
+) -> Dict[str, Any]:
+    log_step("Rendering HTML...")
+    total = instrument.start()
+    prepare_images(ast, inline_local_images)
+    os.makedirs(out_dir, exist_ok=True)
+
+    style = ""
+    if css:
+        with open(os.path.join(out_dir, CSS_FILE), "w", encoding="utf-8") as f:
+            f.write(css)
+        style = f'<link rel="stylesheet" href="{CSS_FILE}">'
+
+    children = ast.get("children", [])
+    if level is None:
+        level = split_level(children)
+    pages = split_pages(children, level)
+    entries = page_entries(ast, pages, level)
+
+    # Pages are rendered and written one at a time.
+    for i, (nodes, entry) in enumerate(zip(pages, entries)):
+        started = instrument.start()
+        title = ast.get("title") if i == 0 else f"{entry['title']} – {ast.get('title', '')}"
+        nav = page_nav(ast, entries, i)
+        with open(os.path.join(out_dir, entry["file"]), "w", encoding="utf-8") as f:
+            f.write(html_head(ast, style, title))
+            f.write("\n" + nav)
+            if i == 0:
+                f.write("\n" + title_block(ast))
+            for part in render_body(nodes):
+                f.write(part)
+            if i == 0 and len(entries) > 1:
+                f.write("\n" + contents(entries))
+            f.write("\n" + nav)
+            f.write(HTML_TAIL)
+        instrument.stop("render.page", started)
+
+    index = {
+        "title": ast.get("title", ""),
+        "meta": {k: v for k, v in (ast.get("meta") or {}).items() if k != "base_dir"},
+        "split_level": level,
+        "css": CSS_FILE if css else None,
+        "pages": entries,
+    }
+    with open(os.path.join(out_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    instrument.stop("render.pages", total)
+    log_step("HTML rendering complete.")
+    return index
@@ -0,0 +1,298 @@
+# parallel.py
+
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import instrument
+from log_utils import log_step
+from parser import (
+    OpenMarkdownError,
+    build_document,
+    iter_blocks,
+    parse_blocks,
+    parse_header,
+    source_lines,
+)
+from render import iter_body, render_html, render_table_head, render_table_rows
+from tables import row_count, slice_rows
+
+
+# Chunks smaller than this are not worth the trip to another process.
+MIN_CHUNK_LINES = 2000
+
+
+# Every task returns instrument.take_report() with its result, and the parent
+# merges it, so --timings, --memory and --trace include the work done in
+# workers. Under --memory each chunk is a phase of its own in its worker.
+def warm_worker(settings: Tuple[bool, bool, bool]) -> None:
+    import log_utils
+
+    log_utils.set_reporter(log_utils.QuietReporter())
+    instrument.init_worker(settings)
+
+
+def worker_pool(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=warm_worker,
+        initargs=(instrument.worker_settings(),),
+    )
+
+
+# ---------------------------
+# Parsing
+# ---------------------------
+# The body is cut only where a top-level block starts after a blank line, the
+# same rule incremental.reparse uses to resume. Blank lines inside fences, $$
+# blocks and quote runs are never block starts, and a paragraph that ends at a
+# blank line is never tight_after, so every chunk parses exactly as it would in
+# one sequential pass. A body the scanner rejects (an unterminated block or a
+# bad list marker) is parsed sequentially so errors and recovery stay the same.
+def split_points(lines: List[str], start_line: int, chunks: int) -> List[int]:
+    target = max(MIN_CHUNK_LINES, len(lines) // max(1, chunks))
+    points = [0]
+    for start, _ in iter_blocks(lines, 0, start_line):
+        if start - points[-1] >= target and not lines[start - 1].strip():
+            points.append(start)
+    points.append(len(lines))
+    return points
+
+
+def parse_chunk(
+    lines: List[str],
+    start_line: int,
+    recover: bool,
+    columnar_tables: bool = False,
+) -> Tuple[List[Dict[str, Any]], List[OpenMarkdownError], Optional[Dict[str, Any]]]:
+    diagnostics: Optional[List[OpenMarkdownError]] = [] if recover else None
+    with instrument.memory_phase("parse.parallel.chunk"):
+        parsed = parse_blocks(lines, False, start_line, diagnostics, columnar_tables)
+    return parsed["children"], diagnostics or [], instrument.take_report()
+
+
+def parse_body(
+    lines: List[str],
+    start_line: int,
+    executor: Executor,
+    chunks: int,
+    diagnostics: Optional[List[OpenMarkdownError]] = None,
+    columnar_tables: bool = False,
+) -> List[Dict[str, Any]]:
+    started = instrument.start()
+    try:
+        points = split_points(lines, start_line, chunks)
+    except OpenMarkdownError:
+        points = [0, len(lines)]
+    instrument.stop("parse.parallel.split", started)
+    if len(points) <= 2:
+        return parse_blocks(lines, False, start_line, diagnostics, columnar_tables)["children"]
+
+    recover = diagnostics is not None
+    futures = [
+        executor.submit(parse_chunk, lines[a:b], start_line + a, recover, columnar_tables)
+        for a, b in zip(points, points[1:])
+    ]
+    children: List[Dict[str, Any]] = []
+    try:
+        # Results are taken in document order, so the error raised is the one
+        # from the earliest failing chunk, as in a sequential parse.
+        for future in futures:
+            chunk_children, chunk_diagnostics, report = future.result()
+            instrument.merge_report(report)
+            children.extend(chunk_children)
+            if recover:
+                diagnostics.extend(chunk_diagnostics)
+    finally:
+        for future in futures:
+            future.cancel()
+    return children
+
+
+def parse_openmarkdown_parallel(
+    text: str,
+    source_path: Optional[str] = None,
+    diagnostics: Optional[List[OpenMarkdownError]] = None,
+    workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+    columnar_tables: bool = False,
+) -> Dict[str, Any]:
+    # Same result and errors as parser.parse_openmarkdown_v1. Pass an executor
+    # to reuse worker processes across documents.
+    log_step("Parsing your file...")
+    total = instrument.start()
+    with instrument.memory_phase("parse.document"):
+        lines = source_lines(text)
+
+        started = instrument.start()
+        header = parse_header(lines, diagnostics)
+        instrument.stop("parse.header", started)
+        idx = header["body_start"]
+
+        pool = executor or worker_pool(workers)
+        try:
+            chunks = workers or os.cpu_count() or 1
+            children = parse_body(lines[idx:], idx + 1, pool, chunks, diagnostics, columnar_tables)
+        finally:
+            if executor is None:
+                pool.shutdown(cancel_futures=True)
+        ast = build_document(header, children, source_path, diagnostics)
+        instrument.stop("parse.document", total)
+
+    log_step("AST constructed.")
+    return ast
+
+
+# ---------------------------
+# Rendering
+# ---------------------------
+# Top-level children are grouped into runs of roughly equal weight and each
+# run goes through render.render_blocks in a worker. A table too heavy for one
+# run is split by rows: the parent writes the table head and workers render
+# row slices. Fragments are yielded in document order as they complete.
+#
+# Without an executor, a pool is started for the document and the children are
+# handed to the workers once, as initializer arguments. With fork (the default
+# on Linux) they are inherited rather than pickled, and tasks carry only index
+# ranges. An executor passed in is reused as is, and each task pickles its
+# slice of nodes.
+MIN_RENDER_WEIGHT = 2000
+_children: List[Dict[str, Any]] = []
+
+
+def load_children(children: List[Dict[str, Any]], settings: Tuple[bool, bool, bool]) -> None:
+    global _children
+    warm_worker(settings)
+    _children = children
+
+
+def node_weight(node: Dict[str, Any]) -> int:
+    t = node["type"]
+    if t == "table":
+        return row_count(node) + 1
+    if t == "list":
+        return len(node["items"])
+    if t in {"blockquote", "callout"}:
+        return sum(node_weight(child) for child in node.get("children", [])) + 1
+    return 1
+
+
+def render_nodes(nodes: List[Dict[str, Any]]) -> Tuple[str, Optional[Dict[str, Any]]]:
+    with instrument.memory_phase("render.parallel.chunk"):
+        html_out = "".join(iter_body(nodes))
+    return html_out, instrument.take_report()
+
+
+def render_rows(
+    node: Dict[str, Any],
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    with instrument.memory_phase("render.parallel.chunk"):
+        html_out = render_table_rows(node, start, stop)
+    return html_out, instrument.take_report()
+
+
+def render_node_range(start: int, stop: int) -> Tuple[str, Optional[Dict[str, Any]]]:
+    return render_nodes(_children[start:stop])
+
+
+def render_row_range(index: int, start: int, stop: int) -> Tuple[str, Optional[Dict[str, Any]]]:
+    return render_rows(_children[index], start, stop)
+
+
+# A plan is a list of literal HTML strings and ("nodes", start, stop) or
+# ("rows", index, start, stop) tasks, in document order.
+def render_plan(children: List[Dict[str, Any]], target: int) -> List[Any]:
+    plan: List[Any] = []
+    start = 0
+    weight = 0
+    for i, node in enumerate(children):
+        node_w = node_weight(node)
+        if node["type"] == "table" and node_w > target:
+            if start < i:
+                plan.append(("nodes", start, i))
+            plan.append("\n" + render_table_head(node))
+            rows = row_count(node)
+            for r in range(0, rows, target):
+                plan.append(("rows", i, r, min(r + target, rows)))
+            plan.append("</tbody></table>")
+            start = i + 1
+            weight = 0
+            continue
+        weight += node_w
+        if weight >= target:
+            plan.append(("nodes", start, i + 1))
+            start = i + 1
+            weight = 0
+    if start < len(children):
+        plan.append(("nodes", start, len(children)))
+    return plan
+
+
+def submit_task(executor: Executor, task: Any, children: List[Dict[str, Any]], shared: bool) -> Any:
+    if task[0] == "nodes":
+        _, start, stop = task
+        if shared:
+            return executor.submit(render_node_range, start, stop)
+        return executor.submit(render_nodes, children[start:stop])
+    _, index, start, stop = task
+    if shared:
+        return executor.submit(render_row_range, index, start, stop)
+    return executor.submit(render_rows, slice_rows(children[index], start, stop))
+
+
+def render_body(
+    children: List[Dict[str, Any]],
+    workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> Iterator[str]:
+    total = sum(node_weight(node) for node in children)
+    parts = workers or os.cpu_count() or 1
+    if total < 2 * MIN_RENDER_WEIGHT:
+        yield from iter_body(children)
+        return
+
+    started = instrument.start()
+    plan = render_plan(children, max(MIN_RENDER_WEIGHT, total // (parts * 4)))
+    instrument.stop("render.parallel.plan", started)
+    shared = executor is None
+    pool = executor or ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=load_children,
+        initargs=(children, instrument.worker_settings()),
+    )
+    futures = [
+        piece if isinstance(piece, str) else submit_task(pool, piece, children, shared)
+        for piece in plan
+    ]
+    try:
+        for piece in futures:
+            if isinstance(piece, str):
+                yield piece
+                continue
+            html_out, report = piece.result()
+            instrument.merge_report(report)
+            yield html_out
+    finally:
+        for piece in futures:
+            if not isinstance(piece, str):
+                piece.cancel()
+        if shared:
+            pool.shutdown(cancel_futures=True)
+
+
+def render_html_parallel(
+    ast: Dict[str, Any],
+    css: Optional[str] = None,
+    inline_local_images: bool = False,
+    workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> str:
+    # Same output as render.render_html.
+    return render_html(
+        ast,
+        css,
+        inline_local_images,
+        lambda children: render_body(children, workers, executor),
+    )
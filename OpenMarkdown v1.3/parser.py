@@ -4,19 +4,33 @@ import re
 import sys
 import json
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 
-from log_utils import log_step
+import instrument
+from log_utils import log_step, pop_progress_arg
 
 
 class OpenMarkdownError(Exception):
-    pass
+    def __init__(self, message: str, line_no: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.line_no = line_no
 
 
 def syntax_error(message: str, line_no: Optional[int] = None) -> OpenMarkdownError:
     if line_no is None:
         return OpenMarkdownError(f"Syntax error: {message}")
-    return OpenMarkdownError(f"Syntax error on line {line_no}: {message}")
+    return OpenMarkdownError(f"Syntax error on line {line_no}: {message}", line_no)
+
+
+# In recovering mode callers pass a diagnostics list; errors are collected
+# there and the caller falls back to literal text instead of aborting.
+def report(
+    exc: OpenMarkdownError,
+    diagnostics: Optional[List[OpenMarkdownError]],
+) -> None:
+    if diagnostics is None:
+        raise exc
+    diagnostics.append(exc)
 
 def strip_comments(text: str) -> str:
     def repl(match: re.Match) -> str:
@@ -93,10 +107,22 @@ def find_next_unescaped(text: str, token: str, start: int) -> int:
     return idx
 
 
-def validate_inline_syntax(text: str, line_no: Optional[int]) -> None:
+# Every rule in validate_inline_syntax starts on one of these characters, so
+# the scan can jump straight between them.
+INLINE_MARKERS = re.compile(r"[\\`*=~$]")
+
+
+def validate_inline_syntax(
+    text: str,
+    line_no: Optional[int],
+    space_cancel: bool = True,
+) -> None:
     if line_no is None:
         return
-    i = 0
+    m = INLINE_MARKERS.search(text)
+    if not m:
+        return
+    i = m.start()
     n = len(text)
     while i < n:
         if text[i] == "\\":
@@ -115,7 +141,7 @@ def validate_inline_syntax(text: str, line_no: Optional[int]) -> None:
             i = close_idx + run_len
             continue
         if text.startswith("**", i) and not is_escaped(text, i):
-            if i + 2 < n and text[i + 2].isspace():
+            if space_cancel and i + 2 < n and text[i + 2].isspace():
                 i += 2
                 continue
             close_idx = find_next_unescaped(text, "**", i + 2)
@@ -126,7 +152,7 @@ def validate_inline_syntax(text: str, line_no: Optional[int]) -> None:
             i = close_idx + 2
             continue
         if text.startswith("==", i) and not is_escaped(text, i):
-            if i + 2 < n and text[i + 2].isspace():
+            if space_cancel and i + 2 < n and text[i + 2].isspace():
                 i += 2
                 continue
             close_idx = find_next_unescaped(text, "==", i + 2)
@@ -137,7 +163,7 @@ def validate_inline_syntax(text: str, line_no: Optional[int]) -> None:
             i = close_idx + 2
             continue
         if text[i] == "~" and not is_escaped(text, i):
-            if i + 1 < n and text[i + 1].isspace():
+            if space_cancel and i + 1 < n and text[i + 1].isspace():
                 i += 1
                 continue
             close_idx = find_next_unescaped(text, "~", i + 1)
@@ -151,7 +177,7 @@ def validate_inline_syntax(text: str, line_no: Optional[int]) -> None:
             if i + 1 < n and text[i + 1] == "*":
                 i += 1
                 continue
-            if i + 1 < n and text[i + 1].isspace():
+            if space_cancel and i + 1 < n and text[i + 1].isspace():
                 i += 1
                 continue
             close_idx = find_next_unescaped(text, "*", i + 1)
@@ -165,7 +191,7 @@ def validate_inline_syntax(text: str, line_no: Optional[int]) -> None:
             if i + 1 < n and text[i + 1] == "$":
                 i += 2
                 continue
-            if i + 1 < n and text[i + 1].isspace():
+            if space_cancel and i + 1 < n and text[i + 1].isspace():
                 i += 1
                 continue
             close_idx = find_next_unescaped(text, "$", i + 1)
@@ -175,10 +201,14 @@ def validate_inline_syntax(text: str, line_no: Optional[int]) -> None:
                 raise syntax_error("Empty inline math", line_no)
             i = close_idx + 1
             continue
-        i += 1
+        m = INLINE_MARKERS.search(text, i + 1)
+        if not m:
+            return
+        i = m.start()
 
 
 def parse_inline(text: str, line_no: Optional[int] = None) -> List[Dict[str, Any]]:
+    started = instrument.start()
     validate_inline_syntax(text, line_no)
     nodes: List[Dict[str, Any]] = []
 
@@ -256,9 +286,142 @@ def parse_inline(text: str, line_no: Optional[int] = None) -> List[Dict[str, Any
 
         text = text[earliest_match.end():]
 
+    instrument.stop("parse.inline", started, trace=False)
     return nodes
 
 
+def parse_inline_or_text(
+    text: str,
+    line_no: Optional[int],
+    diagnostics: Optional[List[OpenMarkdownError]] = None,
+    lazy: Optional[List["LazyInline"]] = None,
+) -> List[Dict[str, Any]]:
+    if lazy is not None:
+        return defer_inline([text], line_no, lazy)
+    if diagnostics is None:
+        return parse_inline(text, line_no)
+    try:
+        return parse_inline(text, line_no)
+    except OpenMarkdownError as exc:
+        diagnostics.append(exc)
+        return [{"type": "text", "value": text}]
+
+
+# ---------------------------
+# Lazy inline content
+# ---------------------------
+# With lazy_inline=True the parser stores the inline content of headings,
+# paragraphs, list items, table cells and callout titles as source lines and
+# parses it in place the first time it is read. Reading content that has an
+# error raises the error a full parse would have raised, every time until it
+# is fixed. materialize() parses everything in the order of a full parse.
+#
+# Every list method that reads or changes the items goes through materialize()
+# first, since list's own methods read the (still empty) storage directly. Only
+# code that bypasses Python methods, such as the C json encoder, sees an empty
+# list, which is why write_json materializes first.
+def materialized(name: str) -> Any:
+    method = getattr(list, name)
+
+    def call(self: "LazyInline", *args: Any, **kwargs: Any) -> Any:
+        for arg in args:
+            if isinstance(arg, LazyInline):
+                arg.materialize()
+        return method(self.materialize(), *args, **kwargs)
+
+    call.__name__ = name
+    return call
+
+
+class LazyInline(list):
+    __slots__ = ("lines", "line_no")
+
+    def __init__(self, lines: List[str], line_no: Optional[int]) -> None:
+        super().__init__()
+        self.lines: Optional[List[str]] = lines
+        self.line_no = line_no
+
+    def materialize(self) -> "LazyInline":
+        if self.lines is not None:
+            nodes: List[Dict[str, Any]] = []
+            for i, line in enumerate(self.lines):
+                if i:
+                    nodes.append({"type": "linebreak"})
+                nodes.extend(parse_inline(line, self.line_no + i))
+            self.lines = None
+            list.extend(self, nodes)
+        return self
+
+    def __radd__(self, other: Any) -> Any:
+        # [] + content: list has no __radd__ of its own to wrap.
+        if not isinstance(other, list):
+            return NotImplemented
+        return list.__add__(other, self.materialize())
+
+    def __repr__(self) -> str:
+        if self.lines is not None:
+            return f"LazyInline({self.lines!r}, {self.line_no!r})"
+        return list.__repr__(self)
+
+    def __reduce_ex__(self, protocol: Any) -> Any:
+        # Copies and pickles stay unparsed.
+        if self.lines is not None:
+            return LazyInline, (self.lines, self.line_no)
+        return list, (list(list.__iter__(self)),)
+
+
+for name in (
+    "__iter__", "__reversed__", "__len__", "__getitem__", "__contains__",
+    "__eq__", "__ne__", "__lt__", "__le__", "__gt__", "__ge__",
+    "__add__", "__mul__", "__rmul__", "__iadd__", "__imul__",
+    "__setitem__", "__delitem__", "copy", "count", "index",
+    "append", "extend", "insert", "pop", "remove", "clear", "sort", "reverse",
+):
+    setattr(LazyInline, name, materialized(name))
+del name
+
+
+def defer_inline(lines: List[str], line_no: Optional[int], pending: List[LazyInline]) -> LazyInline:
+    content = LazyInline(lines, line_no)
+    pending.append(content)
+    return content
+
+
+def materialize_blocks(nodes: List[Dict[str, Any]]) -> None:
+    for n in nodes:
+        t = n.get("type")
+        if t in {"heading", "paragraph"}:
+            materialize_content(n["content"])
+        elif t == "blockquote":
+            materialize_blocks(n.get("children", []))
+        elif t == "callout":
+            materialize_blocks(n.get("children", []))
+            materialize_content(n.get("title", []))
+        elif t == "list":
+            for item in n["items"]:
+                materialize_content(item["content"])
+                materialize_blocks(item.get("children", []))
+        elif t == "table":
+            for row in n.get("rows", []):
+                for cell in row:
+                    materialize_content(cell)
+            for cell in n["header"]:
+                materialize_content(cell)
+
+
+def materialize_content(content: List[Dict[str, Any]]) -> None:
+    if isinstance(content, LazyInline):
+        content.materialize()
+
+
+# Parses all lazy content of an AST, in the same order as a full parse, so the
+# first error raised is the one parse_openmarkdown_v1 would raise. Afterwards
+# the AST can be serialised like any other.
+def materialize(ast: Dict[str, Any]) -> Dict[str, Any]:
+    materialize_blocks(ast.get("children", []))
+    return ast
+
+
 # ---------------------------
 # Table helpers
 # ---------------------------
@@ -273,6 +436,45 @@ def split_table_row(line: str) -> List[str]:
     return [c.strip() for c in line.strip("|").split("|")]
 
 
+# Body rows of a columnar table: cells stay raw strings, one list per column,
+# with None where a row has fewer cells than the widest one. They are checked
+# here in the same order as a full parse, so the same errors are raised, and
+# only parsed when used (see tables.py). In recovering mode cells that fail
+# are listed under "literal" and render as plain text.
+def columnar_table(
+    lines: List[str],
+    idx: int,
+    start_line: int,
+    diagnostics: Optional[List[OpenMarkdownError]] = None,
+) -> Tuple[Dict[str, Any], int]:
+    first = idx
+    columns: List[List[Optional[str]]] = []
+    literal: List[List[int]] = []
+    while idx < len(lines) and "|" in lines[idx]:
+        row = idx - first
+        cells = split_table_row(lines[idx])
+        for col, cell in enumerate(cells):
+            if col == len(columns):
+                columns.append([None] * row)
+            columns[col].append(cell)
+            try:
+                validate_inline_syntax(cell, start_line + idx)
+            except OpenMarkdownError as exc:
+                report(exc, diagnostics)
+                literal.append([row, col])
+        for col in range(len(cells), len(columns)):
+            columns[col].append(None)
+        idx += 1
+    node = {
+        "columns": columns,
+        "row_count": idx - first,
+        "first_line": start_line + first,
+    }
+    if literal:
+        node["literal"] = literal
+    return node, idx
+
+
 # ---------------------------
 # List helpers
 # ---------------------------
@@ -324,13 +526,21 @@ def parse_list(
     base_indent: int,
     start_line: int,
     list_type: str,
+    diagnostics: Optional[List[OpenMarkdownError]] = None,
+    lazy: Optional[List[LazyInline]] = None,
 ) -> (List[Dict[str, Any]], int):
     items = []
     while idx < len(lines):
         line = lines[idx]
         if not line.strip():
             break
-        info = parse_list_line(line, start_line + idx)
+        try:
+            info = parse_list_line(line, start_line + idx)
+        except OpenMarkdownError:
+            if diagnostics is None:
+                raise
+            # parse_blocks reports the line once the whole list unwinds.
+            break
         if not info:
             break
         if info["list_type"] != list_type and info["indent"] == base_indent:
@@ -347,6 +557,8 @@ def parse_list(
                 indent,
                 start_line,
                 info["list_type"],
+                diagnostics,
+                lazy,
             )
             if nested_items:
                 items[-1].setdefault("children", []).append({
@@ -357,7 +569,7 @@ def parse_list(
             continue
         items.append({
             "checkbox": info["checkbox"],
-            "content": parse_inline(info["content"], info["line_no"])
+            "content": parse_inline_or_text(info["content"], info["line_no"], diagnostics, lazy)
         })
         idx += 1
     return items, idx
@@ -366,16 +578,34 @@ def parse_list(
 # ---------------------------
 # Parser
 # ---------------------------
+def literal_paragraph(line: str) -> Dict[str, Any]:
+    return {
+        "type": "paragraph",
+        "content": [{"type": "text", "value": line}],
+        "tight_after": False,
+    }
+
+
 def parse_blocks(
     lines: List[str],
     allow_title: bool = False,
     start_line: int = 1,
+    diagnostics: Optional[List[OpenMarkdownError]] = None,
+    columnar_tables: bool = False,
+    lazy: Optional[List[LazyInline]] = None,
 ) -> Dict[str, Any]:
     children: List[Dict[str, Any]] = []
     title: Optional[str] = None
     idx = 0
+    # Per block type timings are inclusive: nested blocks and inline parsing
+    # count towards the enclosing block as well.
+    started = instrument.start()
+    timed = 0
 
     while idx < len(lines):
+        if started is not None and len(children) > timed:
+            started = instrument.lap(f"parse.block.{children[-1]['type']}", started)
+            timed = len(children)
         line = lines[idx]
         line_no = start_line + idx
 
@@ -397,7 +627,10 @@ def parse_blocks(
                 math.append(lines[idx])
                 idx += 1
             if idx >= len(lines):
-                raise syntax_error("Unterminated $$ block", line_no)
+                report(syntax_error("Unterminated $$ block", line_no), diagnostics)
+                children.append(literal_paragraph(line))
+                idx = line_no - start_line + 1
+                continue
             idx += 1
             children.append({
                 "type": "math_block",
@@ -420,7 +653,7 @@ def parse_blocks(
             children.append({
                 "type": "heading",
                 "level": len(m.group(1)),
-                "content": parse_inline(m.group(2), line_no)
+                "content": parse_inline_or_text(m.group(2), line_no, diagnostics, lazy)
             })
             idx += 1
             continue
@@ -459,10 +692,13 @@ def parse_blocks(
                         body_lines,
                         allow_title=False,
                         start_line=body_start,
+                        diagnostics=diagnostics,
+                        columnar_tables=columnar_tables,
+                        lazy=lazy,
                     )
                     children.append({
                         "type": "callout",
-                        "title": parse_inline(title, quote_start),
+                        "title": parse_inline_or_text(title, quote_start, diagnostics, lazy),
                         "color": color,
                         "children": callout_parsed["children"],
                     })
@@ -472,6 +708,9 @@ def parse_blocks(
                 quote_lines,
                 allow_title=False,
                 start_line=quote_start,
+                diagnostics=diagnostics,
+                columnar_tables=columnar_tables,
+                lazy=lazy,
             )
             children.append({
                 "type": "blockquote",
@@ -483,22 +722,43 @@ def parse_blocks(
         if idx + 1 < len(lines) and "|" in line and is_table_separator(lines[idx + 1]):
             header_cells = split_table_row(line)
             idx += 2
+            if columnar_tables:
+                body, idx = columnar_table(lines, idx, start_line, diagnostics)
+                children.append({
+                    "type": "table",
+                    "layout": "columnar",
+                    "header": [
+                        parse_inline_or_text(c, line_no, diagnostics, lazy)
+                        for c in header_cells
+                    ],
+                    **body,
+                })
+                continue
             rows = []
             while idx < len(lines) and "|" in lines[idx]:
                 rows.append([
-                    parse_inline(c, start_line + idx)
+                    parse_inline_or_text(c, start_line + idx, diagnostics, lazy)
                     for c in split_table_row(lines[idx])
                 ])
                 idx += 1
             children.append({
                 "type": "table",
-                "header": [parse_inline(c, line_no) for c in header_cells],
+                "header": [
+                    parse_inline_or_text(c, line_no, diagnostics, lazy)
+                    for c in header_cells
+                ],
                 "rows": rows
             })
             continue
 
         # List
-        list_info = parse_list_line(line, line_no)
+        try:
+            list_info = parse_list_line(line, line_no)
+        except OpenMarkdownError as exc:
+            report(exc, diagnostics)
+            children.append(literal_paragraph(line))
+            idx += 1
+            continue
         if list_info:
             items, idx = parse_list(
                 lines,
@@ -506,12 +766,21 @@ def parse_blocks(
                 list_info["indent"],
                 start_line,
                 list_info["list_type"],
+                diagnostics,
+                lazy,
             )
             children.append({
                 "type": "list",
                 "list_type": list_info["list_type"],
                 "items": items
             })
+            if diagnostics is not None and idx < len(lines) and lines[idx].strip():
+                try:
+                    parse_list_line(lines[idx], start_line + idx)
+                except OpenMarkdownError as exc:
+                    diagnostics.append(exc)
+                    children.append(literal_paragraph(lines[idx]))
+                    idx += 1
             continue
 
         # Code / Mermaid
@@ -525,7 +794,10 @@ def parse_blocks(
                 code.append(lines[idx])
                 idx += 1
             if idx >= len(lines):
-                raise syntax_error("Unterminated code block", line_no)
+                report(syntax_error("Unterminated code block", line_no), diagnostics)
+                children.append(literal_paragraph(line))
+                idx = line_no - start_line + 1
+                continue
             idx += 1
 
             if info == "mermaid":
@@ -552,11 +824,14 @@ def parse_blocks(
             idx += 1
         tight_after = idx < len(lines) and lines[idx].strip().startswith("```")
 
-        nodes = []
-        for i, p in enumerate(para):
-            nodes.extend(parse_inline(p, line_no + i))
-            if i < len(para) - 1:
-                nodes.append({"type": "linebreak"})
+        if lazy is not None:
+            nodes = defer_inline(para, line_no, lazy)
+        else:
+            nodes = []
+            for i, p in enumerate(para):
+                nodes.extend(parse_inline_or_text(p, line_no + i, diagnostics))
+                if i < len(para) - 1:
+                    nodes.append({"type": "linebreak"})
 
         children.append({
             "type": "paragraph",
@@ -564,91 +839,591 @@ def parse_blocks(
             "tight_after": tight_after,
         })
 
+    if started is not None and len(children) > timed:
+        instrument.lap(f"parse.block.{children[-1]['type']}", started)
     return {"children": children, "title": title}
 
 
-def parse_openmarkdown_v1(text: str, source_path: Optional[str] = None) -> Dict[str, Any]:
-    log_step("Parsing your file...")
+# ---------------------------
+# Block scanner
+# ---------------------------
+# Mirrors the dispatch in parse_blocks without building any nodes, so callers
+# can find top-level block boundaries cheaply. Keep the two in sync.
+MATH_LINE_RE = re.compile(r"\$\$(.+?)\$\$")
+HEADING_RE = re.compile(r"(#{1,6})\s+(.*)")
+HR_RE = re.compile(r"(-{3,}|\*{3,}|_{3,})")
+
+
+def skip_list(
+    lines: List[str],
+    idx: int,
+    base_indent: int,
+    start_line: int,
+    list_type: str,
+    validate: bool = False,
+    recover: bool = False,
+) -> int:
+    has_items = False
+    while idx < len(lines):
+        line = lines[idx]
+        if not line.strip():
+            break
+        try:
+            info = parse_list_line(line, start_line + idx)
+        except OpenMarkdownError:
+            if not recover:
+                raise
+            break
+        if not info:
+            break
+        if info["list_type"] != list_type and info["indent"] == base_indent:
+            break
+        indent = info["indent"]
+        if indent < base_indent:
+            break
+        if indent > base_indent:
+            if not has_items:
+                break
+            idx = skip_list(lines, idx, indent, start_line, info["list_type"], validate, recover)
+            continue
+        if validate:
+            validate_inline_syntax(info["content"], info["line_no"])
+        has_items = True
+        idx += 1
+    return idx
+
+
+# With recover=True the scanner follows parse_blocks in recovering mode
+# instead of raising: the opening line of an unterminated block, a line with a
+# bad list marker and a bad line right after a list are blocks of one line.
+def iter_blocks(
+    lines: List[str],
+    idx: int = 0,
+    start_line: int = 1,
+    recover: bool = False,
+) -> Iterator[Tuple[int, int]]:
+    while idx < len(lines):
+        line = lines[idx]
+        line_no = start_line + idx
+
+        if not line.strip():
+            idx += 1
+            continue
+
+        start = idx
+        stripped = line.strip()
+
+        if stripped == "$$":
+            idx += 1
+            while idx < len(lines) and lines[idx].strip() != "$$":
+                idx += 1
+            if idx >= len(lines):
+                if not recover:
+                    raise syntax_error("Unterminated $$ block", line_no)
+                idx = start
+            idx += 1
+        elif (
+            MATH_LINE_RE.match(line)
+            or HEADING_RE.match(line)
+            or HR_RE.fullmatch(stripped)
+        ):
+            idx += 1
+        elif line.lstrip().startswith(">"):
+            while idx < len(lines) and lines[idx].lstrip().startswith(">"):
+                idx += 1
+        elif idx + 1 < len(lines) and "|" in line and is_table_separator(lines[idx + 1]):
+            idx += 2
+            while idx < len(lines) and "|" in lines[idx]:
+                idx += 1
+        else:
+            marker = line.lstrip(" \t")[:1]
+            list_info = None
+            bad_line = False
+            if marker == "-" or marker.isdigit():
+                try:
+                    list_info = parse_list_line(line, line_no)
+                except OpenMarkdownError:
+                    if not recover:
+                        raise
+                    bad_line = True
+            if bad_line:
+                idx += 1
+            elif list_info:
+                idx = skip_list(
+                    lines,
+                    idx,
+                    list_info["indent"],
+                    start_line,
+                    list_info["list_type"],
+                    recover=recover,
+                )
+                if recover and idx < len(lines) and lines[idx].strip():
+                    try:
+                        parse_list_line(lines[idx], start_line + idx)
+                    except OpenMarkdownError:
+                        yield start, idx
+                        start = idx
+                        idx += 1
+            elif stripped.startswith("```"):
+                ticks = len(stripped) - len(stripped.lstrip("`"))
+                idx += 1
+                while idx < len(lines) and lines[idx].strip() != "`" * ticks:
+                    idx += 1
+                if idx >= len(lines):
+                    if not recover:
+                        raise syntax_error("Unterminated code block", line_no)
+                    idx = start
+                idx += 1
+            else:
+                idx += 1
+                while idx < len(lines) and lines[idx].strip():
+                    if lines[idx].strip().startswith("```"):
+                        break
+                    idx += 1
+
+        yield start, idx
+
+
+# ---------------------------
+# Validation
+# ---------------------------
+# Runs the same checks as parse_blocks, in the same order, without building
+# nodes. The first error raised is the one a full parse would raise.
+def validate_blocks(lines: List[str], start_line: int = 1) -> None:
+    idx = 0
+
+    while idx < len(lines):
+        line = lines[idx]
+        line_no = start_line + idx
+
+        if not line.strip():
+            idx += 1
+            continue
+
+        stripped = line.strip()
+
+        if stripped == "$$":
+            idx += 1
+            while idx < len(lines) and lines[idx].strip() != "$$":
+                idx += 1
+            if idx >= len(lines):
+                raise syntax_error("Unterminated $$ block", line_no)
+            idx += 1
+            continue
+
+        if MATH_LINE_RE.match(line):
+            idx += 1
+            continue
+
+        m = HEADING_RE.match(line)
+        if m:
+            validate_inline_syntax(m.group(2), line_no)
+            idx += 1
+            continue
+
+        if HR_RE.fullmatch(stripped):
+            idx += 1
+            continue
+
+        if line.lstrip().startswith(">"):
+            quote_lines = []
+            while idx < len(lines) and lines[idx].lstrip().startswith(">"):
+                raw = lines[idx].lstrip()[1:]
+                quote_lines.append(raw[1:] if raw.startswith(" ") else raw)
+                idx += 1
+            header = quote_lines[0].strip()
+            callout_match = re.match(r"\[([^\]]+)\]\s*\{([^}]+)\}\s*$", header)
+            if callout_match and re.search(
+                r"(?:^|[;\s])(?:colour|color)\s*:\s*([^;]+)\s*",
+                callout_match.group(2),
+                re.IGNORECASE,
+            ):
+                body_lines = quote_lines[1:]
+                if body_lines and not body_lines[0].strip():
+                    body_lines = body_lines[1:]
+                validate_blocks(body_lines, line_no + 1)
+                validate_inline_syntax(callout_match.group(1).strip(), line_no)
+            else:
+                validate_blocks(quote_lines, line_no)
+            continue
+
+        if idx + 1 < len(lines) and "|" in line and is_table_separator(lines[idx + 1]):
+            idx += 2
+            while idx < len(lines) and "|" in lines[idx]:
+                for c in split_table_row(lines[idx]):
+                    validate_inline_syntax(c, start_line + idx)
+                idx += 1
+            for c in split_table_row(line):
+                validate_inline_syntax(c, line_no)
+            continue
+
+        marker = line.lstrip(" \t")[:1]
+        list_info = None
+        if marker == "-" or marker.isdigit():
+            list_info = parse_list_line(line, line_no)
+        if list_info:
+            idx = skip_list(
+                lines,
+                idx,
+                list_info["indent"],
+                start_line,
+                list_info["list_type"],
+                validate=True,
+            )
+            continue
+
+        if stripped.startswith("```"):
+            ticks = len(stripped) - len(stripped.lstrip("`"))
+            idx += 1
+            while idx < len(lines) and lines[idx].strip() != "`" * ticks:
+                idx += 1
+            if idx >= len(lines):
+                raise syntax_error("Unterminated code block", line_no)
+            idx += 1
+            continue
+
+        validate_inline_syntax(line, line_no)
+        idx += 1
+        while idx < len(lines) and lines[idx].strip():
+            if lines[idx].strip().startswith("```"):
+                break
+            validate_inline_syntax(lines[idx], start_line + idx)
+            idx += 1
+
+
+def source_lines(text: str) -> List[str]:
     text = text.replace("\r\n", "\n").replace("\r", "\n")
+    started = instrument.start()
     text = strip_comments(text)
-    lines = text.splitlines()
-    idx = 0
+    instrument.stop("parse.strip_comments", started)
+    return text.splitlines()
 
-    # --- Header ---
-    if not lines or lines[0].strip() != "---":
-        raise syntax_error("Missing YAML header", 1)
 
-    idx += 1
+def parse_header(
+    lines: List[str],
+    diagnostics: Optional[List[OpenMarkdownError]] = None,
+) -> Dict[str, Any]:
+    idx = 0
     header = {}
 
-    while idx < len(lines) and lines[idx].strip() != "---":
-        if ":" not in lines[idx]:
-            raise syntax_error(f"Invalid header line: {lines[idx]}", idx + 1)
-        k, v = lines[idx].split(":", 1)
-        header[k.strip()] = v.strip()
+    if not lines or lines[0].strip() != "---":
+        report(syntax_error("Missing YAML header", 1), diagnostics)
+        header["OpenMarkdown-Version"] = "1.3"
+    else:
+        idx += 1
+        while idx < len(lines) and lines[idx].strip() != "---":
+            if ":" not in lines[idx]:
+                report(syntax_error(f"Invalid header line: {lines[idx]}", idx + 1), diagnostics)
+                idx += 1
+                continue
+            k, v = lines[idx].split(":", 1)
+            header[k.strip()] = v.strip()
+            idx += 1
         idx += 1
 
     if header.get("OpenMarkdown-Version") != "1.3":
-        raise syntax_error("Unsupported OpenMarkdownVersion")
+        report(syntax_error("Unsupported OpenMarkdownVersion"), diagnostics)
 
     author = header.get("author")
     date = header.get("date")
     tags = header.get("tags")
     if author is not None and author.strip() == "":
-        raise syntax_error("Header author cannot be empty")
+        report(syntax_error("Header author cannot be empty"), diagnostics)
+        author = None
     if date is not None and not re.fullmatch(r"\d{1,2}\.\d{1,2}\.\d{4}", date):
-        raise syntax_error("Header date must use D.M.YYYY format (e.g. 1.1.2026)")
+        report(syntax_error("Header date must use D.M.YYYY format (e.g. 1.1.2026)"), diagnostics)
+        date = None
     tag_list = None
     if tags is not None:
         tag_list = [t.strip() for t in tags.split(",") if t.strip()]
         if not tag_list:
-            raise syntax_error("Header tags cannot be empty")
+            report(syntax_error("Header tags cannot be empty"), diagnostics)
+            tag_list = None
 
-    idx += 1
+    # None means the title line itself was missing and already reported.
+    title = None
     if idx >= len(lines):
-        raise syntax_error("Missing document title", idx + 1)
+        report(syntax_error("Missing document title", idx + 1), diagnostics)
+    elif not lines[idx].startswith("#* "):
+        report(
+            syntax_error("Document title must be the first line after the header", idx + 1),
+            diagnostics,
+        )
+    else:
+        title = lines[idx][3:].strip()
+        idx += 1
+
+    return {
+        "version": "1.3",
+        "author": author,
+        "date": date,
+        "tags": tag_list,
+        "title": title,
+        "body_start": idx,
+    }
 
-    title_line = lines[idx]
-    if not title_line.startswith("#* "):
-        raise syntax_error("Document title must be the first line after the header", idx + 1)
-    title = title_line[3:].strip()
-    idx += 1
 
-    parsed = parse_blocks(lines[idx:], allow_title=False, start_line=idx + 1)
+def build_document(
+    header: Dict[str, Any],
+    children: List[Dict[str, Any]],
+    source_path: Optional[str] = None,
+    diagnostics: Optional[List[OpenMarkdownError]] = None,
+) -> Dict[str, Any]:
     ast = {
         "type": "document",
-        "version": "1.3",
-        "title": title,
-        "children": parsed["children"],
+        "version": header["version"],
+        "title": header["title"] or "",
+        "children": children,
     }
     meta = {}
-    if author is not None:
-        meta["author"] = author
-    if date is not None:
-        meta["date"] = date
-    if tag_list is not None:
-        meta["tags"] = tag_list
+    if header["author"] is not None:
+        meta["author"] = header["author"]
+    if header["date"] is not None:
+        meta["date"] = header["date"]
+    if header["tags"] is not None:
+        meta["tags"] = header["tags"]
     if source_path:
         meta["base_dir"] = os.path.dirname(os.path.abspath(source_path))
     if meta:
         ast["meta"] = meta
 
-    if not ast["title"]:
-        raise syntax_error("Missing document title", idx)
+    if header["title"] == "":
+        report(syntax_error("Missing document title", header["body_start"]), diagnostics)
+    return ast
+
+
+def parse_openmarkdown_v1(
+    text: str,
+    source_path: Optional[str] = None,
+    diagnostics: Optional[List[OpenMarkdownError]] = None,
+    columnar_tables: bool = False,
+    lazy_inline: bool = False,
+) -> Dict[str, Any]:
+    log_step("Parsing your file...")
+    total = instrument.start()
+    with instrument.memory_phase("parse.document"):
+        lines = source_lines(text)
+
+        # --- Header ---
+        started = instrument.start()
+        header = parse_header(lines, diagnostics)
+        instrument.stop("parse.header", started)
+        idx = header["body_start"]
+
+        # Lazy content is not used in recovering mode, which reports every error.
+        pending: Optional[List[LazyInline]] = [] if lazy_inline and diagnostics is None else None
+        try:
+            parsed = parse_blocks(
+                lines[idx:],
+                allow_title=False,
+                start_line=idx + 1,
+                diagnostics=diagnostics,
+                columnar_tables=columnar_tables,
+                lazy=pending,
+            )
+            ast = build_document(header, parsed["children"], source_path, diagnostics)
+        except OpenMarkdownError:
+            # A full parse would have stopped at an inline error before this one.
+            for content in pending or []:
+                content.materialize()
+            raise
+        instrument.stop("parse.document", total)
 
     log_step("AST constructed.")
     return ast
 
 
+def validate(text: str) -> None:
+    lines = source_lines(text)
+    header = parse_header(lines)
+    idx = header["body_start"]
+    validate_blocks(lines[idx:], start_line=idx + 1)
+    if header["title"] == "":
+        raise syntax_error("Missing document title", idx)
+
+
+def read_header_lines(f) -> List[str]:
+    # Streams lines through the same normalisation as source_lines and stops
+    # once the title line after the closing "---" has been read. A comment
+    # that is still open has to be resolved first: strip_comments leaves an
+    # unterminated "<#" in place, so its text is kept if no "#>" follows.
+    lines: List[str] = []
+    closing = None
+    in_comment = False
+    pending: List[str] = []
+    pending_prefix = ""
+
+    for raw in f:
+        line = raw.rstrip("\n")
+        if in_comment:
+            pending.append(raw)
+            end = line.find("#>")
+            if end == -1:
+                continue
+            in_comment = False
+            out = pending_prefix + "\n" * (len(pending) - 1)
+            pending = []
+            i = end + 2
+        else:
+            out = ""
+            i = 0
+        while True:
+            start = line.find("<#", i)
+            if start == -1:
+                out += line[i:]
+                break
+            end = line.find("#>", start + 2)
+            if end == -1:
+                out += line[i:start]
+                in_comment = True
+                pending = [raw[start:]]
+                pending_prefix = ""
+                break
+            out += line[i:start]
+            i = end + 2
+        if in_comment:
+            pending_prefix = out
+            continue
+
+        lines.extend((out + raw[len(line):]).splitlines())
+        if not lines:
+            continue
+        if lines[0].strip() != "---":
+            break
+        if closing is None:
+            for k in range(1, len(lines)):
+                if lines[k].strip() == "---":
+                    closing = k
+                    break
+        if closing is not None and len(lines) > closing + 1:
+            break
+
+    if in_comment:
+        lines.extend((pending_prefix + "".join(pending)).splitlines())
+    return lines
+
+
+def read_metadata(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return read_metadata_from(f)
+
+
+def read_metadata_from(f) -> Dict[str, Any]:
+    lines = read_header_lines(f)
+    header = parse_header(lines)
+    if header["title"] == "":
+        raise syntax_error("Missing document title", header["body_start"])
+    return {
+        "version": header["version"],
+        "title": header["title"],
+        "author": header["author"],
+        "date": header["date"],
+        "tags": header["tags"],
+    }
+
+
+def parse_with_diagnostics(
+    text: str,
+    source_path: Optional[str] = None,
+) -> Tuple[Dict[str, Any], List[OpenMarkdownError]]:
+    diagnostics: List[OpenMarkdownError] = []
+    ast = parse_openmarkdown_v1(text, source_path=source_path, diagnostics=diagnostics)
+    return ast, diagnostics
+
+
+# Streams the AST to stdout in chunks instead of building one big string.
+# json reads list contents directly, so lazy content is parsed first.
+def write_json(ast: Dict[str, Any]) -> None:
+    materialize(ast)
+    json.dump(ast, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python3 parse.py file.omd")
+    args = sys.argv[1:]
+    pop_progress_arg(args)
+    if args and args[0] == "--check":
+        if len(args) < 2:
+            print("Usage: python3 parse.py --check file.omd [file.omd ...]")
+            sys.exit(1)
+        failed = 0
+        for path in args[1:]:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    validate(f.read())
+            except OpenMarkdownError as exc:
+                print(f"{path}: Parse error: {exc}", file=sys.stderr)
+                failed += 1
+        sys.exit(1 if failed else 0)
+
+    if args and args[0] == "--meta":
+        if len(args) != 2:
+            print("Usage: python3 parse.py --meta file.omd")
+            sys.exit(1)
+        try:
+            print(json.dumps(read_metadata(args[1]), indent=2))
+        except OpenMarkdownError as exc:
+            print(f"Parse error: {exc}", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
+
+    recover = "--recover" in args
+    if recover:
+        args.remove("--recover")
+    columnar_tables = "--columnar-tables" in args
+    if columnar_tables:
+        args.remove("--columnar-tables")
+    base_dir = None
+    if "--base-dir" in args:
+        i = args.index("--base-dir")
+        if i + 1 >= len(args):
+            print("Error: --base-dir requires a directory")
+            sys.exit(1)
+        base_dir = args[i + 1]
+        del args[i:i + 2]
+    timings, timings_json = instrument.pop_timing_args(args)
+    memory, memory_json = instrument.pop_memory_args(args)
+    trace_path = instrument.pop_trace_arg(args)
+    if len(args) != 1:
+        print(
+            "Usage: python3 parse.py [--recover | --check | --meta] file.omd|- [--base-dir DIR] "
+            "[--columnar-tables] [--timings] [--timings-json out.json] [--trace trace.json]\n"
+            "  [--memory] [--memory-json out.json] [--progress auto|tty|text|json|quiet]"
+        )
         sys.exit(1)
 
+    # "-" reads the document from stdin; local: images then resolve against
+    # --base-dir, or the current directory.
+    source_path = args[0]
+    if source_path == "-":
+        source_path = os.path.join(os.path.abspath(base_dir or "."), "-")
+    elif base_dir:
+        source_path = os.path.join(os.path.abspath(base_dir), os.path.basename(source_path))
+
+    status = 0
     try:
-        with open(sys.argv[1], "r", encoding="utf-8") as f:
-            ast = parse_openmarkdown_v1(f.read(), source_path=sys.argv[1])
-        print(json.dumps(ast, indent=2))
+        if args[0] == "-":
+            text = sys.stdin.read()
+        else:
+            with open(args[0], "r", encoding="utf-8") as f:
+                text = f.read()
+        if recover:
+            diagnostics = []
+            ast = parse_openmarkdown_v1(text, source_path, diagnostics, columnar_tables)
+            write_json(ast)
+            for exc in diagnostics:
+                print(f"Parse error: {exc}", file=sys.stderr)
+            status = 1 if diagnostics else 0
+        else:
+            ast = parse_openmarkdown_v1(text, source_path, columnar_tables=columnar_tables)
+            write_json(ast)
     except OpenMarkdownError as exc:
         print(f"Parse error: {exc}", file=sys.stderr)
-        sys.exit(1)
+        status = 1
+    if timings:
+        instrument.write_report(timings_json)
+    if memory:
+        instrument.write_memory_report(memory_json)
+    if trace_path:
+        instrument.write_trace(trace_path)
+    sys.exit(status)
@@ -2,17 +2,12 @@
 
 import sys
 import json
-import base64
 import html
-import mimetypes
 import os
-import shutil
-import tempfile
-from pathlib import Path
-from typing import Dict, Any, List, Optional
-from urllib.parse import urlparse, unquote
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional
 
-from log_utils import log_step
+import instrument
+from log_utils import log_step, pop_progress_arg
 
 
 def esc(s: str) -> str:
@@ -82,6 +77,8 @@ def render_list_items(items: List[Dict[str, Any]], list_type: str) -> str:
     return f"<{tag}>{''.join(rendered_items)}</{tag}>"
 
 
+# Modules only some documents or export modes need are imported where they
+# are used, which keeps start-up of the HTML path short.
 def resolve_local_images(nodes: List[Dict[str, Any]], base_dir: Optional[str]) -> None:
     if not base_dir:
         return
@@ -92,6 +89,8 @@ def resolve_local_images(nodes: List[Dict[str, Any]], base_dir: Optional[str]) -
             if isinstance(url, str) and url.startswith("local:"):
                 rel = url[len("local:"):].strip()
                 if rel:
+                    from pathlib import Path
+
                     if os.path.isabs(rel):
                         path = rel
                     else:
@@ -110,13 +109,17 @@ def resolve_local_images(nodes: List[Dict[str, Any]], base_dir: Optional[str]) -
                 for child in item.get("children", []):
                     resolve_local_images([child], base_dir)
         elif n_type == "table":
+            from tables import cells_containing
+
             for cell in n.get("header", []):
                 resolve_local_images(cell, base_dir)
-            for row in n.get("rows", []):
-                for cell in row:
-                    resolve_local_images(cell, base_dir)
+            for cell in cells_containing(n, "local:"):
+                resolve_local_images(cell, base_dir)
 
 def inline_file_images(nodes: List[Dict[str, Any]]) -> None:
+    import base64
+    import mimetypes
+    from urllib.parse import urlparse, unquote
     for n in nodes:
         n_type = n.get("type")
         if n_type == "image":
@@ -142,11 +145,49 @@ def inline_file_images(nodes: List[Dict[str, Any]]) -> None:
                 for child in item.get("children", []):
                     inline_file_images([child])
         elif n_type == "table":
+            from tables import cells_containing
+
             for cell in n.get("header", []):
                 inline_file_images(cell)
-            for row in n.get("rows", []):
-                for cell in row:
-                    inline_file_images(cell)
+            for cell in cells_containing(n, "file://"):
+                inline_file_images(cell)
+
+
+def render_table_head(node: Dict[str, Any]) -> str:
+    head = "".join(f"<th>{render_inline(c)}</th>" for c in node["header"])
+    return f"<table><thead><tr>{head}</tr></thead><tbody>"
+
+
+def render_table_rows(node: Dict[str, Any], start: int = 0, stop: Optional[int] = None) -> str:
+    if node.get("layout") == "columnar":
+        return render_columnar_rows(node, start, node["row_count"] if stop is None else stop)
+    return "".join(
+        "<tr>" + "".join(f"<td>{render_inline(c)}</td>" for c in r) + "</tr>"
+        for r in node["rows"][start:stop]
+    )
+
+
+# Cells without inline markers are escaped as they are; the rest are parsed
+# one at a time and dropped once rendered.
+def render_columnar_rows(node: Dict[str, Any], start: int, stop: int) -> str:
+    from tables import INLINE_START, cell_key, cell_nodes, literal_cells
+
+    columns = node["columns"]
+    parsed = node.get("cells") or {}
+    literal = literal_cells(node)
+    rows = []
+    for row in range(start, stop):
+        cells = []
+        for col, column in enumerate(columns):
+            raw = column[row]
+            if raw is None:
+                break
+            if (parsed and cell_key(row, col) in parsed) or INLINE_START.search(raw):
+                cells.append(f"<td>{render_inline(cell_nodes(node, row, col, literal))}</td>")
+            else:
+                cells.append(f"<td>{esc(raw)}</td>")
+        rows.append("<tr>" + "".join(cells) + "</tr>")
+    return "".join(rows)
 
 
 def render_blocks(nodes: List[Dict[str, Any]]) -> List[str]:
@@ -203,11 +244,7 @@ def render_blocks(nodes: List[Dict[str, Any]]) -> List[str]:
             body.append(render_list_items(n["items"], n.get("list_type", "unordered")))
 
         elif t == "table":
-            head = "".join(f"<th>{render_inline(c)}</th>" for c in n["header"])
-            rows = []
-            for r in n["rows"]:
-                rows.append("<tr>" + "".join(f"<td>{render_inline(c)}</td>" for c in r) + "</tr>")
-            body.append(f"<table><thead><tr>{head}</tr></thead><tbody>{''.join(rows)}</tbody></table>")
+            body.append(f"{render_table_head(n)}{render_table_rows(n)}</tbody></table>")
 
         elif t == "code_block":
             lang = n.get("language")
@@ -227,29 +264,34 @@ def render_blocks(nodes: List[Dict[str, Any]]) -> List[str]:
     return body
 
 
-def render_html(
-    ast: Dict[str, Any],
-    css: Optional[str] = None,
-    inline_local_images: bool = False,
-) -> str:
-    log_step("Rendering HTML...")
+def iter_body(nodes: List[Dict[str, Any]]) -> Iterator[str]:
+    for node in nodes:
+        for part in render_blocks([node]):
+            yield "\n" + part
+
+
+def prepare_images(ast: Dict[str, Any], inline_local_images: bool = False) -> None:
     meta = ast.get("meta") or {}
-    author = meta.get("author")
-    date = meta.get("date")
-    tags = meta.get("tags") or []
-    resolve_local_images(ast.get("children", []), meta.get("base_dir"))
+    started = instrument.start()
+    with instrument.memory_phase("render.resolve_local_images"):
+        resolve_local_images(ast.get("children", []), meta.get("base_dir"))
+    instrument.stop("render.resolve_local_images", started)
     if inline_local_images:
-        inline_file_images(ast.get("children", []))
+        started = instrument.start()
+        with instrument.memory_phase("render.inline_file_images"):
+            inline_file_images(ast.get("children", []))
+        instrument.stop("render.inline_file_images", started)
 
-    body = [f"<h1>{esc(ast['title'])}</h1>"]
-    meta_parts = [p for p in (author, date) if p]
-    if meta_parts:
-        body.append(f"<i class=\"doc-meta\">{esc(' · '.join(meta_parts))}</i>")
-    body.extend(render_blocks(ast["children"]))
 
-    css_block = f"<style>{css}</style>" if css else ""
+# Everything up to the opening of the content div. `style` goes at the end of
+# <head>: an inline <style> block, a stylesheet <link> or nothing.
+def html_head(ast: Dict[str, Any], style: str, title: Optional[str] = None) -> str:
+    meta = ast.get("meta") or {}
+    author = meta.get("author")
+    date = meta.get("date")
+    tags = meta.get("tags") or []
 
-    doc_title = ast.get("title") or "OpenMarkdown1.3"
+    doc_title = title or ast.get("title") or "OpenMarkdown1.3"
     meta_author = author if author else "Salmomini"
     meta_author_tag = f'<meta name="author" content="{esc(meta_author)}">'
     meta_date_tag = f'<meta name="date" content="{esc(date)}">' if date else ""
@@ -257,7 +299,7 @@ def render_html(
         f'<meta name="keywords" content="{esc(", ".join(tags))}">' if tags else ""
     )
 
-    html_out = f"""<!doctype html>
+    return f"""<!doctype html>
 <html>
 <head>
 <meta charset="utf-8">
@@ -274,23 +316,180 @@ def render_html(
 <script src="https://cdn.jsdelivr.net/npm/mermaid/dist/mermaid.min.js"></script>
 <script>mermaid.initialize({{ startOnLoad: true }});</script>
 
-{css_block}
+{style}
 </head>
 <body>
-<div id="write">
-{chr(10).join(body)}
+<div id="write">"""
+
+
+def title_block(ast: Dict[str, Any]) -> str:
+    meta = ast.get("meta") or {}
+    body = [f"<h1>{esc(ast['title'])}</h1>"]
+    meta_parts = [p for p in (meta.get("author"), meta.get("date")) if p]
+    if meta_parts:
+        body.append(f"<i class=\"doc-meta\">{esc(' · '.join(meta_parts))}</i>")
+    return "\n".join(body)
+
+
+HTML_TAIL = """
 </div>
 </body>
 </html>
 """
+
+
+# Yields the page in pieces, one per top-level block, so it can be written out
+# while rendering. When consumed lazily the render timings include the time
+# the consumer spends between pieces. render_body renders the top-level
+# children; parallel.py passes one that spreads them over worker processes.
+def iter_html(
+    ast: Dict[str, Any],
+    css: Optional[str] = None,
+    inline_local_images: bool = False,
+    render_body: Callable[[List[Dict[str, Any]]], Iterable[str]] = iter_body,
+) -> Iterator[str]:
+    log_step("Rendering HTML...")
+    total = instrument.start()
+    with instrument.memory_phase("render.html"):
+        prepare_images(ast, inline_local_images)
+
+        css_block = f"<style>{css}</style>" if css else ""
+        yield html_head(ast, css_block) + "\n" + title_block(ast)
+
+        started = instrument.start()
+        yield from render_body(ast["children"])
+        instrument.stop("render.blocks", started)
+
+        yield HTML_TAIL
+        instrument.stop("render.html", total)
     log_step("HTML rendering complete.")
 
-    return html_out
+
+def render_html(
+    ast: Dict[str, Any],
+    css: Optional[str] = None,
+    inline_local_images: bool = False,
+    render_body: Callable[[List[Dict[str, Any]]], Iterable[str]] = iter_body,
+) -> str:
+    return "".join(iter_html(ast, css, inline_local_images, render_body))
+
+
+# "-" writes to stdout, piece by piece as the page is rendered.
+def write_html(
+    ast: Dict[str, Any],
+    out_path: str,
+    css: Optional[str] = None,
+    inline_local_images: bool = False,
+    render_body: Callable[[List[Dict[str, Any]]], Iterable[str]] = iter_body,
+) -> None:
+    chunks = iter_html(ast, css, inline_local_images, render_body)
+    if out_path == "-":
+        for chunk in chunks:
+            sys.stdout.write(chunk)
+        sys.stdout.flush()
+        return
+    with open(out_path, "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(chunk)
 
 
 # ---------------------------
 # Chromium PDF export
 # ---------------------------
+def pdf_date_from_eu(date_str: str) -> Optional[str]:
+    try:
+        day_str, month_str, year_str = date_str.split(".")
+        day = int(day_str)
+        month = int(month_str)
+        year = int(year_str)
+    except (ValueError, AttributeError):
+        return None
+    if not (1 <= day <= 31 and 1 <= month <= 12):
+        return None
+    return f"D:{year:04d}{month:02d}{day:02d}000000Z"
+
+
+def set_pdf_metadata(
+    pdf_path: str,
+    meta: Optional[Dict[str, Any]] = None,
+    title: Optional[str] = None,
+) -> None:
+    import shutil
+    import tempfile
+
+    try:
+        from PyPDF2 import PdfReader, PdfWriter
+    except Exception:
+        print(
+            "Warning: PyPDF2 not installed; skipping PDF metadata update.",
+            file=sys.stderr,
+        )
+        return
+
+    meta_title = title or "OpenMarkdown1.3 \u2013 By Salmomini"
+    meta = meta or {}
+    meta_author = meta.get("author") or "Salmomini"
+    meta_date = meta.get("date")
+    meta_tags = meta.get("tags") or []
+    reader = PdfReader(pdf_path)
+    writer = PdfWriter()
+    for page in reader.pages:
+        writer.add_page(page)
+    meta_dict = {
+        "/Title": meta_title,
+        "/Author": meta_author,
+    }
+    creator = meta.get("creator")
+    subject = meta.get("subject")
+    if creator:
+        meta_dict["/Creator"] = creator
+    if subject:
+        meta_dict["/Subject"] = subject
+    meta_dict["/Producer"] = (
+        "Made using OpenMarkdown \u2013 by Leon D. | "
+        "Check it out on GitHub! https://github.com/Salmomini/OpenMarkdown"
+    )
+    if meta_tags:
+        meta_dict["/Keywords"] = ", ".join(meta_tags)
+    pdf_date = pdf_date_from_eu(meta_date) if meta_date else None
+    if pdf_date:
+        meta_dict["/CreationDate"] = pdf_date
+    writer.add_metadata(meta_dict)
+
+    out_dir = os.path.dirname(pdf_path)
+    with tempfile.NamedTemporaryFile(
+        suffix=".pdf", delete=False, dir=out_dir if out_dir else None
+    ) as tmp:
+        writer.write(tmp)
+        tmp_path = tmp.name
+    shutil.move(tmp_path, pdf_path)
+
+
+# Prints one page with an already running browser, so callers that keep
+# browsers alive (the render daemon) share the steps with export_pdf.
+def print_page(browser: Any, html_content: str, out_path: str) -> None:
+    page = browser.new_page()
+    try:
+        with instrument.phase("export.page_load"):
+            page.set_content(html_content)
+            page.wait_for_load_state("networkidle")
+        with instrument.phase("export.typeset"):
+            try:
+                page.evaluate("() => (window.MathJax ? MathJax.typesetPromise() : null)")
+            except Exception:
+                pass
+        log_step("Rendering PDF...")
+        with instrument.phase("export.page_pdf"):
+            page.pdf(
+                path=out_path,
+                format="A4",
+                print_background=True,
+                margin={"top": "0.75in", "right": "0.75in", "bottom": "0.75in", "left": "0.75in"},
+            )
+    finally:
+        page.close()
+
+
 def export_pdf(
     html_content: str,
     out_path: str,
@@ -298,90 +497,42 @@ def export_pdf(
     title: Optional[str] = None,
 ) -> None:
     from playwright.sync_api import sync_playwright
-    def pdf_date_from_eu(date_str: str) -> Optional[str]:
-        try:
-            day_str, month_str, year_str = date_str.split(".")
-            day = int(day_str)
-            month = int(month_str)
-            year = int(year_str)
-        except (ValueError, AttributeError):
-            return None
-        if not (1 <= day <= 31 and 1 <= month <= 12):
-            return None
-        return f"D:{year:04d}{month:02d}{day:02d}000000Z"
-
-    def set_pdf_metadata(
-        pdf_path: str,
-        meta: Optional[Dict[str, Any]] = None,
-        title: Optional[str] = None,
-    ) -> None:
-        try:
-            from PyPDF2 import PdfReader, PdfWriter
-        except Exception:
-            print(
-                "Warning: PyPDF2 not installed; skipping PDF metadata update.",
-                file=sys.stderr,
-            )
-            return
-
-        meta_title = title or "OpenMarkdown1.3 \u2013 By Salmomini"
-        meta = meta or {}
-        meta_author = meta.get("author") or "Salmomini"
-        meta_date = meta.get("date")
-        meta_tags = meta.get("tags") or []
-        reader = PdfReader(pdf_path)
-        writer = PdfWriter()
-        for page in reader.pages:
-            writer.add_page(page)
-        meta_dict = {
-            "/Title": meta_title,
-            "/Author": meta_author,
-        }
-        creator = meta.get("creator")
-        subject = meta.get("subject")
-        if creator:
-            meta_dict["/Creator"] = creator
-        if subject:
-            meta_dict["/Subject"] = subject
-        meta_dict["/Producer"] = (
-            "Made using OpenMarkdown \u2013 by Leon D. | "
-            "Check it out on GitHub! https://github.com/Salmomini/OpenMarkdown"
-        )
-        if meta_tags:
-            meta_dict["/Keywords"] = ", ".join(meta_tags)
-        pdf_date = pdf_date_from_eu(meta_date) if meta_date else None
-        if pdf_date:
-            meta_dict["/CreationDate"] = pdf_date
-        writer.add_metadata(meta_dict)
-
-        out_dir = os.path.dirname(pdf_path)
-        with tempfile.NamedTemporaryFile(
-            suffix=".pdf", delete=False, dir=out_dir if out_dir else None
-        ) as tmp:
-            writer.write(tmp)
-            tmp_path = tmp.name
-        shutil.move(tmp_path, pdf_path)
-
-    with sync_playwright() as p:
+
+    started = instrument.start()
+    with instrument.memory_phase("export.pdf"), sync_playwright() as p:
         log_step("Playwright initialized.")
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        page.set_content(html_content)
-        page.wait_for_load_state("networkidle")
-        try:
-            page.evaluate("() => (window.MathJax ? MathJax.typesetPromise() : null)")
-        except Exception:
-            pass
-        log_step("Rendering PDF...")
-        page.pdf(
-            path=out_path,
-            format="A4",
-            print_background=True,
-            margin={"top": "0.75in", "right": "0.75in", "bottom": "0.75in", "left": "0.75in"},
-        )
+        with instrument.phase("export.browser_launch"):
+            browser = p.chromium.launch()
+        print_page(browser, html_content, out_path)
         browser.close()
-        set_pdf_metadata(out_path, meta=meta, title=title)
-        log_step("PDF export complete.")
+        with instrument.phase("export.metadata"):
+            set_pdf_metadata(out_path, meta=meta, title=title)
+        instrument.stop("export.pdf", started)
+    log_step("PDF export complete.")
+
+
+# "-" renders to a temporary file and copies the PDF bytes to stdout.
+def write_pdf(
+    html_content: str,
+    out_path: str,
+    meta: Optional[Dict[str, Any]] = None,
+    title: Optional[str] = None,
+) -> None:
+    if out_path != "-":
+        export_pdf(html_content, out_path, meta=meta, title=title)
+        return
+    import shutil
+    import tempfile
+
+    fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        export_pdf(html_content, tmp_path, meta=meta, title=title)
+        with open(tmp_path, "rb") as f:
+            shutil.copyfileobj(f, sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+    finally:
+        os.remove(tmp_path)
 
 
 # ---------------------------
@@ -391,11 +542,21 @@ def usage() -> None:
     print(
         "Usage:\n"
         "  python3 render.py ast.json --html out.html [--css style.example.css]\n"
-        "  python3 render.py ast.json --pdf out.pdf   [--css style.example.css]"
+        "  python3 render.py ast.json --pdf out.pdf   [--css style.example.css]\n"
+        "  python3 render.py ast.json --pages out_dir [--css style.example.css] [--split-level N]\n"
+        "Use - for ast.json to read the AST from stdin and - as the output to write to stdout.\n"
+        "Add --timings (table on stderr) or --timings-json out.json for phase timings,\n"
+        "--memory / --memory-json out.json for per-phase memory, and --trace trace.json\n"
+        "for a Chrome/Perfetto trace.\n"
+        "--progress auto|tty|text|json|quiet picks how progress steps are reported."
     )
 
 
 if __name__ == "__main__":
+    timings, timings_json = instrument.pop_timing_args(sys.argv)
+    memory, memory_json = instrument.pop_memory_args(sys.argv)
+    trace_path = instrument.pop_trace_arg(sys.argv)
+    pop_progress_arg(sys.argv)
     if len(sys.argv) < 4:
         usage()
         sys.exit(1)
@@ -414,20 +575,44 @@ if __name__ == "__main__":
         with open(sys.argv[css_idx + 1], "r", encoding="utf-8") as f:
             css_text = f.read()
 
-    with open(ast_path, "r", encoding="utf-8") as f:
-        ast = json.load(f)
+    level: Optional[int] = None
+    if "--split-level" in sys.argv:
+        level_idx = sys.argv.index("--split-level")
+        if level_idx + 1 >= len(sys.argv) or not sys.argv[level_idx + 1].isdigit():
+            print("Error: --split-level requires a heading level")
+            sys.exit(1)
+        level = int(sys.argv[level_idx + 1])
 
-    html_out = render_html(ast, css=css_text, inline_local_images=(mode == "--pdf"))
+    if mode not in {"--html", "--pdf", "--pages"}:
+        usage()
+        sys.exit(1)
+
+    if ast_path == "-":
+        ast = json.load(sys.stdin)
+    else:
+        with open(ast_path, "r", encoding="utf-8") as f:
+            ast = json.load(f)
 
     if mode == "--html":
-        with open(out_path, "w", encoding="utf-8") as f:
-            f.write(html_out)
-        print(f"Wrote HTML: {out_path}")
+        write_html(ast, out_path, css=css_text)
+        if out_path != "-":
+            print(f"Wrote HTML: {out_path}")
+
+    elif mode == "--pages":
+        from pages import write_pages
 
-    elif mode == "--pdf":
-        export_pdf(html_out, out_path, meta=ast.get("meta"), title=ast.get("title"))
-        print(f"Wrote PDF: {out_path}")
+        index = write_pages(ast, out_path, css=css_text, level=level)
+        print(f"Wrote {len(index['pages'])} pages: {out_path}")
 
     else:
-        usage()
-        sys.exit(1)
+        html_out = render_html(ast, css=css_text, inline_local_images=True)
+        write_pdf(html_out, out_path, meta=ast.get("meta"), title=ast.get("title"))
+        if out_path != "-":
+            print(f"Wrote PDF: {out_path}")
+
+    if timings:
+        instrument.write_report(timings_json)
+    if memory:
+        instrument.write_memory_report(memory_json)
+    if trace_path:
+        instrument.write_trace(trace_path)
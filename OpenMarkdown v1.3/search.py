@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# search.py
+
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import sys
+from typing import Dict, Any, List, Tuple
+
+import log_utils
+from cliargs import pop_flag, pop_option
+from incremental import full_parse
+from parser import OpenMarkdownError, parse_header, source_lines
+from index import DEFAULT_DB, iter_omd_files
+from tables import iter_rows
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_documents (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    title TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS search_sections (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS search_sections_by_path ON search_sections (path);
+-- Keyed by search_sections.id so a document's rows can be dropped without
+-- scanning the whole full-text table.
+CREATE VIRTUAL TABLE IF NOT EXISTS sections USING fts5(
+    heading_path,
+    body,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def connect(db_path: str = DEFAULT_DB) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# ---------------------------
+# Text extraction
+# ---------------------------
+def inline_words(nodes: List[Dict[str, Any]], out: List[str]) -> None:
+    for n in nodes:
+        t = n["type"]
+        if t == "link":
+            out.append(n["text"])
+        elif t == "image":
+            if n.get("alt"):
+                out.append(n["alt"])
+        elif t == "linebreak":
+            out.append("\n")
+        elif t == "math_inline":
+            out.append(n["content"])
+        elif "value" in n:
+            out.append(n["value"])
+
+
+def block_words(nodes: List[Dict[str, Any]], out: List[str]) -> None:
+    for n in nodes:
+        t = n["type"]
+        if t in {"paragraph", "heading"}:
+            inline_words(n["content"], out)
+        elif t == "blockquote":
+            block_words(n.get("children", []), out)
+        elif t == "callout":
+            inline_words(n.get("title", []), out)
+            block_words(n.get("children", []), out)
+        elif t == "list":
+            for item in n["items"]:
+                inline_words(item["content"], out)
+                out.append("\n")
+                block_words(item.get("children", []), out)
+        elif t == "table":
+            for row in itertools.chain([n["header"]], iter_rows(n)):
+                for cell in row:
+                    inline_words(cell, out)
+                    out.append(" ")
+                out.append("\n")
+        elif t in {"code_block", "math_block"}:
+            out.append(n["content"])
+        out.append("\n")
+
+
+def document_sections(text: str) -> Tuple[str, List[Tuple[int, str, str]]]:
+    # Returns the title and one (line, heading path, body) entry per section.
+    # Text before the first heading belongs to the title section at line 0.
+    # One parse gives both the AST and the line span of each block, so the
+    # first error is always the one a full parse reports.
+    ast, spans = full_parse(text, None)
+    body_start = parse_header(source_lines(text))["body_start"]
+
+    sections: List[Tuple[int, str, str]] = []
+    stack: List[Tuple[int, str]] = []
+    line = 0
+    words: List[str] = []
+
+    def flush() -> None:
+        content = "".join(words).strip()
+        heading_path = " > ".join(h for _, h in stack)
+        if content or heading_path:
+            sections.append((line, heading_path, content))
+
+    for (start, _), node in zip(spans, ast["children"]):
+        if node["type"] == "heading":
+            flush()
+            words = []
+            heading: List[str] = []
+            inline_words(node["content"], heading)
+            while stack and stack[-1][0] >= node["level"]:
+                stack.pop()
+            stack.append((node["level"], "".join(heading).strip()))
+            line = body_start + start + 1
+            continue
+        block_words([node], words)
+    flush()
+    return ast["title"], sections
+
+
+# ---------------------------
+# Indexing
+# ---------------------------
+def remove_sections(conn: sqlite3.Connection, path: str) -> None:
+    conn.execute(
+        "DELETE FROM sections WHERE rowid IN (SELECT id FROM search_sections WHERE path = ?)",
+        (path,),
+    )
+    conn.execute("DELETE FROM search_sections WHERE path = ?", (path,))
+
+
+def index_file(conn: sqlite3.Connection, path: str, st: os.stat_result) -> str:
+    row = conn.execute(
+        "SELECT mtime, size, hash FROM search_documents WHERE path = ?", (path,)
+    ).fetchone()
+    if row and row[0] == st.st_mtime and row[1] == st.st_size:
+        return "unchanged"
+
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if row and row[2] == digest:
+        conn.execute(
+            "UPDATE search_documents SET mtime = ?, size = ? WHERE path = ?",
+            (st.st_mtime, st.st_size, path),
+        )
+        return "unchanged"
+
+    title = None
+    sections: List[Tuple[int, str, str]] = []
+    error = None
+    try:
+        title, sections = document_sections(data.decode("utf-8"))
+    except (OpenMarkdownError, UnicodeDecodeError) as exc:
+        error = str(exc)
+
+    remove_sections(conn, path)
+    conn.execute(
+        "INSERT OR REPLACE INTO search_documents (path, mtime, size, hash, title, error) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (path, st.st_mtime, st.st_size, digest, title, error),
+    )
+    for line, heading_path, content in sections:
+        section_id = conn.execute(
+            "INSERT INTO search_sections (path, line) VALUES (?, ?)", (path, line)
+        ).lastrowid
+        conn.execute(
+            "INSERT INTO sections (rowid, heading_path, body) VALUES (?, ?, ?)",
+            (section_id, heading_path, content),
+        )
+    return "error" if error else ("updated" if row else "added")
+
+
+def update_index(conn: sqlite3.Connection, roots: List[str]) -> Dict[str, int]:
+    stats = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "error": 0}
+    seen = set()
+    with conn:
+        for path in iter_omd_files(roots):
+            seen.add(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stats[index_file(conn, path, st)] += 1
+
+        for root in roots:
+            prefix = os.path.abspath(root)
+            if os.path.isdir(prefix):
+                prefix = os.path.join(prefix, "")
+            rows = conn.execute(
+                "SELECT path FROM search_documents WHERE path = ? OR substr(path, 1, ?) = ?",
+                (prefix, len(prefix), prefix),
+            ).fetchall()
+            for (path,) in rows:
+                if path not in seen:
+                    remove_sections(conn, path)
+                    conn.execute("DELETE FROM search_documents WHERE path = ?", (path,))
+                    stats["removed"] += 1
+    return stats
+
+
+# ---------------------------
+# Queries
+# ---------------------------
+def search(
+    conn: sqlite3.Connection,
+    terms: str,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    rows = conn.execute(
+        "SELECT s.path, s.line, sections.heading_path, d.title, "
+        "snippet(sections, 1, '[', ']', '…', 12) "
+        "FROM sections "
+        "JOIN search_sections s ON s.id = sections.rowid "
+        "JOIN search_documents d ON d.path = s.path "
+        "WHERE sections MATCH ? ORDER BY rank LIMIT ?",
+        (terms, limit),
+    ).fetchall()
+    return [
+        {
+            "path": path,
+            "line": line,
+            "section": heading_path,
+            "title": title,
+            "snippet": snippet,
+        }
+        for path, line, heading_path, title, snippet in rows
+    ]
+
+
+# ---------------------------
+# CLI
+# ---------------------------
+def usage() -> None:
+    print(
+        "Usage:\n"
+        "  python3 search.py update DIR_OR_FILE [...] [--db omd-index.sqlite]\n"
+        "  python3 search.py query TERMS [--limit 20] [--db omd-index.sqlite] [--json]"
+    )
+
+
+def main(argv: List[str]) -> int:
+    if not argv:
+        usage()
+        return 1
+    command, args = argv[0], list(argv[1:])
+    db_path = pop_option(args, "--db") or DEFAULT_DB
+
+    if command == "update":
+        if not args:
+            usage()
+            return 1
+        # Every file goes through a full parse; its progress steps would
+        # drown the summary line.
+        log_utils.set_reporter(log_utils.QuietReporter())
+        stats = update_index(connect(db_path), args)
+        print(
+            f"Indexed {db_path}: {stats['added']} added, {stats['updated']} updated, "
+            f"{stats['unchanged']} unchanged, {stats['removed']} removed, "
+            f"{stats['error']} with errors"
+        )
+        return 0
+
+    if command == "query":
+        limit = pop_option(args, "--limit")
+        as_json = pop_flag(args, "--json")
+        if not args:
+            usage()
+            return 1
+        try:
+            results = search(connect(db_path), " ".join(args), int(limit or 20))
+        except sqlite3.OperationalError as exc:
+            print(f"Error: invalid search query: {exc}")
+            return 1
+        except ValueError:
+            print("Error: --limit must be a number")
+            return 1
+        if as_json:
+            print(json.dumps(results, indent=2, ensure_ascii=False))
+        else:
+            for r in results:
+                where = f"{r['path']}:{r['line']}" if r["line"] else r["path"]
+                section = r["section"] or r["title"]
+                snippet = " ".join(r["snippet"].split())
+                print(f"{where}  {section}\n    {snippet}")
+        return 0
+
+    usage()
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
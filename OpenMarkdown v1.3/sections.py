@@ -0,0 +1,163 @@
+# sections.py
+
+import re
+from typing import Dict, Any, List, Optional, Set
+
+import instrument
+from log_utils import log_step
+from parser import (
+    HEADING_RE,
+    OpenMarkdownError,
+    build_document,
+    iter_blocks,
+    parse_blocks,
+    parse_header,
+    parse_inline,
+    parse_openmarkdown_v1,
+    source_lines,
+)
+
+
+def inline_text(nodes: List[Dict[str, Any]]) -> str:
+    out = []
+    for n in nodes:
+        t = n["type"]
+        if t == "link":
+            out.append(n["text"])
+        elif t == "image":
+            out.append(n.get("alt", ""))
+        elif t == "math_inline":
+            out.append(n["content"])
+        elif t == "linebreak":
+            out.append(" ")
+        else:
+            out.append(n.get("value", ""))
+    return "".join(out)
+
+
+# Anchor ids and file names for headings: lowercase words joined by "-".
+# Repeats get "-2", "-3", ... in document order.
+def slugify(text: str) -> str:
+    return "-".join(re.findall(r"\w+", text.lower()))
+
+
+def unique_slug(text: str, used: Set[str], default: str = "section") -> str:
+    base = slugify(text) or default
+    slug = base
+    n = 2
+    while slug in used:
+        slug = f"{base}-{n}"
+        n += 1
+    used.add(slug)
+    return slug
+
+
+# ---------------------------
+# Heading index
+# ---------------------------
+# Built from the block scanner alone, so no inline parsing happens outside of
+# heading text. Each entry covers a top-level heading and everything up to the
+# next top-level heading of the same or a higher level. start/stop are line
+# indices relative to the first line after the title, line is the 1-based
+# source line of the heading.
+def heading_index(body: List[str], start_line: int) -> List[Dict[str, Any]]:
+    entries: List[Dict[str, Any]] = []
+    stack: List[Dict[str, Any]] = []
+    used: Set[str] = set()
+    for start, _ in iter_blocks(body, 0, start_line):
+        m = HEADING_RE.match(body[start])
+        if not m:
+            continue
+        level = len(m.group(1))
+        title = inline_text(parse_inline(m.group(2)))
+        while stack and stack[-1]["level"] >= level:
+            stack.pop()["stop"] = start
+        entry = {
+            "id": unique_slug(title, used),
+            "level": level,
+            "title": title,
+            "path": [e["title"] for e in stack] + [title],
+            "line": start_line + start,
+            "start": start,
+            "stop": len(body),
+        }
+        stack.append(entry)
+        entries.append(entry)
+    return entries
+
+
+def document_index(text: str) -> Dict[str, Any]:
+    lines = source_lines(text)
+    header = parse_header(lines)
+    body_start = header["body_start"]
+    return {
+        "title": header["title"],
+        "sections": heading_index(lines[body_start:], body_start + 1),
+    }
+
+
+# A selector is an anchor id ("phase-ii", "#phase-ii") or a heading path with
+# titles separated by ">" ("Phase II > Findings"). A path matches the first
+# heading whose last titles equal it, compared as slugs so that case,
+# punctuation and emoji do not matter.
+def find_section(sections: List[Dict[str, Any]], selector: str) -> Dict[str, Any]:
+    anchor = selector[1:] if selector.startswith("#") else selector
+    for entry in sections:
+        if entry["id"] == anchor:
+            return entry
+    wanted = [slugify(part) for part in selector.split(">")]
+    for entry in sections:
+        path = [slugify(title) for title in entry["path"]]
+        if path[-len(wanted):] == wanted:
+            return entry
+    raise LookupError(f"No section matches {selector}")
+
+
+# Parses the header, the title and the selected section only. Syntax errors
+# elsewhere in the body go unnoticed; a body the block scanner cannot read is
+# parsed in full so that its error is raised. Pass the sections from an
+# earlier document_index() of the same text to skip the scan.
+def parse_section(
+    text: str,
+    selector: str,
+    source_path: Optional[str] = None,
+    sections: Optional[List[Dict[str, Any]]] = None,
+    columnar_tables: bool = False,
+) -> Dict[str, Any]:
+    log_step("Parsing your file...")
+    total = instrument.start()
+    lines = source_lines(text)
+    header = parse_header(lines)
+    body_start = header["body_start"]
+    body = lines[body_start:]
+    if sections is None:
+        started = instrument.start()
+        try:
+            sections = heading_index(body, body_start + 1)
+        except OpenMarkdownError:
+            parse_openmarkdown_v1(text, source_path=source_path)
+            raise
+        instrument.stop("parse.heading_index", started)
+    entry = find_section(sections, selector)
+    parsed = parse_blocks(
+        body[entry["start"]:entry["stop"]],
+        allow_title=False,
+        start_line=body_start + 1 + entry["start"],
+        columnar_tables=columnar_tables,
+    )
+    ast = build_document(header, parsed["children"], source_path)
+    instrument.stop("parse.document", total)
+    log_step("AST constructed.")
+    return ast
+
+
+def render_section(
+    text: str,
+    selector: str,
+    source_path: Optional[str] = None,
+    css: Optional[str] = None,
+    sections: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    from render import render_html
+
+    return render_html(parse_section(text, selector, source_path, sections), css=css)
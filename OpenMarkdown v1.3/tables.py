@@ -0,0 +1,103 @@
+# tables.py
+
+import re
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+
+from parser import parse_inline
+
+
+# Accessors that work on both table layouts. A columnar table (parsed with
+# columnar_tables=True) keeps body cells as raw strings and parses a cell only
+# when it is asked for. Cells the renderer had to rewrite, such as local:
+# images, are kept parsed under "cells", keyed by "row:column" so the AST
+# stays JSON-serialisable.
+#
+# Every inline construct starts with one of these characters; a cell without
+# any of them is a single text node.
+INLINE_START = re.compile(r"[\\`*=~$\[]")
+
+
+def is_columnar(node: Dict[str, Any]) -> bool:
+    return node.get("layout") == "columnar"
+
+
+def row_count(node: Dict[str, Any]) -> int:
+    return node["row_count"] if is_columnar(node) else len(node["rows"])
+
+
+def cell_key(row: int, col: int) -> str:
+    return f"{row}:{col}"
+
+
+def literal_cells(node: Dict[str, Any]) -> Set[Tuple[int, int]]:
+    return {(row, col) for row, col in node.get("literal", [])}
+
+
+def cell_nodes(
+    node: Dict[str, Any],
+    row: int,
+    col: int,
+    literal: Set[Tuple[int, int]],
+) -> Optional[List[Dict[str, Any]]]:
+    parsed = node.get("cells")
+    if parsed:
+        cell = parsed.get(cell_key(row, col))
+        if cell is not None:
+            return cell
+    raw = node["columns"][col][row]
+    if raw is None:
+        return None
+    if (row, col) in literal:
+        return [{"type": "text", "value": raw}]
+    return parse_inline(raw, node["first_line"] + row)
+
+
+def iter_rows(node: Dict[str, Any]) -> Iterator[List[List[Dict[str, Any]]]]:
+    if not is_columnar(node):
+        yield from node["rows"]
+        return
+    literal = literal_cells(node)
+    for row in range(node["row_count"]):
+        cells = [cell_nodes(node, row, col, literal) for col in range(len(node["columns"]))]
+        yield [cell for cell in cells if cell is not None]
+
+
+def cells_containing(node: Dict[str, Any], needle: str) -> Iterator[List[Dict[str, Any]]]:
+    # Body cells that may need rewriting in place. For a columnar table these
+    # are the cells already kept parsed plus raw cells containing `needle`,
+    # which are parsed and kept from now on.
+    if not is_columnar(node):
+        for row in node["rows"]:
+            yield from row
+        return
+    parsed = node.setdefault("cells", {})
+    yield from list(parsed.values())
+    literal = literal_cells(node)
+    for col, column in enumerate(node["columns"]):
+        for row, raw in enumerate(column):
+            key = cell_key(row, col)
+            if raw is not None and needle in raw and key not in parsed:
+                parsed[key] = cell_nodes(node, row, col, literal)
+                yield parsed[key]
+
+
+def slice_rows(node: Dict[str, Any], start: int, stop: int) -> Dict[str, Any]:
+    # A copy of the table holding only body rows start..stop, e.g. to send
+    # part of a large table to another process.
+    if not is_columnar(node):
+        return dict(node, rows=node["rows"][start:stop])
+    part = dict(
+        node,
+        columns=[column[start:stop] for column in node["columns"]],
+        row_count=max(0, min(stop, node["row_count"]) - start),
+        first_line=node["first_line"] + start,
+    )
+    if "literal" in node:
+        part["literal"] = [[row - start, col] for row, col in node["literal"] if start <= row < stop]
+    if "cells" in node:
+        part["cells"] = {}
+        for key, cell in node["cells"].items():
+            row, col = map(int, key.split(":"))
+            if start <= row < stop:
+                part["cells"][cell_key(row - start, col)] = cell
+    return part
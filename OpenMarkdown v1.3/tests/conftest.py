@@ -0,0 +1,11 @@
+# conftest.py
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import log_utils
+
+log_utils.set_reporter(log_utils.QuietReporter())
@@ -0,0 +1,49 @@
+# test_daemon.py
+
+import json
+import os
+import socket
+import subprocess
+import sys
+
+from client import call
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_trace_has_worker_tracks(tmp_path) -> None:
+    port = free_port()
+    trace_path = tmp_path / "trace.json"
+    proc = subprocess.Popen(
+        [
+            sys.executable, os.path.join(ROOT, "daemon.py"), "serve",
+            "--port", str(port), "--workers", "2", "--trace", str(trace_path),
+        ],
+        stdout=subprocess.PIPE,
+    )
+    try:
+        assert proc.stdout.readline().startswith(b"Render daemon")
+        with open(os.path.join(ROOT, "example.omd"), encoding="utf-8") as f:
+            text = f.read()
+        for i in range(4):
+            status, _ = call(port, "/html", {"text": text + "\n" * i, "source_path": None, "css": None})
+            assert status == 200
+        call(port, "/shutdown")
+        assert proc.wait(timeout=30) == 0
+    finally:
+        proc.kill()
+        proc.stdout.close()
+
+    with open(trace_path, encoding="utf-8") as f:
+        events = json.load(f)["traceEvents"]
+    workers = {e["pid"] for e in events if e["name"] == "thread_name"}
+    assert workers and proc.pid not in workers
+    assert all(e["args"]["name"].startswith("worker ") for e in events if e["name"] == "thread_name")
+    parsed = {e["pid"] for e in events if e["name"] == "parse.document"}
+    assert parsed and parsed <= workers
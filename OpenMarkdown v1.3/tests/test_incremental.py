@@ -0,0 +1,115 @@
+# test_incremental.py
+
+import os
+import random
+from typing import Any, List
+
+import pytest
+
+from incremental import full_parse, reparse, reparse_with_spans
+from parser import OpenMarkdownError, parse_openmarkdown_v1
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Lines the random edits draw from: block starts, continuations, blank lines
+# and lines that open or close multi-line blocks, plus a few syntax errors.
+SNIPPETS = [
+    "",
+    "",
+    "Plain text with *italic* and **bold**.",
+    "## A heading",
+    "- item",
+    "  - nested item",
+    "1. numbered",
+    "> quoted",
+    "> [Note]{color: blue}",
+    "| a | b |",
+    "|---|---|",
+    "| 1 | 2 |",
+    "```",
+    "```python",
+    "$$",
+    "x^2 + y^2",
+    "---",
+    "<# comment #>",
+    "Unclosed **bold",
+    "Unclosed `code",
+]
+
+
+def read_example() -> str:
+    with open(os.path.join(ROOT, "example.omd"), encoding="utf-8") as f:
+        return f.read()
+
+
+def edit(rng: random.Random, text: str) -> str:
+    lines = text.split("\n")
+    # Keep the header and title so most edits take the incremental path.
+    at = rng.randrange(8, len(lines) + 1)
+    kind = rng.choice(["insert", "delete", "replace"])
+    count = rng.randint(1, 4)
+    new = [rng.choice(SNIPPETS) for _ in range(count)]
+    if kind == "insert":
+        lines[at:at] = new
+    elif kind == "delete":
+        del lines[at:at + count]
+    else:
+        lines[at:at + count] = new
+    return "\n".join(lines)
+
+
+def outcome(fn: Any, *args: Any) -> Any:
+    try:
+        return fn(*args)
+    except OpenMarkdownError as e:
+        return ("error", str(e), e.line_no)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_reparse_matches_full_parse(seed: int) -> None:
+    rng = random.Random(seed)
+    text = read_example()
+    ast = parse_openmarkdown_v1(text)
+    for _ in range(25):
+        new_text = edit(rng, text)
+        expected = outcome(parse_openmarkdown_v1, new_text)
+        assert outcome(reparse, ast, text, new_text) == expected
+        if not isinstance(expected, tuple):
+            text, ast = new_text, expected
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_reparse_with_spans_chain(seed: int) -> None:
+    # Each step reuses the AST and spans returned by the previous one.
+    rng = random.Random(1000 + seed)
+    text = read_example()
+    ast = parse_openmarkdown_v1(text)
+    spans: Any = None
+    for _ in range(25):
+        new_text = edit(rng, text)
+        expected = outcome(parse_openmarkdown_v1, new_text)
+        result = outcome(reparse_with_spans, ast, text, new_text, None, spans)
+        if isinstance(expected, tuple):
+            assert result == expected
+            continue
+        assert result[0] == expected
+        text, (ast, spans) = new_text, result
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_recovering_reparse_chain(seed: int) -> None:
+    # The diagnostics of each pass are carried into the next one, as lsp.py
+    # does while the document has errors.
+    rng = random.Random(2000 + seed)
+    text = read_example()
+    errors: List[OpenMarkdownError] = []
+    ast, spans = full_parse(text, None, errors)
+    for _ in range(25):
+        new_text = edit(rng, text)
+        expected_errors: List[OpenMarkdownError] = []
+        expected = full_parse(new_text, None, expected_errors)
+        new_errors: List[OpenMarkdownError] = []
+        result = reparse_with_spans(ast, text, new_text, None, spans, new_errors, errors)
+        assert result == expected
+        assert [(str(e), e.line_no) for e in new_errors] == [(str(e), e.line_no) for e in expected_errors]
+        text, (ast, spans), errors = new_text, result, new_errors
@@ -0,0 +1,64 @@
+# test_instrument.py
+
+import os
+
+import pytest
+
+import instrument
+import parallel
+from generate import generate
+from parser import OpenMarkdownError, parse_openmarkdown_v1
+from render import iter_html
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def memory():
+    instrument.reset()
+    instrument.enable_memory()
+    yield
+    instrument.enable_memory(False)
+    instrument.reset()
+
+
+def read_example() -> str:
+    with open(os.path.join(ROOT, "example.omd"), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_failed_parse_leaves_no_memory_mark(memory) -> None:
+    with pytest.raises(OpenMarkdownError):
+        parse_openmarkdown_v1(read_example().replace("Every major city", "Every **major city"))
+    assert instrument._memory_stack == []
+    assert instrument.memory_snapshot()["parse.document"]["calls"] == 1
+
+
+def test_abandoned_render_leaves_no_memory_mark(memory) -> None:
+    ast = parse_openmarkdown_v1(read_example())
+    pieces = iter_html(ast)
+    next(pieces)
+    assert len(instrument._memory_stack) == 1
+    pieces.close()
+    assert instrument._memory_stack == []
+
+
+def test_nested_phase_takes_no_snapshot(memory) -> None:
+    with instrument.memory_phase("outer"):
+        with instrument.memory_phase("inner"):
+            outer, inner = instrument._memory_stack
+            assert outer["snapshot"] is not None and inner["snapshot"] is None
+            data = [bytes(1000) for _ in range(100)]
+    stats = instrument.memory_snapshot()
+    assert stats["inner"]["top_sites"] == []
+    assert stats["outer"]["top_sites"]
+    del data
+
+
+def test_worker_memory_is_merged(memory) -> None:
+    text = generate(seed=1, size=256 * 1024)
+    parallel.parse_openmarkdown_parallel(text, workers=2)
+    stats = instrument.memory_snapshot()
+    assert stats["parse.document"]["calls"] == 1
+    assert stats["parse.parallel.chunk"]["calls"] >= 2
+    assert stats["parse.parallel.chunk"]["top_sites"]
@@ -0,0 +1,100 @@
+# test_lazy.py
+
+import copy
+import json
+import os
+import pickle
+from typing import Any, Callable, Dict, List
+
+import pytest
+
+from parser import LazyInline, OpenMarkdownError, materialize, parse_openmarkdown_v1
+from render import render_html
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def read_example() -> str:
+    with open(os.path.join(ROOT, "example.omd"), encoding="utf-8") as f:
+        return f.read()
+
+
+def contents(ast: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+    # Paragraph and heading content of the top-level blocks, in order.
+    return [n["content"] for n in ast["children"] if n["type"] in {"paragraph", "heading"}]
+
+
+def outcome(fn: Callable[[], Any]) -> Any:
+    try:
+        return fn()
+    except OpenMarkdownError as e:
+        return ("error", str(e))
+
+
+# Each operation gets fresh, unread content and the same content from an
+# eager parse, and must give the same result for both.
+OPERATIONS = {
+    "iter": lambda c: list(iter(c)),
+    "len": len,
+    "bool": bool,
+    "index": lambda c: c[0],
+    "slice": lambda c: c[1:],
+    "contains": lambda c: {"type": "linebreak"} in c,
+    "eq": lambda c: c == list(c),
+    "ne": lambda c: c != [],
+    "lt": lambda c: (c < [], [] < c, c <= c, c >= []),
+    "reversed": lambda c: list(reversed(c)),
+    "copy": lambda c: c.copy(),
+    "add": lambda c: c + [],
+    "radd": lambda c: [] + c,
+    "mul": lambda c: c * 2,
+    "rmul": lambda c: 2 * c,
+    "count": lambda c: c.count({"type": "linebreak"}),
+    "index_of": lambda c: c.index(list(c)[-1]),
+    "iadd": lambda c: (c.__iadd__([{"type": "hr"}]), list(c))[1],
+    "append": lambda c: (c.append({"type": "hr"}), list(c)),
+    "insert": lambda c: (c.insert(0, {"type": "hr"}), list(c)),
+    "pop": lambda c: (c.pop(0), list(c)),
+    "setitem": lambda c: (c.__setitem__(0, {"type": "hr"}), list(c)),
+    "delitem": lambda c: (c.__delitem__(0), list(c)),
+    "reverse": lambda c: (c.reverse(), list(c)),
+    "sort": lambda c: (c.sort(key=str), list(c)),
+    "clear": lambda c: (c.clear(), list(c)),
+    "deepcopy": lambda c: list(copy.deepcopy(c)),
+    "pickle": lambda c: list(pickle.loads(pickle.dumps(c))),
+}
+
+
+@pytest.mark.parametrize("name", sorted(OPERATIONS))
+def test_list_operations_match_eager(name: str) -> None:
+    text = read_example()
+    eager = contents(parse_openmarkdown_v1(text))
+    lazy = contents(parse_openmarkdown_v1(text, lazy_inline=True))
+    assert all(isinstance(c, LazyInline) and c.lines is not None for c in lazy)
+    operation = OPERATIONS[name]
+    for lazy_content, eager_content in zip(lazy, eager):
+        assert outcome(lambda: operation(lazy_content)) == outcome(lambda: operation(eager_content))
+
+
+def test_materialized_ast_matches_eager() -> None:
+    text = read_example()
+    lazy = parse_openmarkdown_v1(text, lazy_inline=True)
+    assert json.dumps(materialize(lazy)) == json.dumps(parse_openmarkdown_v1(text))
+
+
+def test_render_from_lazy_ast() -> None:
+    text = read_example()
+    assert render_html(parse_openmarkdown_v1(text, lazy_inline=True)) == render_html(parse_openmarkdown_v1(text))
+
+
+@pytest.mark.parametrize("broken", [
+    ("Every major city", "Every **major city"),
+    ("Silent. Folded.", "Silent `Folded."),
+    ("## 🕰️ PHASE I", "## 🕰️ **PHASE I"),
+])
+def test_errors_match_eager(broken: Any) -> None:
+    text = read_example().replace(*broken)
+    expected = outcome(lambda: parse_openmarkdown_v1(text))
+    assert expected[0] == "error"
+    assert outcome(lambda: materialize(parse_openmarkdown_v1(text, lazy_inline=True))) == expected
+    assert outcome(lambda: render_html(parse_openmarkdown_v1(text, lazy_inline=True))) == expected
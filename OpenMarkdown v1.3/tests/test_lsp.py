@@ -0,0 +1,171 @@
+# test_lsp.py
+
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+import pytest
+
+from generate import generate
+from lsp import DEBOUNCE_SECONDS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+URI = "file:///tmp/large.omd"
+
+# Time from didChange to publishDiagnostics on a 10k-line document, not
+# counting the debounce. A full parse of it takes over 0.2 s.
+CHANGE_SECONDS = 0.1
+SYMBOL_SECONDS = 1.0
+
+
+class Client:
+    def __init__(self) -> None:
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "lsp.py")],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=ROOT,
+        )
+        self.next_id = 0
+
+    def send(self, payload: Dict[str, Any]) -> None:
+        payload["jsonrpc"] = "2.0"
+        body = json.dumps(payload).encode("utf-8")
+        self.proc.stdin.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+        self.proc.stdin.flush()
+
+    def receive(self) -> Dict[str, Any]:
+        length = None
+        while True:
+            line = self.proc.stdout.readline().decode("ascii").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return json.loads(self.proc.stdout.read(length).decode("utf-8"))
+
+    def notify(self, method: str, params: Dict[str, Any]) -> None:
+        self.send({"method": method, "params": params})
+
+    def request(self, method: str, params: Any) -> Any:
+        self.next_id += 1
+        msg_id = self.next_id
+        self.send({"id": msg_id, "method": method, "params": params})
+        while True:
+            message = self.receive()
+            if message.get("id") == msg_id:
+                return message.get("result")
+
+    def wait_for(self, method: str, version: Optional[int] = None) -> Dict[str, Any]:
+        while True:
+            message = self.receive()
+            if message.get("method") != method:
+                continue
+            if version is None or message["params"].get("version") == version:
+                return message["params"]
+
+    def close(self) -> None:
+        self.request("shutdown", None)
+        self.notify("exit", {})
+        self.proc.stdin.close()
+        self.proc.wait(timeout=10)
+        self.proc.stdout.close()
+
+
+@pytest.fixture(scope="module")
+def document() -> List[str]:
+    lines = generate(seed=7, size=640 * 1024).split("\n")
+    assert len(lines) >= 10000
+    return lines
+
+
+@pytest.fixture
+def client(document: List[str]) -> Client:
+    client = Client()
+    client.request("initialize", {"processId": None, "rootUri": None, "capabilities": {}})
+    client.notify("initialized", {})
+    client.notify("textDocument/didOpen", {"textDocument": {
+        "uri": URI, "languageId": "openmarkdown", "version": 1, "text": "\n".join(document),
+    }})
+    assert client.wait_for("textDocument/publishDiagnostics", 1)["diagnostics"] == []
+    yield client
+    client.close()
+
+
+def insert(line: int, text: str) -> Dict[str, Any]:
+    position = {"line": line, "character": 0}
+    return {"range": {"start": position, "end": position}, "text": text}
+
+
+def paragraph_line(lines: List[str], start: int) -> int:
+    # The first line of a paragraph at or after start.
+    for i in range(start, len(lines)):
+        if lines[i][:1].isalpha() and not lines[i - 1].strip():
+            return i
+    raise AssertionError("no paragraph found")
+
+
+def change(
+    client: Client,
+    version: int,
+    changes: List[Dict[str, Any]],
+    seconds: float = CHANGE_SECONDS,
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    client.notify("textDocument/didChange", {
+        "textDocument": {"uri": URI, "version": version},
+        "contentChanges": changes,
+    })
+    params = client.wait_for("textDocument/publishDiagnostics", version)
+    assert time.perf_counter() - started - DEBOUNCE_SECONDS < seconds
+    return params
+
+
+def test_change_latency(client: Client, document: List[str]) -> None:
+    line = paragraph_line(document, len(document) // 2)
+    assert change(client, 2, [insert(line, "Some *new* words ")])["diagnostics"] == []
+    broken = change(client, 3, [insert(line, "Unclosed **bold ")])["diagnostics"]
+    assert [d["range"]["start"]["line"] for d in broken] == [line]
+
+
+def test_change_latency_with_error(client: Client, document: List[str]) -> None:
+    first = paragraph_line(document, 10)
+    line = paragraph_line(document, len(document) // 2)
+    broken = change(client, 2, [insert(first, "Unclosed `code ")])["diagnostics"]
+    assert [d["range"]["start"]["line"] for d in broken] == [first]
+    diagnostics = change(client, 3, [insert(line, "Two\nnew lines\n")])["diagnostics"]
+    assert [d["range"]["start"]["line"] for d in diagnostics] == [first]
+    diagnostics = change(client, 4, [insert(first, "More words\n\n")])["diagnostics"]
+    assert [d["range"]["start"]["line"] for d in diagnostics] == [first + 2]
+
+
+def test_all_errors_published(client: Client, document: List[str]) -> None:
+    first = paragraph_line(document, 10)
+    line = paragraph_line(document, len(document) // 2)
+    # The edits are half a document apart, so all of it between them is dirty.
+    diagnostics = change(client, 2, [
+        insert(line, "Unclosed **bold "),
+        insert(first, "Unclosed `code "),
+    ], seconds=1.0)["diagnostics"]
+    assert [d["range"]["start"]["line"] for d in diagnostics] == [first, line]
+
+
+def test_symbol_latency(client: Client, document: List[str]) -> None:
+    client.notify("textDocument/didChange", {
+        "textDocument": {"uri": URI, "version": 2},
+        "contentChanges": [insert(paragraph_line(document, len(document) // 2), "## Inserted heading\n\n")],
+    })
+    started = time.perf_counter()
+    symbols = client.request("textDocument/documentSymbol", {"textDocument": {"uri": URI}})
+    assert time.perf_counter() - started < SYMBOL_SECONDS
+    names = []
+    stack = list(symbols)
+    while stack:
+        symbol = stack.pop()
+        names.append(symbol["name"])
+        stack.extend(symbol["children"])
+    assert "Inserted heading" in names
@@ -0,0 +1,84 @@
+# test_omd.py
+
+import json
+import os
+import subprocess
+import sys
+
+from generate import generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_closed_stdout_exits_quietly(tmp_path) -> None:
+    source = tmp_path / "big.omd"
+    source.write_text(generate(seed=1, size=512 * 1024), encoding="utf-8")
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "omd.py"), "render", str(source), "-o", "-"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    proc.stdout.read(100)
+    proc.stdout.close()
+    stderr = proc.stderr.read()
+    proc.stderr.close()
+    assert proc.wait(timeout=30) == 1
+    assert stderr == b""
+
+
+def test_jobs_trace_has_worker_spans(tmp_path) -> None:
+    source = tmp_path / "big.omd"
+    source.write_text(generate(seed=1, size=512 * 1024), encoding="utf-8")
+    trace_path = tmp_path / "trace.json"
+    proc = subprocess.run(
+        [
+            sys.executable, os.path.join(ROOT, "omd.py"), "render", str(source),
+            "-o", str(tmp_path / "big.html"), "--jobs", "2", "--trace", str(trace_path),
+        ],
+        timeout=60,
+    )
+    assert proc.returncode == 0
+    with open(trace_path, encoding="utf-8") as f:
+        events = json.load(f)["traceEvents"]
+    workers = {e["pid"] for e in events if e["name"] == "thread_name"}
+    parent = {e["pid"] for e in events if e["name"] == "process_name"}
+    assert len(workers) >= 2 and not workers & parent
+    blocks = {e["pid"] for e in events if e["name"].startswith("parse.block.")}
+    assert len(blocks) >= 2 and blocks <= workers
+
+
+def test_argument_errors_go_to_stderr(tmp_path) -> None:
+    source = tmp_path / "doc.omd"
+    source.write_text(generate(seed=1, size=4 * 1024), encoding="utf-8")
+    for extra in (["--jobs", "x"], ["--section", "a", "--jobs", "2"], ["--format", "docx"]):
+        proc = subprocess.run(
+            [sys.executable, os.path.join(ROOT, "omd.py"), "render", str(source), "-o", "-"] + extra,
+            capture_output=True,
+            timeout=30,
+        )
+        assert proc.returncode == 1
+        assert proc.stdout == b""
+        assert proc.stderr.startswith(b"Error: ")
+
+
+def test_pages_share_one_worker_pool(tmp_path) -> None:
+    parts = ["---\nOpenMarkdown-Version: 1.3\nauthor: A\ndate: 1.1.2026\n---\n#* Tables\n"]
+    for name in "ABC":
+        rows = "\n".join(f"| {name}{i} | {i} |" for i in range(5000))
+        parts.append(f"# Part {name}\n\n| a | b |\n|---|---|\n{rows}\n")
+    source = tmp_path / "tables.omd"
+    source.write_text("\n".join(parts), encoding="utf-8")
+    trace_path = tmp_path / "trace.json"
+    proc = subprocess.run(
+        [
+            sys.executable, os.path.join(ROOT, "omd.py"), "render", str(source),
+            "-o", str(tmp_path / "pages"), "--format", "pages", "--split-level", "1",
+            "--jobs", "2", "--trace", str(trace_path),
+        ],
+        timeout=60,
+    )
+    assert proc.returncode == 0
+    assert len(list((tmp_path / "pages").glob("*.html"))) == 3
+    with open(trace_path, encoding="utf-8") as f:
+        events = json.load(f)["traceEvents"]
+    assert len({e["pid"] for e in events if e["name"] == "thread_name"}) == 2
@@ -0,0 +1,46 @@
+# test_search.py
+
+import pytest
+
+from parser import OpenMarkdownError, parse_openmarkdown_v1
+from search import connect, document_sections, search, update_index
+
+DOCUMENT = """---
+OpenMarkdown-Version: 1.3
+author: A
+date: 1.1.2026
+---
+#* Pantry
+
+## Fruit
+- apple
+- banana
+  - cherry
+
+| alpha | beta |
+|---|---|
+| gamma | delta |
+
+Mass and energy: $E=mc^2$
+"""
+
+
+@pytest.mark.parametrize("word", ["apple", "banana", "cherry", "alpha", "beta", "gamma", "delta", "mc"])
+def test_list_items_table_cells_and_math_are_separate_words(tmp_path, word: str) -> None:
+    (tmp_path / "pantry.omd").write_text(DOCUMENT, encoding="utf-8")
+    conn = connect(str(tmp_path / "search.db"))
+    update_index(conn, [str(tmp_path)])
+    hits = search(conn, word)
+    assert [(hit["section"], hit["line"]) for hit in hits] == [("Fruit", 8)]
+
+
+def test_document_sections_reports_the_parser_error() -> None:
+    # An inline error comes before an unterminated fence, which a block scan
+    # alone would report instead.
+    text = DOCUMENT + "\nUnclosed **bold\n\n```\ncode\n"
+    with pytest.raises(OpenMarkdownError) as expected:
+        parse_openmarkdown_v1(text)
+    with pytest.raises(OpenMarkdownError) as got:
+        document_sections(text)
+    assert str(got.value) == str(expected.value)
+    assert "Unclosed bold" in str(got.value)
@@ -0,0 +1,33 @@
+# test_tables.py
+
+import json
+
+from parser import parse_openmarkdown_v1
+from render import render_html
+from tables import slice_rows
+
+DOCUMENT = """---
+OpenMarkdown-Version: 1.3
+author: A
+date: 1.1.2026
+---
+#* Tables
+
+| name | picture |
+|---|---|
+| one | plain |
+| two | ![Two](local:two.png) |
+| three | *three* |
+"""
+
+
+def test_rendered_columnar_table_is_json_serialisable(tmp_path) -> None:
+    source = tmp_path / "doc.omd"
+    expected = render_html(parse_openmarkdown_v1(DOCUMENT, source_path=str(source)))
+    ast = parse_openmarkdown_v1(DOCUMENT, source_path=str(source), columnar_tables=True)
+    assert render_html(ast) == expected
+    table = ast["children"][0]
+    assert list(table["cells"]) == ["1:1"]
+    assert json.loads(json.dumps(ast))["children"][0]["cells"] == table["cells"]
+    assert list(slice_rows(table, 1, 3)["cells"]) == ["0:1"]
+    assert slice_rows(table, 2, 3)["cells"] == {}